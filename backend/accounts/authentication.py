@@ -46,3 +46,32 @@ class SafeJWTAuthentication(JWTAuthentication):
             if settings.DEBUG:
                 raise AuthenticationFailed(f'Authentication failed: {str(e)}')
             raise AuthenticationFailed('Authentication failed')
+
+
+def get_request_token(request):
+    """
+    Raw JWT for a plain Django view: the Authorization header, then the
+    access_token cookie, then a ?token= query parameter.
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return request.COOKIES.get('access_token') or request.GET.get('token')
+
+
+def get_user_from_token(raw_token):
+    """
+    Resolve a raw JWT access token to an active user, or None if it is invalid.
+    Used by streaming endpoints (SSE/WebSocket) where browsers cannot send an
+    Authorization header, so the token arrives via cookie or query string.
+    """
+    if not raw_token:
+        return None
+
+    auth = SafeJWTAuthentication()
+    try:
+        validated_token = auth.get_validated_token(raw_token)
+        user = auth.get_user(validated_token)
+    except Exception:
+        return None
+    return user if user.is_active else None
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:30
+
+from django.contrib.postgres.indexes import OpClass
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Lower, StrIndex, Substr
+
+
+def pattern_indexes():
+    # text_pattern_ops lets LIKE 'prefix%' use the index under any collation
+    return [
+        models.Index(
+            OpClass(Lower(Substr('email', 1, StrIndex('email', Value('@')) - 1)), name='text_pattern_ops'),
+            name='user_mention_handle_idx',
+        ),
+        models.Index(OpClass(Lower('first_name'), name='text_pattern_ops'), name='user_first_name_lower_idx'),
+        models.Index(OpClass(Lower('last_name'), name='text_pattern_ops'), name='user_last_name_lower_idx'),
+    ]
+
+
+def create_postgres_indexes(apps, schema_editor):
+    # Operator classes only exist on PostgreSQL
+    if schema_editor.connection.vendor == 'postgresql':
+        User = apps.get_model('accounts', 'User')
+        for index in pattern_indexes():
+            schema_editor.add_index(User, index)
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        User = apps.get_model('accounts', 'User')
+        for index in pattern_indexes():
+            schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_mention_handle_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_first_name_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='user_last_name_lower_idx',
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 23:49
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('recipient', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('html_message', models.TextField(blank=True)),
+                ('claim', models.UUIDField(blank=True, help_text='Set by the worker sending this email', null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'queued email',
+                'verbose_name_plural': 'queued emails',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['claimed_at', 'created_at'], name='accounts_qu_claimed_15b1eb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.1.5 on 2026-10-18 23:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_queuedemail'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CacheVersion',
+        ),
+    ]
@@ -5,6 +5,8 @@ Custom user model with role-based permissions for Kindra CBO system
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower, StrIndex, Substr
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
@@ -40,6 +42,14 @@ class UserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
+def mention_handle_expression():
+    """
+    Database expression for a user's @mention handle: the lower-cased local
+    part of their email address (users sign in by email and have no username).
+    """
+    return Lower(Substr('email', 1, StrIndex('email', Value('@')) - 1))
+
+
 class User(AbstractUser):
     """
     Custom User model for Kindra CBO system
@@ -113,6 +123,9 @@ class User(AbstractUser):
             models.Index(fields=['role']),
             models.Index(fields=['is_active']),
             models.Index(fields=['is_approved']),
+            # Prefix indexes for chat @mention autocomplete (handle, first and
+            # last name, lower-cased) are created with text_pattern_ops by
+            # migration 0009, on PostgreSQL only
         ]
     
     def __str__(self):
@@ -122,6 +135,11 @@ class User(AbstractUser):
         """Return the user's full name"""
         return f"{self.first_name} {self.last_name}".strip() or self.email
     
+    @property
+    def mention_handle(self):
+        """Handle other users type to @mention this user in chat"""
+        return self.email.split('@', 1)[0].lower()
+
     @property
     def is_admin(self):
         """Check if user is an administrator"""
@@ -318,3 +336,71 @@ class BugReport(models.Model):
 
     def __str__(self):
         return f"{self.bug_type} ({self.status}) - {self.created_at.date()}"
+
+
+class BackgroundJob(models.Model):
+    """
+    Status record of a long-running Celery job (cleanup, exports, imports).
+    Kept in the database so the web process answering status polls sees
+    progress written by any worker. Accessed through kindra_cbo.jobs.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', _('Queued')
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETED = 'COMPLETED', _('Completed')
+        FAILED = 'FAILED', _('Failed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    details = models.JSONField(default=dict, blank=True, help_text=_('Extra fields supplied when the job was queued'))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('background job')
+        verbose_name_plural = _('background jobs')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
+
+
+class QueuedEmail(models.Model):
+    """
+    Outgoing email waiting to be sent. Emails queued within a few seconds of
+    each other are sent together over one SMTP connection by
+    kindra_cbo.tasks.send_queued_emails (see kindra_cbo.mail.queue_email).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    html_message = models.TextField(blank=True)
+    claim = models.UUIDField(null=True, blank=True, help_text=_('Set by the worker sending this email'))
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('queued email')
+        verbose_name_plural = _('queued emails')
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['claimed_at', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient}"
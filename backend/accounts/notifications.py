@@ -0,0 +1,30 @@
+"""
+Notification Push Helpers
+Publishes newly created notifications to the recipient's real-time channel
+so connected clients receive them without polling.
+"""
+
+from django.db import transaction
+
+from kindra_cbo.realtime import publish, user_channel
+from .serializers import NotificationSerializer
+
+
+def publish_notifications(notifications):
+    """
+    Push notifications to their recipients once the surrounding transaction commits.
+    Call this after ``Notification.objects.bulk_create()``, which bypasses the
+    post_save signal; single ``create()`` calls are pushed automatically.
+    """
+    payloads = [
+        (notification.recipient_id, NotificationSerializer(notification).data)
+        for notification in notifications
+    ]
+    if not payloads:
+        return
+
+    def _publish():
+        for recipient_id, data in payloads:
+            publish(user_channel(recipient_id), {'type': 'notification', 'notification': data})
+
+    transaction.on_commit(_publish)
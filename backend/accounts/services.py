@@ -0,0 +1,140 @@
+"""
+Account Services
+Batch operations on user accounts that are too heavy for a request cycle
+"""
+
+import datetime
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import User, Notification
+
+logger = logging.getLogger('kindra_cbo')
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from `iterable`"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class InactiveUserCleanupService:
+    """
+    Sends monthly inactivity reminders and removes accounts inactive for 6 months.
+    Works in fixed-size batches (bulk inserts, batched deletes) so it stays
+    fast and memory-bounded over tens of thousands of accounts.
+    """
+
+    DEFAULT_BATCH_SIZE = 500
+    DELETE_AFTER_DAYS = 180
+    REMINDER_MONTHS = range(1, 6)
+
+    TITLES = {
+        1: "We miss you at Kindra!",
+        2: "Checking in on your activity",
+        3: "Still there? Kindra updates waiting",
+        4: "Your profile is scheduled for archival",
+        5: "FINAL WARNING: Profile Deletion Imminent"
+    }
+
+    MESSAGES = {
+        1: "It's been a month since your last login. Come back and see what's new in the community!",
+        2: "We noticed you haven't been active for 2 months. Stay connected with Kindra CBO!",
+        3: "Three months of inactivity. Your account is still safe, but we'd love to have you back.",
+        4: "Four months inactive. Please note that accounts inactive for 6 months are automatically archived/deleted for data privacy and security.",
+        5: "CRITICAL: Your account has been inactive for 5 months. It will be PERMANENTLY DELETED in 30 days including all profile data if you do not login now."
+    }
+
+    def __init__(self, batch_size=None, progress_callback=None, now=None):
+        self.batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        self.progress_callback = progress_callback
+        self.now = now or timezone.now()
+
+    def run(self):
+        """Run both phases and return a summary dict"""
+        notified = self.send_inactivity_notifications()
+        deleted = self.delete_expired_users()
+        return {'notified': notified, 'deleted': deleted}
+
+    def reminder_queryset(self, months):
+        """Users who hit exactly `months` months of inactivity (1 day window)"""
+        days_inactive = months * 30
+        return User.objects.filter(
+            last_login__gte=self.now - datetime.timedelta(days=days_inactive + 1),
+            last_login__lt=self.now - datetime.timedelta(days=days_inactive),
+            is_active=True
+        ).exclude(role=User.Role.ADMIN)
+
+    def expired_queryset(self):
+        """Users inactive for 6 months, including those who never logged in"""
+        cutoff = self.now - datetime.timedelta(days=self.DELETE_AFTER_DAYS)
+        return User.objects.filter(
+            Q(last_login__lt=cutoff) | Q(last_login__isnull=True, created_at__lt=cutoff),
+            is_active=True
+        ).exclude(role=User.Role.ADMIN)
+
+    def send_inactivity_notifications(self):
+        """Bulk-create one reminder per inactive user per milestone month"""
+        total = sum(self.reminder_queryset(months).count() for months in self.REMINDER_MONTHS)
+        sent = 0
+        self._report('notify', sent, total)
+
+        for months in self.REMINDER_MONTHS:
+            user_ids = (
+                self.reminder_queryset(months)
+                .order_by('id')
+                .values_list('id', flat=True)
+                .iterator(chunk_size=self.batch_size)
+            )
+            for batch in chunked(user_ids, self.batch_size):
+                # Recipients have not logged in for at least a month, so there
+                # are no live connections to push these to (bulk_create skips
+                # the real-time post_save hook).
+                Notification.objects.bulk_create(
+                    [self.build_notification(user_id, months) for user_id in batch],
+                    batch_size=self.batch_size
+                )
+                sent += len(batch)
+                self._report('notify', sent, total)
+
+        return sent
+
+    def delete_expired_users(self):
+        """Delete expired accounts one batch (and one transaction) at a time"""
+        expired = self.expired_queryset()
+        total = expired.count()
+        deleted = 0
+        self._report('delete', deleted, total)
+
+        while True:
+            batch = list(expired.values_list('id', flat=True)[:self.batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                User.objects.filter(id__in=batch).delete()
+            deleted += len(batch)
+            self._report('delete', deleted, total)
+
+        return deleted
+
+    def build_notification(self, user_id, months):
+        return Notification(
+            recipient_id=user_id,
+            title=self.TITLES.get(months, "Account Activity Notice"),
+            message=self.MESSAGES.get(months, "Please check in to keep your account active."),
+            type=Notification.Type.WARNING if months >= 4 else Notification.Type.INFO,
+            category=Notification.Category.SYSTEM
+        )
+
+    def _report(self, phase, processed, total):
+        if self.progress_callback:
+            self.progress_callback(phase, processed, total)
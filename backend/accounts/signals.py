@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Notification
+from .notifications import publish_notifications
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    """
+    Push every newly created notification to the recipient's open connections.
+    """
+    if created:
+        publish_notifications([instance])
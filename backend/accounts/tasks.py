@@ -0,0 +1,116 @@
+"""
+Account Celery Tasks
+"""
+
+from celery import shared_task
+import logging
+
+from kindra_cbo.jobs import JobStatus, update_job
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='accounts.tasks.cleanup_inactive_users', ignore_result=True)
+def cleanup_inactive_users(job_id=None, batch_size=None):
+    """
+    Send inactivity reminders and delete accounts inactive for 6 months.
+    When `job_id` is given, progress is recorded for the admin endpoint to poll.
+    """
+    from .services import InactiveUserCleanupService
+
+    def report(phase, processed, total):
+        if job_id:
+            update_job(job_id, progress={phase: {'processed': processed, 'total': total}})
+
+    if job_id:
+        update_job(job_id, status=JobStatus.RUNNING)
+
+    try:
+        summary = InactiveUserCleanupService(
+            batch_size=batch_size,
+            progress_callback=report
+        ).run()
+    except Exception as e:
+        logger.error(f"Inactive user cleanup failed: {str(e)}")
+        if job_id:
+            update_job(job_id, status=JobStatus.FAILED, error=str(e))
+        raise
+
+    if job_id:
+        update_job(job_id, status=JobStatus.COMPLETED, result=summary)
+    logger.info(f"Inactive user cleanup: {summary['notified']} notified, {summary['deleted']} deleted.")
+    return summary
+
+
+ENCOURAGING_MESSAGES = [
+    ("Welcome to Kindra!", "We're thrilled to have you join our mission of creating lasting impact. Together, we can change lives!"),
+    ("A New Journey Begins", "Thank you for joining our community. Your presence alone brings hope to those we serve."),
+    ("Ready to Make a Difference?", "Welcome aboard! We can't wait to see the amazing contributions you'll bring to the Kindra family."),
+    ("Your Support Matters", "Welcome to Kindra! Every member counts in our quest to build stronger communities."),
+    ("Global Impact, Local Action", "We're glad you're here! Let's work together to make the world a better place, one step at a time.")
+]
+
+
+@shared_task(name='accounts.tasks.process_new_registration', ignore_result=True)
+def process_new_registration(user_id, ip_address=None, user_agent=''):
+    """
+    Post-registration side effects, deferred from UserRegistrationView:
+    welcome notification, analytics event, verification token and email.
+    """
+    import random
+    from django.conf import settings
+    from kindra_cbo.mail import queue_email
+    from reporting.models import AnalyticsEvent
+    from reporting.utils import log_analytics_event
+    from .models import User, Notification, VerificationToken
+
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        logger.warning(f"Post-registration skipped, user {user_id} no longer exists.")
+        return
+
+    # Create random encouraging notification
+    chosen_title, chosen_msg = random.choice(ENCOURAGING_MESSAGES)
+    Notification.objects.create(
+        recipient=user,
+        title=chosen_title,
+        message=chosen_msg,
+        type=Notification.Type.SUCCESS,
+        category=Notification.Category.SYSTEM
+    )
+
+    # Log registration
+    log_analytics_event(
+        event_type=AnalyticsEvent.EventType.VOLUNTEER_JOINED if user.role == 'VOLUNTEER' else 'USER_REGISTERED',
+        description=f'New {user.role.lower()} registered: {user.email} (Approved: {user.is_approved})',
+        user=user,
+        ip_address=ip_address,
+        user_agent=user_agent
+    )
+
+    # Generate Verification Token
+    verification_token = VerificationToken.objects.create(
+        user=user,
+        token_type=VerificationToken.TokenType.VERIFICATION
+    )
+
+    verify_url = f"{settings.FRONTEND_URL}/verify?token={verification_token.token}"
+    if settings.DEBUG:
+        # Carries a live token: development logs only
+        logger.debug(f"Verification URL for {user.email}: {verify_url}")
+
+    # Registrations arrive in bursts; queued emails share one SMTP connection
+    queue_email(
+        recipient=user.email,
+        subject='Verify your email for Kindra',
+        message=f'Please verify your email by clicking: {verify_url}',
+        html_message=f'''
+        <p>Welcome to Kindra!</p>
+        <p>Please verify your email by clicking below:</p>
+        <a href="{verify_url}"
+           style="display:inline-block;padding:10px 20px;background:#007BFF;color:#fff;text-decoration:none;border-radius:5px;">
+           Verify Email
+        </a>
+        '''
+    )
@@ -0,0 +1,266 @@
+"""
+Accounts Tests
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kindra_cbo import mail, realtime
+from kindra_cbo.jobs import JobStatus, create_job, get_job, update_job
+from kindra_cbo.log_filters import RedactTokenFilter
+from kindra_cbo.middleware import SessionRefreshMiddleware
+from .models import QueuedEmail, User
+from .utils import send_email_async_safe
+
+
+class RealtimeBrokerTests(SimpleTestCase):
+
+    def tearDown(self):
+        realtime._broker = None
+
+    @override_settings(REALTIME_REDIS_URL='')
+    def test_falls_back_to_in_process_broker_without_redis(self):
+        realtime._broker = None
+
+        self.assertIsInstance(realtime.get_broker(), realtime.InMemoryBroker)
+
+    @override_settings(REALTIME_REDIS_URL='redis://127.0.0.1:1/0')
+    def test_publish_never_raises_when_redis_is_unreachable(self):
+        realtime._broker = None
+
+        self.assertIsInstance(realtime.get_broker(), realtime.RedisBroker)
+        self.assertEqual(realtime.publish('user:1', {'type': 'notification'}), 0)
+
+
+@override_settings(REALTIME_REDIS_URL='', REALTIME_KEEPALIVE_SECONDS=1)
+class NotificationStreamTests(TestCase):
+
+    def setUp(self):
+        realtime._broker = None
+        self.user = User.objects.create_user(email='member@example.com')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def tearDown(self):
+        realtime._broker = None
+
+    async def read_frame(self, chunks):
+        frame = await asyncio.wait_for(anext(chunks), timeout=5)
+        return frame.decode() if isinstance(frame, bytes) else frame
+
+    async def test_stream_pushes_notifications_to_the_recipient(self):
+        response = await self.async_client.get('/api/v1/accounts/notifications/stream/', {'token': self.token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await self.read_frame(chunks), 'retry: 5000\n\n')
+        self.assertIn('"unread_count": 0', await self.read_frame(chunks))
+
+        realtime.publish(realtime.user_channel(self.user.id), {'type': 'notification', 'notification': {'id': 7, 'title': 'Hi'}})
+        frame = await self.read_frame(chunks)
+        self.assertTrue(frame.startswith('id: 7\nevent: notification\n'))
+        self.assertEqual(await self.read_frame(chunks), ': keepalive\n\n')
+        await chunks.aclose()
+
+    async def test_stream_requires_a_valid_token(self):
+        response = await self.async_client.get('/api/v1/accounts/notifications/stream/', {'token': 'not-a-jwt'})
+
+        self.assertEqual(response.status_code, 401)
+
+
+class RedactTokenFilterTests(SimpleTestCase):
+
+    def test_tokens_are_redacted_from_access_log_arguments(self):
+        record = logging.LogRecord(
+            'uvicorn.access', logging.INFO, __file__, 1, '%s - "%s %s HTTP/%s" %d',
+            ('127.0.0.1', 'GET', '/api/v1/accounts/notifications/stream/?token=abc.def&x=1', '1.1', 200), None,
+        )
+
+        RedactTokenFilter().filter(record)
+
+        self.assertEqual(
+            record.getMessage(),
+            '127.0.0.1 - "GET /api/v1/accounts/notifications/stream/?token=[REDACTED]&x=1 HTTP/1.1" 200'
+        )
+
+
+class BackgroundJobTests(TestCase):
+
+    def test_progress_is_merged_and_survives_a_cold_cache(self):
+        job = create_job('report', progress={'rows': 0}, dry_run=True)
+        update_job(job['id'], status=JobStatus.RUNNING, progress={'total': 10})
+        update_job(job['id'], progress={'rows': 5})
+        cache.clear()  # Another process: nothing shared through the cache
+
+        record = get_job(job['id'])
+        self.assertEqual(record['status'], JobStatus.RUNNING)
+        self.assertEqual(record['progress'], {'rows': 5, 'total': 10})
+        self.assertTrue(record['dry_run'])
+        self.assertIsNone(get_job('not-a-uuid'))
+
+    def test_cleanup_status_is_polled_after_the_job_has_run(self):
+        admin = User.objects.create_user(email='admin@example.com', role=User.Role.ADMIN)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        job_id = client.post('/api/v1/accounts/admin/cleanup-inactivity/').data['job']['id']
+        cache.clear()
+        response = client.get(f'/api/v1/accounts/admin/cleanup-inactivity/{job_id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], JobStatus.COMPLETED)
+        self.assertEqual(response.data['requested_by'], str(admin.id))
+        self.assertIn('deleted', response.data['result'])
+
+
+class FakeSMTPConnection:
+    """Stands in for an SMTP backend, refusing one address"""
+
+    opened = 0
+    delivered = []
+
+    def open(self):
+        FakeSMTPConnection.opened += 1
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        if messages[0].to == ['refused@example.com']:
+            raise smtplib.SMTPRecipientsRefused({'refused@example.com': (550, b'No such user')})
+        FakeSMTPConnection.delivered.extend(recipient for message in messages for recipient in message.to)
+        return len(messages)
+
+
+@override_settings(EMAIL_CONNECTION_MAX_IDLE=60)
+class BatchedEmailTests(SimpleTestCase):
+
+    def setUp(self):
+        mail._close_connection()
+        FakeSMTPConnection.opened = 0
+
+    def tearDown(self):
+        mail._close_connection()
+
+    def test_batches_share_one_connection_and_are_paced(self):
+        recipients = ['a@example.com', 'refused@example.com', 'b@example.com', 'c@example.com', 'd@example.com']
+        messages = [mail.build_message(recipient, 'Update', 'Hello') for recipient in recipients]
+
+        with mock.patch.object(mail, 'get_connection', return_value=FakeSMTPConnection()), \
+                mock.patch.object(mail.time, 'sleep') as sleep:
+            sent = mail.send_batched(messages, batch_size=2, rate_per_minute=120)
+
+        self.assertEqual(sent, 4)  # The refused address is skipped, not retried
+        self.assertEqual(FakeSMTPConnection.opened, 1)
+        # 2 per batch at 120/minute: one second between the three batches
+        self.assertEqual(sleep.call_count, 2)
+        for call in sleep.call_args_list:
+            self.assertAlmostEqual(call.args[0], 1.0, delta=0.1)
+
+
+@override_settings(EMAIL_CONNECTION_MAX_IDLE=60, EMAIL_QUEUE_DELAY=5)
+class QueuedEmailTests(TestCase):
+
+    def setUp(self):
+        mail._close_connection()
+        cache.delete(mail.FLUSH_SCHEDULED_KEY)
+        FakeSMTPConnection.opened = 0
+        FakeSMTPConnection.delivered = []
+
+    def tearDown(self):
+        mail._close_connection()
+
+    def test_a_burst_of_emails_goes_out_over_one_connection(self):
+        recipients = [f'member{index}@example.com' for index in range(12)]
+
+        with mock.patch.object(mail, 'get_connection', return_value=FakeSMTPConnection()), \
+                mock.patch.object(mail.time, 'sleep'), \
+                mock.patch('kindra_cbo.tasks.send_queued_emails.apply_async') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            for recipient in recipients:
+                self.assertTrue(send_email_async_safe(recipient, 'Welcome', 'Hello'))
+
+        # Twelve emails, one flush scheduled for all of them
+        self.assertEqual(schedule.call_count, 1)
+        self.assertEqual(QueuedEmail.objects.count(), 12)
+
+        with mock.patch.object(mail, 'get_connection', return_value=FakeSMTPConnection()), \
+                mock.patch.object(mail.time, 'sleep'):
+            self.assertEqual(mail.send_queued(), (12, 12))
+
+        self.assertEqual(FakeSMTPConnection.opened, 1)
+        self.assertEqual(FakeSMTPConnection.delivered, recipients)
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_claimed_emails_are_not_sent_twice_unless_abandoned(self):
+        for index in range(3):
+            QueuedEmail.objects.create(recipient=f'member{index}@example.com', subject='Hi', message='Hello')
+
+        first = mail.claim_queued_emails(limit=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(mail.claim_queued_emails(limit=5)), 1)
+        self.assertEqual(mail.claim_queued_emails(limit=5), [])
+
+        # The worker holding the first claim died
+        QueuedEmail.objects.filter(id__in=[email.id for email in first]).update(
+            claimed_at=timezone.now() - mail.CLAIM_TIMEOUT - timedelta(seconds=1)
+        )
+        self.assertEqual({email.id for email in mail.claim_queued_emails(limit=5)}, {email.id for email in first})
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', SESSION_COOKIE_AGE=3600)
+class SessionRefreshMiddlewareTests(TestCase):
+
+    def handle(self, session_key):
+        def view(request):
+            request.session.get('theme')  # Any view that reads the session
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+        return SessionMiddleware(SessionRefreshMiddleware(view))(request)
+
+    def make_session(self, refreshed_at, **data):
+        session = SessionStore()
+        session.update({SessionRefreshMiddleware.REFRESHED_AT_KEY: refreshed_at, **data})
+        session.create()
+        return session.session_key
+
+    def test_stale_cookie_does_not_create_a_session(self):
+        response = self.handle('stalesessionkey0123456789abcdef')
+
+        # SessionMiddleware clears the dead cookie; nothing new is stored
+        self.assertEqual(response.cookies[settings.SESSION_COOKIE_NAME].value, '')
+        self.assertFalse(Session.objects.exists())
+
+    def test_signed_in_session_is_refreshed_once_the_threshold_passes(self):
+        session_key = self.make_session(time.time() - 1800, **{SESSION_KEY: '1'})
+
+        response = self.handle(session_key)
+
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        refreshed_at = SessionStore(session_key)[SessionRefreshMiddleware.REFRESHED_AT_KEY]
+        self.assertAlmostEqual(refreshed_at, time.time(), delta=5)
+
+    def test_recent_or_anonymous_sessions_are_left_alone(self):
+        recent = self.make_session(int(time.time()), **{SESSION_KEY: '1'})
+        anonymous = self.make_session(time.time() - 1800)
+
+        for session_key in (recent, anonymous):
+            self.assertNotIn(settings.SESSION_COOKIE_NAME, self.handle(session_key).cookies)
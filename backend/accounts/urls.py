@@ -18,11 +18,13 @@ from .views import (
     PasswordResetConfirmView,
     NotificationListView,
     trigger_cleanup_view,
+    cleanup_job_status_view,
     PendingApprovalsListView,
     approve_user_view,
     delete_profile_picture_view,
     VerifyEmailView,
     MarkAllNotificationsReadView,
+    notification_stream_view,
     ResendVerificationView,
     BugReportViewSet
 )
@@ -70,7 +72,9 @@ urlpatterns = [
     # Notifications
     path('notifications/', NotificationListView.as_view(), name='notifications'),
     path('notifications/mark-all-read/', MarkAllNotificationsReadView.as_view(), name='notifications_mark_all_read'),
+    path('notifications/stream/', notification_stream_view, name='notifications_stream'),
     
     # Admin Tasks
     path('admin/cleanup-inactivity/', trigger_cleanup_view, name='cleanup_inactivity'),
+    path('admin/cleanup-inactivity/<uuid:job_id>/', cleanup_job_status_view, name='cleanup_inactivity_status'),
 ] + router.urls
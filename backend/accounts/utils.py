@@ -266,58 +266,23 @@ def validate_password_strength(password):
 
 def send_email_async_safe(recipient, subject, message, html_message=None):
     """
-    Attempts to send email via Celery background tasks.
-    Falls back to synchronous sending if the Celery broker or DNS is unavailable.
-    This prevents 500 errors during registration when infrastructure (Redis) is down.
+    Queue an email for background delivery (see kindra_cbo.mail.queue_email).
+    Emails queued close together share one SMTP connection. If the Celery
+    broker is unavailable they are sent by a bounded in-process worker pool,
+    so registration never fails when infrastructure (Redis) is down.
     """
     import logging
-    from django.conf import settings
-    from django.core.mail import send_mail
-    
+    from kindra_cbo.mail import queue_email
+
     logger = logging.getLogger(__name__)
 
     try:
-        # Try to import and delay the task
-        from kindra_cbo.tasks import send_email_notification
-        send_email_notification.delay(
-            recipient=recipient,
-            subject=subject,
-            message=message,
-            html_message=html_message
-        )
-        if settings.DEBUG:
-            print(f"DEBUG: Async email queued for {recipient}")
+        queue_email(recipient, subject, message, html_message)
+        logger.debug(f"Email queued for {recipient}")
         return True
     except Exception as e:
-        # Fallback to threaded synchronous sending if Celery broker is unreachable
-        logger.warning(f"Celery delivery failed, falling back to threaded sync send for {recipient}. Error: {str(e)}")
-        if settings.DEBUG:
-            print(f"DEBUG: Celery failed ({e}), falling back to threaded sync send.")
-        
-        try:
-            import threading
-            def _send_sync():
-                try:
-                    send_mail(
-                        subject=subject,
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[recipient],
-                        html_message=html_message,
-                        fail_silently=False
-                    )
-                    logger.info(f"Threaded fallback email sent to {recipient}")
-                except Exception as sync_e:
-                    logger.error(f"Threaded fallback email failed for {recipient}: {str(sync_e)}")
-
-            # Start thread and don't join (fire and forget)
-            thread = threading.Thread(target=_send_sync)
-            thread.daemon = True
-            thread.start()
-            return True
-        except Exception as thread_e:
-            logger.error(f"Failed to start fallback thread for {recipient}: {str(thread_e)}")
-            return False
+        logger.error(f"Failed to queue email for {recipient}: {str(e)}")
+        return False
 
 
 # Export all functions
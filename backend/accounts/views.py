@@ -14,12 +14,15 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from .utils import send_email_async_safe, get_client_ip
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
 import time
-import random
 from .models import User, AuditLog, Notification, BugReport
 from .serializers import (
     UserRegistrationSerializer,
@@ -35,9 +38,12 @@ from .serializers import (
 )
 from .models import User, AuditLog, Notification, VerificationToken, BugReport
 from .permissions import IsAdminOrManagement
+from .authentication import get_user_from_token
 from kindra_cbo.throttling import RegistrationRateThrottle
+from kindra_cbo.realtime import get_broker, user_channel, format_sse
+from kindra_cbo.jobs import create_job, get_job
+from kindra_cbo.background import run_in_background
 from reporting.utils import log_analytics_event
-from reporting.models import AnalyticsEvent
 
 # Rate limiting decorator
 def rate_limit(key_prefix, limit, period):
@@ -100,56 +106,17 @@ class UserRegistrationView(generics.CreateAPIView):
         # Generate JWT tokens
         refresh = RefreshToken.for_user(user)
         
-        # Create random encouraging notification
-        ENCOURAGING_MESSAGES = [
-            ("Welcome to Kindra!", "We're thrilled to have you join our mission of creating lasting impact. Together, we can change lives!"),
-            ("A New Journey Begins", "Thank you for joining our community. Your presence alone brings hope to those we serve."),
-            ("Ready to Make a Difference?", "Welcome aboard! We can't wait to see the amazing contributions you'll bring to the Kindra family."),
-            ("Your Support Matters", "Welcome to Kindra! Every member counts in our quest to build stronger communities."),
-            ("Global Impact, Local Action", "We're glad you're here! Let's work together to make the world a better place, one step at a time.")
-        ]
-        chosen_title, chosen_msg = random.choice(ENCOURAGING_MESSAGES)
-        Notification.objects.create(
-            recipient=user,
-            title=chosen_title,
-            message=chosen_msg,
-            type=Notification.Type.SUCCESS,
-            category=Notification.Category.SYSTEM
-        )
-        
-        # Log registration
-        log_analytics_event(
-            event_type=AnalyticsEvent.EventType.VOLUNTEER_JOINED if role == 'VOLUNTEER' else 'USER_REGISTERED',
-            description=f'New {role.lower()} registered: {user.email} (Approved: {not approval_needed})',
-            user=user,
-            request=request
-        )
-        
-        # Generate Verification Token
-        verification_token = VerificationToken.objects.create(
-            user=user,
-            token_type=VerificationToken.TokenType.VERIFICATION
-        )
-
-        # Send Verification Email (Safe Async/Sync Failover)
-        verify_url = f"{settings.FRONTEND_URL}/verify?token={verification_token.token}"
-        
-        if settings.DEBUG:
-            print(f"Verification URL for {user.email}: {verify_url}")
-
-        send_email_async_safe(
-            recipient=user.email,
-            subject='Verify your email for Kindra',
-            message=f'Please verify your email by clicking: {verify_url}',
-            html_message=f'''
-            <p>Welcome to Kindra!</p>
-            <p>Please verify your email by clicking below:</p>
-            <a href="{verify_url}"
-               style="display:inline-block;padding:10px 20px;background:#007BFF;color:#fff;text-decoration:none;border-radius:5px;">
-               Verify Email
-            </a>
-            '''
-        )
+        # Welcome notification, analytics, verification token and email run in
+        # one background job once the user row is committed.
+        from .tasks import process_new_registration
+        ip_address = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')[:255]
+        transaction.on_commit(lambda: run_in_background(
+            process_new_registration,
+            user_id=str(user.id),
+            ip_address=ip_address,
+            user_agent=user_agent
+        ))
         
         # Create response
         response = Response({
@@ -774,35 +741,90 @@ class MarkAllNotificationsReadView(APIView):
             "message": f"Marked all ({updated_count}) notifications as read"
         })
 
-from django.core.management import call_command
+
+async def notification_stream_view(request):
+    """
+    Server-Sent Events stream of new notifications for the current user.
+    Replaces periodic polling of the notifications endpoint: the client opens
+    one EventSource and receives each notification as soon as it is created.
+    Browsers cannot set headers on EventSource, so the JWT is read from the
+    access_token cookie or a ?token= query parameter.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Streaming requires the ASGI server.'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    raw_token = request.GET.get('token') or request.COOKIES.get('access_token')
+    user = await sync_to_async(get_user_from_token)(raw_token)
+    if user is None:
+        return JsonResponse(
+            {'error': 'Authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    keepalive = settings.REALTIME_KEEPALIVE_SECONDS
+    unread_count = await Notification.objects.filter(recipient=user, read=False).acount()
+
+    async def event_stream():
+        subscription = await get_broker().subscribe(user_channel(user.id))
+        try:
+            yield 'retry: 5000\n\n'
+            yield format_sse({'unread_count': unread_count}, event='ready')
+            while True:
+                event = await subscription.get(timeout=keepalive)
+                if event is None:
+                    # Comment frame keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                if event.get('type') == 'notification':
+                    notification = event['notification']
+                    yield format_sse(notification, event='notification', event_id=notification['id'])
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    return response
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsAdminOrManagement])
 def trigger_cleanup_view(request):
     """
-    Manually trigger the inactivity cleanup task.
+    Enqueue the inactivity cleanup task.
+    Returns a job id immediately; poll cleanup_job_status_view for progress.
     """
-    try:
-        call_command('cleanup_inactive_users')
-        
-        # Log manual cleanup trigger
-        from reporting.utils import log_analytics_event
-        log_analytics_event(
-            event_type='SYSTEM_CLEANUP_TRIGGERED',
-            description='Administrator manually triggered user inactivity cleanup engine.',
-            user=request.user,
-            request=request
-        )
-        
-        return Response({
-            'success': True, 
-            'message': 'Inactivity cleanup task executed successfully. Notifications sent and expired profiles removed.'
-        })
-    except Exception as e:
-        return Response({
-            'success': False, 
-            'message': f'Failed to execute cleanup: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    from .tasks import cleanup_inactive_users
+
+    job = create_job('cleanup_inactive_users', user=request.user)
+    run_in_background(cleanup_inactive_users, job_id=job['id'])
+
+    # Log manual cleanup trigger
+    log_analytics_event(
+        event_type='SYSTEM_CLEANUP_TRIGGERED',
+        description='Administrator manually triggered user inactivity cleanup engine.',
+        user=request.user,
+        request=request,
+        event_data={'job_id': job['id']}
+    )
+
+    return Response({
+        'success': True,
+        'message': 'Inactivity cleanup task queued. Notifications and expired profile removal will run in the background.',
+        'job': get_job(job['id']) or job
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsAdminOrManagement])
+def cleanup_job_status_view(request, job_id):
+    """Progress of a queued inactivity cleanup job"""
+    job = get_job(job_id)
+    if job is None or job.get('kind') != 'cleanup_inactive_users':
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
 
 
 class PendingApprovalsListView(generics.ListAPIView):
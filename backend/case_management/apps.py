@@ -5,3 +5,6 @@ class CaseManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'case_management'
     verbose_name = 'Case Management'
+
+    def ready(self):
+        import case_management.signals
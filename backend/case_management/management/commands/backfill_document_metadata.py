@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from case_management.models import Document
+from case_management.services import DocumentUploadService
+
+
+class Command(BaseCommand):
+    help = 'Records file size and checksum for documents uploaded before they were tracked'
+
+    def handle(self, *args, **options):
+        documents = Document.objects.filter(file_size__isnull=True).exclude(file='')
+        self.stdout.write(f"Backfilling {documents.count()} documents...")
+
+        updated = failed = 0
+        for document in documents.iterator():
+            try:
+                with document.file.open('rb') as file:
+                    metadata = DocumentUploadService.file_metadata(file)
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f"Could not read {document.file.name}: {str(e)}"))
+                continue
+            Document.objects.filter(pk=document.pk).update(**metadata)
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill complete: {updated} updated, {failed} unreadable."))
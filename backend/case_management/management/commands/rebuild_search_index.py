@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from case_management.models import Case, CaseNote, Child, Family, SearchEntry
+from case_management.services import CaseSearchService
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the case management search index from families, children, cases and notes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Records indexed per bulk upsert'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        started = time.monotonic()
+
+        deleted, _ = SearchEntry.objects.all().delete()
+        self.stdout.write(f"Cleared {deleted} search entries")
+
+        sources = [
+            Family.objects.all(),
+            Child.objects.select_related('family'),
+            Case.objects.all(),
+            CaseNote.objects.select_related('case'),
+        ]
+        for queryset in sources:
+            indexed = CaseSearchService.index_queryset(queryset, chunk_size=chunk_size)
+            self.stdout.write(f"Indexed {indexed} {queryset.model._meta.verbose_name_plural}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index rebuilt in {time.monotonic() - started:.1f}s"
+        ))
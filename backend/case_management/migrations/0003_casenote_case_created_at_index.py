@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('case_management', '0002_alter_assessment_overall_score_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='casenote',
+            index=models.Index(fields=['case', 'created_at'], name='case_manage_case_id_b56af5_idx'),
+        ),
+    ]
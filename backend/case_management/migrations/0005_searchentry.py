@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:36
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+POSTGRES_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX case_management_search_vector_idx ON case_management_searchentry USING gin (search_vector)',
+    'CREATE INDEX case_management_search_title_trgm_idx ON case_management_searchentry USING gin (title gin_trgm_ops)',
+    'CREATE INDEX case_management_search_keywords_trgm_idx ON case_management_searchentry USING gin (keywords gin_trgm_ops)',
+]
+
+
+def create_postgres_indexes(apps, schema_editor):
+    # Full-text and trigram indexes only exist on PostgreSQL
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_INDEXES:
+            schema_editor.execute(statement)
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in ['search_vector', 'search_title_trgm', 'search_keywords_trgm']:
+            schema_editor.execute(f'DROP INDEX IF EXISTS case_management_{name}_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('case_management', '0004_codesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('FAMILY', 'Family'), ('CHILD', 'Child'), ('CASE', 'Case'), ('NOTE', 'Case Note')], max_length=10)),
+                ('object_id', models.UUIDField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('keywords', models.CharField(blank=True, help_text='Codes and phone numbers, upper-cased without spaces', max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('link', models.CharField(blank=True, max_length=255)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'search entry',
+                'verbose_name_plural': 'search entries',
+                'indexes': [models.Index(fields=['object_id'], name='case_manage_object__0afe6c_idx')],
+                'unique_together': {('entity_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('case_management', '0005_searchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='checksum',
+            field=models.CharField(blank=True, help_text='e.g. sha256:<hex> or md5:<hex>', max_length=80),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Size in bytes', null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('case_management', '0006_document_file_size_checksum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='family',
+            index=models.Index(fields=['latitude', 'longitude'], name='case_manage_latitud_f6fd3e_idx'),
+        ),
+    ]
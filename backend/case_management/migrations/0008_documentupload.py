@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-18 23:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('case_management', '0007_family_case_manage_latitud_f6fd3e_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentUpload',
+            fields=[
+                ('id', models.UUIDField(editable=False, help_text='Upload id carried in the signed token', primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Storage name of the file', max_length=255)),
+                ('file_size', models.PositiveBigIntegerField(blank=True, help_text='Size in bytes', null=True)),
+                ('checksum', models.CharField(blank=True, max_length=80)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('received_at', models.DateTimeField(blank=True, null=True)),
+                ('used_at', models.DateTimeField(blank=True, help_text='When a document was registered from it', null=True)),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'document upload',
+                'verbose_name_plural': 'document uploads',
+                'indexes': [models.Index(fields=['created_at'], name='case_manage_created_9b56bf_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def backfill_search_index(apps, schema_editor):
+    # Signals only index rows saved after 0005, so fill in everything older
+    from case_management.services import CaseSearchService
+
+    SearchEntry = apps.get_model('case_management', 'SearchEntry')
+    Family = apps.get_model('case_management', 'Family')
+    Child = apps.get_model('case_management', 'Child')
+    Case = apps.get_model('case_management', 'Case')
+    CaseNote = apps.get_model('case_management', 'CaseNote')
+    for queryset in [
+        Family.objects.all(),
+        Child.objects.select_related('family'),
+        Case.objects.all(),
+        CaseNote.objects.select_related('case'),
+    ]:
+        CaseSearchService.index_queryset(queryset, entry_model=SearchEntry)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('case_management', '0008_documentupload'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ Case Management Models
 Family and child welfare case management system
 """
 
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -90,6 +91,7 @@ class Family(models.Model):
             models.Index(fields=['vulnerability_level']),
             models.Index(fields=['assigned_case_worker']),
             models.Index(fields=['county']),
+            models.Index(fields=['latitude', 'longitude']),
         ]
     
     def __str__(self):
@@ -330,6 +332,10 @@ class Document(models.Model):
     description = models.TextField(blank=True)
     file = models.FileField(upload_to='case_documents/%Y/%m/')
     
+    # Recorded at upload so listings never have to ask the storage backend
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, help_text=_('Size in bytes'))
+    checksum = models.CharField(max_length=80, blank=True, help_text=_('e.g. sha256:<hex> or md5:<hex>'))
+    
     # Consent tracking
     consent_obtained = models.BooleanField(default=False)
     consent_date = models.DateField(null=True, blank=True)
@@ -354,6 +360,36 @@ class Document(models.Model):
         return f"{self.title} - {self.document_type}"
 
 
+class DocumentUpload(models.Model):
+    """
+    A direct-to-storage document upload, from the signed token being issued
+    until a Document is registered from it. Kept in the database so every
+    process sees the received file and a token registers only one document.
+    """
+    
+    id = models.UUIDField(primary_key=True, editable=False, help_text=_('Upload id carried in the signed token'))
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_uploads')
+    name = models.CharField(max_length=255, help_text=_('Storage name of the file'))
+    
+    # Recorded by the local stand-in once the file has been received
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, help_text=_('Size in bytes'))
+    checksum = models.CharField(max_length=80, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    received_at = models.DateTimeField(null=True, blank=True)
+    used_at = models.DateTimeField(null=True, blank=True, help_text=_('When a document was registered from it'))
+    
+    class Meta:
+        verbose_name = _('document upload')
+        verbose_name_plural = _('document uploads')
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({'used' if self.used_at else 'pending'})"
+
+
 class CaseNote(models.Model):
     """
     Case progress notes and updates
@@ -372,6 +408,65 @@ class CaseNote(models.Model):
         verbose_name = _('case note')
         verbose_name_plural = _('case notes')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['case', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.case.case_number} - {self.created_at.date()}"
+
+
+class CodeSequence(models.Model):
+    """
+    Counter behind sequential family codes and case numbers, one row per
+    prefix and year. Used where the database has no native sequences.
+    """
+    
+    prefix = models.CharField(max_length=10)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = _('code sequence')
+        verbose_name_plural = _('code sequences')
+        unique_together = ['prefix', 'year']
+    
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: {self.last_value}"
+
+
+class SearchEntry(models.Model):
+    """
+    Denormalised search document for one family, child, case or case note.
+    Kept in sync by signals so every entity type is searched in one query;
+    search_vector is only populated on PostgreSQL.
+    """
+    
+    class EntityType(models.TextChoices):
+        FAMILY = 'FAMILY', _('Family')
+        CHILD = 'CHILD', _('Child')
+        CASE = 'CASE', _('Case')
+        NOTE = 'NOTE', _('Case Note')
+    
+    entity_type = models.CharField(max_length=10, choices=EntityType.choices)
+    object_id = models.UUIDField()
+    
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    keywords = models.CharField(max_length=255, blank=True, help_text=_('Codes and phone numbers, upper-cased without spaces'))
+    body = models.TextField(blank=True)
+    link = models.CharField(max_length=255, blank=True)
+    
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('search entry')
+        verbose_name_plural = _('search entries')
+        unique_together = ['entity_type', 'object_id']
+        indexes = [
+            models.Index(fields=['object_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entity_type}: {self.title}"
@@ -0,0 +1,124 @@
+"""
+Case Management PDF Rendering
+Pure reportlab rendering of case summaries and assessment reports.
+
+Functions here take plain dicts (built by CaseExportService) and return PDF
+bytes. They must not import Django so batch exports can run them in spawned
+worker processes.
+"""
+
+import io
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+def _text(value, default='N/A'):
+    """Escape free text for Paragraph, which otherwise parses it as markup"""
+    return escape(str(value)) if value else default
+
+
+def render_assessment_report(data):
+    """
+    Generate a formal PDF report of a family/child assessment
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # Header
+    elements.append(Paragraph("KINDRA CBO - ASSESSMENT REPORT", styles['Title']))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    # Basic Info
+    info_data = [
+        ["Assessment ID", data['id'][:8]],
+        ["Date", data['date']],
+        ["Type", data['type']],
+        ["Target", data['target']],
+        ["Overall Score", str(data['overall_score'])]
+    ]
+
+    t = Table(info_data, colWidths=[1.5*inch, 4*inch])
+    t.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
+        ('BACKGROUND', (0,0), (0,-1), colors.whitesmoke),
+    ]))
+    elements.append(t)
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # Findings
+    elements.append(Paragraph("Assessment Findings", styles['Heading2']))
+    elements.append(Paragraph(_text(data['findings'], "No findings recorded."), styles['Normal']))
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # Recommendation
+    elements.append(Paragraph("Recommendations", styles['Heading2']))
+    elements.append(Paragraph(_text(data['recommendations'], "No specific recommendations provided."), styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_case_summary(data):
+    """
+    Generate a structured PDF summary of a case
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    # Header
+    elements.append(Paragraph(f"CASE SUMMARY: {_text(data['case_number'])}", styles['Title']))
+    elements.append(Paragraph(_text(data['title']), styles['Heading2']))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    # Status Info
+    table_data = [
+        ["Status", data['status']],
+        ["Priority", data['priority']],
+        ["Opened Date", data['opened_date']],
+        ["Family", data['family']],
+        ["Assigned To", data['assigned_to']]
+    ]
+    t = Table(table_data, colWidths=[1.5*inch, 4*inch])
+    t.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
+    ]))
+    elements.append(t)
+    elements.append(Spacer(1, 0.4 * inch))
+
+    # Description
+    elements.append(Paragraph("Case Description", styles['Heading3']))
+    elements.append(Paragraph(_text(data['description']), styles['Normal']))
+    elements.append(Spacer(1, 0.4 * inch))
+
+    # Children in the household
+    if data['children']:
+        elements.append(Paragraph("Children", styles['Heading3']))
+        for child in data['children']:
+            elements.append(Paragraph(f"{_text(child['name'])} ({child['age']} yrs, {child['gender']})", styles['Normal']))
+        elements.append(Spacer(1, 0.4 * inch))
+
+    # Milestones / Notes
+    elements.append(Paragraph("Recent Milestones & Notes", styles['Heading3']))
+    if data['notes']:
+        for note in data['notes']:
+            text = f"<b>{note['date']}</b>: {_text(note['text'], '')}"
+            if note['is_milestone']:
+                text = f"[MILESTONE] {text}"
+            elements.append(Paragraph(text, styles['Normal']))
+            elements.append(Spacer(1, 0.1 * inch))
+    else:
+        elements.append(Paragraph("No notes or milestones recorded.", styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
@@ -2,8 +2,10 @@
 Case Management Serializers
 """
 
+from django.conf import settings
 from rest_framework import serializers
-from .models import Family, Child, Case, Assessment, Document, CaseNote
+from .models import Family, Child, Case, Assessment, Document, CaseNote, SearchEntry
+from .services import CaseBatchExportService, DocumentUploadError, DocumentUploadService, FamilyImportService
 
 
 class ChildSerializer(serializers.ModelSerializer):
@@ -28,6 +30,30 @@ class FamilySerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'family_code', 'registration_date', 'created_at', 'updated_at')
 
 
+class FamilyListSerializer(serializers.ModelSerializer):
+    """
+    Summary shape for family lists: no nested children, counts come from
+    annotations added by the list view's queryset
+    """
+    assigned_case_worker_name = serializers.CharField(source='assigned_case_worker.get_full_name', read_only=True)
+    active_children_count = serializers.IntegerField(read_only=True)
+    open_cases_count = serializers.IntegerField(read_only=True)
+    distance_km = serializers.FloatField(read_only=True, help_text='Present on ?near= queries')
+
+    class Meta:
+        model = Family
+        fields = [
+            'id', 'family_code', 'primary_contact_name', 'primary_contact_phone',
+            'county', 'sub_county', 'ward', 'latitude', 'longitude',
+            'vulnerability_score', 'vulnerability_level',
+            'total_members', 'children_count', 'adults_count', 'monthly_income',
+            'assigned_case_worker', 'assigned_case_worker_name',
+            'is_active', 'registration_date', 'last_assessment_date', 'created_at', 'updated_at',
+            'active_children_count', 'open_cases_count', 'distance_km',
+        ]
+        read_only_fields = fields
+
+
 class CaseNoteSerializer(serializers.ModelSerializer):
     """Serializer for Case Notes"""
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
@@ -39,8 +65,14 @@ class CaseNoteSerializer(serializers.ModelSerializer):
 
 
 class CaseSerializer(serializers.ModelSerializer):
-    """Serializer for Case model"""
-    notes = CaseNoteSerializer(many=True, read_only=True)
+    """
+    Serializer for Case model. Only the latest notes are inlined; the full
+    history is paged through the case's notes timeline endpoint.
+    """
+    RECENT_NOTES_LIMIT = 5
+
+    recent_notes = serializers.SerializerMethodField()
+    notes_count = serializers.SerializerMethodField()
     family_name = serializers.CharField(source='family.primary_contact_name', read_only=True)
     assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True)
     
@@ -49,6 +81,43 @@ class CaseSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id', 'case_number', 'opened_date', 'created_at', 'updated_at')
 
+    def get_recent_notes(self, obj):
+        # Prefetched by the case views; fall back for freshly saved cases
+        notes = getattr(obj, 'recent_notes', None)
+        if notes is None:
+            notes = obj.notes.select_related('created_by').order_by('-created_at', '-id')[:self.RECENT_NOTES_LIMIT]
+        return CaseNoteSerializer(notes, many=True, context=self.context).data
+
+    def get_notes_count(self, obj):
+        # Annotated by the case views; fall back for freshly saved cases
+        if hasattr(obj, 'notes_count'):
+            return obj.notes_count
+        return obj.notes.count()
+
+
+class CaseListSerializer(serializers.ModelSerializer):
+    """
+    Summary shape for case lists: notes are reduced to a count and the time
+    of the latest one, both annotated by the list view's queryset. The
+    description and plan stay in, as case cards and the map show them.
+    """
+    family_code = serializers.CharField(source='family.family_code', read_only=True)
+    family_name = serializers.CharField(source='family.primary_contact_name', read_only=True)
+    assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True)
+    notes_count = serializers.IntegerField(read_only=True)
+    last_note_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = Case
+        fields = [
+            'id', 'case_number', 'title', 'description', 'intervention_plan',
+            'family', 'family_code', 'family_name',
+            'priority', 'status', 'assigned_to', 'assigned_to_name',
+            'opened_date', 'target_closure_date', 'closed_date', 'created_at', 'updated_at',
+            'notes_count', 'last_note_at',
+        ]
+        read_only_fields = fields
+
 
 class AssessmentSerializer(serializers.ModelSerializer):
     """Serializer for Assessment model"""
@@ -62,17 +131,21 @@ class AssessmentSerializer(serializers.ModelSerializer):
 
 
 class DocumentSerializer(serializers.ModelSerializer):
-    """Serializer for Document model"""
+    """
+    Serializer for Document model. Files arrive either as a multipart upload
+    or, for large scans, as an `upload_token` from a direct-to-storage upload.
+    """
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
     family_name = serializers.CharField(source='family.primary_contact_name', read_only=True)
     child_name = serializers.SerializerMethodField()
     file_name = serializers.SerializerMethodField()
-    file_size = serializers.SerializerMethodField()
+    file = serializers.FileField(required=False)
+    upload_token = serializers.CharField(write_only=True, required=False)
     
     class Meta:
         model = Document
         fields = '__all__'
-        read_only_fields = ('id', 'uploaded_at', 'uploaded_by')
+        read_only_fields = ('id', 'uploaded_at', 'uploaded_by', 'file_size', 'checksum')
 
     def get_child_name(self, obj):
         if obj.child:
@@ -84,10 +157,77 @@ class DocumentSerializer(serializers.ModelSerializer):
             return obj.file.name.split('/')[-1]
         return ""
 
-    def get_file_size(self, obj):
-        if obj.file:
+    def validate(self, attrs):
+        token = attrs.pop('upload_token', None)
+        if token:
+            if attrs.get('file'):
+                raise serializers.ValidationError('Send either a file or an upload_token, not both.')
+            request = self.context['request']
             try:
-                return obj.file.size
-            except:
-                return 0
-        return 0
+                self._upload = DocumentUploadService.complete(token, request.user)
+            except DocumentUploadError as e:
+                raise serializers.ValidationError({'upload_token': str(e)})
+        elif attrs.get('file'):
+            attrs.update(DocumentUploadService.file_metadata(attrs['file']))
+        elif self.instance is None:
+            raise serializers.ValidationError({'file': 'A file or an upload_token is required.'})
+        return attrs
+
+    def create(self, validated_data):
+        upload = getattr(self, '_upload', None)
+        if upload is None:
+            return super().create(validated_data)
+        # The file is already in storage; just point the record at it
+        document = Document(**validated_data, file_size=upload['file_size'], checksum=upload['checksum'])
+        document.file.name = upload['name']
+        document.save()
+        return document
+
+    def update(self, instance, validated_data):
+        upload = getattr(self, '_upload', None)
+        if upload is not None:
+            instance.file.name = upload['name']
+            validated_data.update(file_size=upload['file_size'], checksum=upload['checksum'])
+        return super().update(instance, validated_data)
+
+
+class DocumentUploadRequestSerializer(serializers.Serializer):
+    """File details a client sends before uploading straight to storage"""
+    file_name = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+
+
+class SearchHitSerializer(serializers.ModelSerializer):
+    """One ranked result from the case management search"""
+    score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchEntry
+        fields = ['entity_type', 'object_id', 'title', 'subtitle', 'link', 'score']
+
+
+class CaseBatchExportSerializer(serializers.Serializer):
+    """Which documents a batch PDF export should include"""
+    kind = serializers.ChoiceField(choices=CaseBatchExportService.KINDS)
+    county = serializers.CharField(required=False, allow_blank=True)
+    status = serializers.ChoiceField(choices=Case.Status.choices, required=False)
+    priority = serializers.ChoiceField(choices=Case.Priority.choices, required=False)
+    assigned_to = serializers.UUIDField(required=False)
+    family = serializers.UUIDField(required=False)
+    assessment_type = serializers.ChoiceField(choices=Assessment.AssessmentType.choices, required=False)
+
+
+class FamilyImportSerializer(serializers.Serializer):
+    """A partner registry to import as families and children"""
+    file = serializers.FileField()
+    dry_run = serializers.BooleanField(default=False, help_text='Validate and report errors without saving')
+
+    def validate_file(self, value):
+        extension = value.name.rsplit('.', 1)[-1].lower() if '.' in value.name else ''
+        if extension not in FamilyImportService.FORMATS:
+            raise serializers.ValidationError("Upload a .csv or .xlsx file.")
+        if value.size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"File too large. Maximum size is {settings.DOCUMENT_MAX_UPLOAD_SIZE // (1024 * 1024)}MB."
+            )
+        return value
@@ -1,120 +1,969 @@
 """
-Case Management Export Services
-Logic for generating PDF summaries of assessments and cases
+Case Management Services
+Code allocation, search, dashboard statistics, PDF exports, document uploads,
+bulk imports and the family map
 """
 
+import csv
+import datetime
+import hashlib
 import io
+import itertools
 import logging
-from django.utils import timezone
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import openpyxl
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files import File
 from django.core.files.base import ContentFile
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from django.core.files.storage import default_storage, storages
+from django.db import IntegrityError, ProgrammingError, connection, models, transaction
+from django.db.models import Count, ExpressionWrapper, F, Prefetch, Q, Value
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from kindra_cbo.geo import MapLayer
+
+from .models import Assessment, Case, CaseNote, Child, CodeSequence, DocumentUpload, Family, SearchEntry
+from .pdf_rendering import render_assessment_report, render_case_summary
 
 logger = logging.getLogger('kindra_cbo')
 
+
+class CodeSequenceService:
+    """
+    Hands out sequential, collision-free codes such as FAM-2026-00042.
+
+    Each prefix has its own counter per year. On PostgreSQL the counter is a
+    native sequence (nextval never blocks and never repeats); elsewhere it is
+    a CodeSequence row incremented with a single UPDATE, which holds the row
+    lock only for the duration of the allocation.
+    """
+
+    FAMILY_CODE_PREFIX = 'FAM'
+    CASE_NUMBER_PREFIX = 'CASE'
+
+    # Wider than the four/six character random suffixes used before, so new
+    # codes can never collide with legacy ones
+    DIGITS = 5
+
+    @staticmethod
+    def format_code(prefix, year, value):
+        return f"{prefix}-{year}-{value:0{CodeSequenceService.DIGITS}d}"
+
+    @classmethod
+    def next_codes(cls, prefix, count=1, year=None):
+        """Allocate `count` codes for `prefix` in one atomic step"""
+        if not re.fullmatch(r'[A-Z]+', prefix):
+            raise ValueError(f"Invalid code prefix: {prefix}")
+        if count < 1:
+            return []
+        year = year or timezone.localdate().year
+        if connection.vendor == 'postgresql':
+            values = cls._allocate_from_sequence(prefix, year, count)
+        else:
+            values = cls._allocate_from_counter(prefix, year, count)
+        return [cls.format_code(prefix, year, value) for value in values]
+
+    @classmethod
+    def next_code(cls, prefix, year=None):
+        return cls.next_codes(prefix, 1, year)[0]
+
+    @classmethod
+    def next_family_code(cls):
+        return cls.next_code(cls.FAMILY_CODE_PREFIX)
+
+    @classmethod
+    def next_case_number(cls):
+        return cls.next_code(cls.CASE_NUMBER_PREFIX)
+
+    @staticmethod
+    def _allocate_from_counter(prefix, year, count):
+        counter = CodeSequence.objects.filter(prefix=prefix, year=year)
+        with transaction.atomic():
+            if not counter.update(last_value=F('last_value') + count):
+                try:
+                    with transaction.atomic():
+                        CodeSequence.objects.create(prefix=prefix, year=year, last_value=count)
+                    return range(1, count + 1)
+                except IntegrityError:
+                    # Another worker opened this year's counter first
+                    counter.update(last_value=F('last_value') + count)
+            last_value = counter.values_list('last_value', flat=True).get()
+        return range(last_value - count + 1, last_value + 1)
+
+    @staticmethod
+    def _allocate_from_sequence(prefix, year, count):
+        name = f"case_management_code_seq_{prefix.lower()}_{year}"
+
+        def nextval():
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [name, count])
+                return [row[0] for row in cursor.fetchall()]
+
+        try:
+            return nextval()
+        except ProgrammingError:
+            # First code of the year: create the sequence, tolerating a
+            # concurrent worker doing the same
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {name}')
+            except (IntegrityError, ProgrammingError):
+                pass
+            return nextval()
+
+class CaseSearchService:
+    """
+    Ranked search across families, children, cases and case notes, served
+    from the SearchEntry table so one query covers every entity type.
+
+    On PostgreSQL an entry matches on its weighted tsvector (GIN indexed), on
+    trigram similarity of the title for misspelt names, or on a substring of
+    its keywords for partial phone numbers and codes (trigram GIN indexed).
+    Other databases fall back to icontains matching scored per field.
+    """
+
+    # Names and Swahili text should not be stemmed as English
+    SEARCH_CONFIG = 'simple'
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+    MAX_TERMS = 10
+
+    @staticmethod
+    def normalize_keywords(*values):
+        return ' '.join(re.sub(r'\s+', '', value).upper() for value in values if value)
+
+    @classmethod
+    def document(cls, instance):
+        """Return (entity_type, fields) describing `instance` for the index"""
+        # Matched by name so the historical models of a data migration index the same way
+        model_name = instance._meta.model_name
+        if model_name == 'family':
+            return SearchEntry.EntityType.FAMILY, {
+                'title': instance.primary_contact_name,
+                'subtitle': f"{instance.family_code} · {instance.county}",
+                'keywords': cls.normalize_keywords(instance.family_code, instance.primary_contact_phone),
+                'body': ' '.join(filter(None, [
+                    instance.sub_county, instance.ward, instance.village,
+                    instance.physical_address, instance.primary_contact_email,
+                ])),
+                'link': f"/dashboard/cases/families/{instance.id}",
+            }
+        if model_name == 'child':
+            return SearchEntry.EntityType.CHILD, {
+                'title': ' '.join(filter(None, [instance.first_name, instance.middle_name, instance.last_name])),
+                'subtitle': f"{instance.family.family_code} · {instance.family.primary_contact_name}",
+                'keywords': cls.normalize_keywords(instance.birth_certificate_number),
+                'body': ' '.join(filter(None, [instance.school_name, instance.guardian_name])),
+                'link': f"/dashboard/cases/families/{instance.family_id}",
+            }
+        if model_name == 'case':
+            return SearchEntry.EntityType.CASE, {
+                'title': instance.title,
+                'subtitle': f"{instance.case_number} · {instance.get_status_display()}",
+                'keywords': cls.normalize_keywords(instance.case_number),
+                'body': ' '.join(filter(None, [instance.description, instance.intervention_plan])),
+                'link': f"/dashboard/cases/{instance.id}",
+            }
+        if model_name == 'casenote':
+            return SearchEntry.EntityType.NOTE, {
+                'title': f"Note on {instance.case.case_number}",
+                'subtitle': instance.case.title,
+                'keywords': cls.normalize_keywords(instance.case.case_number),
+                'body': instance.note,
+                'link': f"/dashboard/cases/{instance.case_id}",
+            }
+        raise TypeError(f"{type(instance).__name__} is not searchable")
+
+    @classmethod
+    def index(cls, instances, entry_model=SearchEntry):
+        """
+        Create or refresh the search entries for `instances`. Migrations pass
+        their historical SearchEntry as `entry_model`.
+        """
+        entries = []
+        for instance in instances:
+            entity_type, fields = cls.document(instance)
+            for name in ('title', 'subtitle', 'keywords'):
+                fields[name] = fields[name][:255]
+            entries.append(entry_model(entity_type=entity_type, object_id=instance.pk, **fields))
+        if not entries:
+            return
+
+        entry_model.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['entity_type', 'object_id'],
+            update_fields=['title', 'subtitle', 'keywords', 'body', 'link', 'updated_at'],
+        )
+        if connection.vendor == 'postgresql':
+            entry_model.objects.filter(object_id__in=[entry.object_id for entry in entries]).update(
+                search_vector=(
+                    SearchVector('title', weight='A', config=cls.SEARCH_CONFIG)
+                    + SearchVector('keywords', weight='A', config=cls.SEARCH_CONFIG)
+                    + SearchVector('subtitle', weight='B', config=cls.SEARCH_CONFIG)
+                    + SearchVector('body', weight='C', config=cls.SEARCH_CONFIG)
+                )
+            )
+
+    @classmethod
+    def index_queryset(cls, queryset, chunk_size=1000, entry_model=SearchEntry):
+        """Index every row of `queryset` in bulk upserts of `chunk_size`; returns the count"""
+        indexed = 0
+        chunk = []
+        for instance in queryset.order_by().iterator(chunk_size=chunk_size):
+            chunk.append(instance)
+            if len(chunk) == chunk_size:
+                cls.index(chunk, entry_model)
+                indexed += len(chunk)
+                chunk = []
+        cls.index(chunk, entry_model)
+        return indexed + len(chunk)
+
+    @classmethod
+    def index_dependents(cls, instance, update_fields=None, chunk_size=500):
+        """
+        Refresh entries that copy fields of `instance`: children show their
+        family's code and name, notes their case's number and title
+        """
+        if isinstance(instance, Family):
+            model, relation, fields = Child, 'family', {'family_code', 'primary_contact_name'}
+        elif isinstance(instance, Case):
+            model, relation, fields = CaseNote, 'case', {'case_number', 'title'}
+        else:
+            return
+        if update_fields is not None and not fields & set(update_fields):
+            return
+
+        chunk = []
+        for dependent in model.objects.filter(**{relation: instance}).order_by().iterator(chunk_size=chunk_size):
+            # Reuse the saved instance rather than fetching it per row
+            setattr(dependent, relation, instance)
+            chunk.append(dependent)
+            if len(chunk) == chunk_size:
+                cls.index(chunk)
+                chunk = []
+        cls.index(chunk)
+
+    @staticmethod
+    def remove(instance):
+        SearchEntry.objects.filter(object_id=instance.pk).delete()
+
+    @classmethod
+    def matching(cls, text, entity_types=None):
+        """SearchEntry queryset matching `text`, annotated with a relevance score"""
+        entries = SearchEntry.objects.all()
+        if entity_types:
+            entries = entries.filter(entity_type__in=entity_types)
+        keywords = cls.normalize_keywords(text)
+
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(text, config=cls.SEARCH_CONFIG, search_type='websearch')
+            return entries.filter(
+                Q(search_vector=query)
+                | Q(TrigramSimilar(F('title'), text))
+                | Q(keywords__contains=keywords)
+            ).annotate(
+                score=ExpressionWrapper(
+                    SearchRank(F('search_vector'), query) + TrigramSimilarity('title', text),
+                    output_field=models.FloatField(),
+                )
+            )
+
+        # Portable fallback: every term must appear somewhere, scored by where
+        match = Q()
+        score = Value(0.0)
+        for term in text.split()[:cls.MAX_TERMS]:
+            keyword = cls.normalize_keywords(term)
+            match &= (
+                Q(title__icontains=term) | Q(keywords__contains=keyword)
+                | Q(subtitle__icontains=term) | Q(body__icontains=term)
+            )
+            score = score + models.Case(
+                models.When(Q(title__icontains=term) | Q(keywords__contains=keyword), then=Value(1.0)),
+                models.When(subtitle__icontains=term, then=Value(0.4)),
+                models.When(body__icontains=term, then=Value(0.2)),
+                default=Value(0.0),
+                output_field=models.FloatField(),
+            )
+        return entries.filter(match).annotate(score=score)
+
+    @classmethod
+    def search(cls, text, entity_types=None, limit=None):
+        """Best-ranked hits for `text` across entity types"""
+        limit = min(limit or cls.DEFAULT_LIMIT, cls.MAX_LIMIT)
+        return list(
+            cls.matching(text, entity_types)
+            .defer('body', 'search_vector')
+            .order_by('-score', '-updated_at')[:limit]
+        )
+
+
+class CaseStatisticsService:
+    """
+    Dashboard counters for case management. Each table is read once with a
+    GROUP BY and conditional counts; the totals and the per-county and
+    per-case-worker breakdowns are all folded from those grouped rows. The
+    result is cached briefly and dropped whenever a family, child or case
+    is written.
+    """
+
+    CACHE_KEY = 'case_management:statistics'
+    CACHE_TTL = 60
+
+    @classmethod
+    def get(cls):
+        stats = cache.get(cls.CACHE_KEY)
+        if stats is None:
+            stats = cls.compute()
+            cache.set(cls.CACHE_KEY, stats, cls.CACHE_TTL)
+        return stats
+
+    @classmethod
+    def invalidate(cls):
+        # After commit, so a concurrent reader can't re-cache the old counts
+        transaction.on_commit(lambda: cache.delete(cls.CACHE_KEY))
+
+    @staticmethod
+    def compute():
+        counties = {}
+        case_workers = {}
+
+        def county_row(county):
+            return counties.setdefault(county, {
+                'county': county, 'families': 0, 'critical_families': 0,
+                'children': 0, 'cases': 0, 'open_cases': 0,
+            })
+
+        family_rows = Family.objects.order_by().values('county').annotate(
+            active=Count('pk', filter=Q(is_active=True)),
+            critical=Count('pk', filter=Q(vulnerability_level=Family.VulnerabilityLevel.CRITICAL)),
+        )
+        for row in family_rows:
+            entry = county_row(row['county'])
+            entry['families'] = row['active']
+            entry['critical_families'] = row['critical']
+
+        child_rows = Child.objects.filter(is_active=True).order_by().values('family__county').annotate(
+            active=Count('pk'),
+        )
+        for row in child_rows:
+            county_row(row['family__county'])['children'] = row['active']
+
+        case_rows = Case.objects.order_by().values(
+            'family__county', 'assigned_to', 'assigned_to__first_name', 'assigned_to__last_name'
+        ).annotate(
+            total=Count('pk'),
+            open=Count('pk', filter=Q(status=Case.Status.OPEN)),
+            high=Count('pk', filter=Q(priority=Case.Priority.HIGH)),
+        )
+        for row in case_rows:
+            entry = county_row(row['family__county'])
+            entry['cases'] += row['total']
+            entry['open_cases'] += row['open']
+
+            worker_id = row['assigned_to']
+            name = f"{row['assigned_to__first_name'] or ''} {row['assigned_to__last_name'] or ''}".strip()
+            worker = case_workers.setdefault(worker_id, {
+                'case_worker': str(worker_id) if worker_id else None,
+                'name': name if worker_id else 'Unassigned',
+                'cases': 0, 'open_cases': 0, 'high_priority_cases': 0,
+            })
+            worker['cases'] += row['total']
+            worker['open_cases'] += row['open']
+            worker['high_priority_cases'] += row['high']
+
+        by_county = sorted(counties.values(), key=lambda entry: entry['county'])
+        by_case_worker = sorted(case_workers.values(), key=lambda entry: -entry['cases'])
+        return {
+            'total_families': sum(entry['families'] for entry in by_county),
+            'total_children': sum(entry['children'] for entry in by_county),
+            'total_cases': sum(entry['cases'] for entry in by_county),
+            'open_cases': sum(entry['open_cases'] for entry in by_county),
+            'high_priority_cases': sum(entry['high_priority_cases'] for entry in by_case_worker),
+            'critical_families': sum(entry['critical_families'] for entry in by_county),
+            'by_county': by_county,
+            'by_case_worker': by_case_worker,
+        }
+
+
 class CaseExportService:
     """
     Service class for exporting case management data
     """
 
+    RECENT_NOTES_LIMIT = 10
+
     @staticmethod
-    def generate_assessment_report_pdf(assessment):
+    def assessment_data(assessment):
+        """Plain-data snapshot of an assessment for the PDF renderer"""
+        return {
+            'id': str(assessment.id),
+            'date': assessment.assessment_date.strftime('%d %b %Y'),
+            'type': assessment.assessment_type,
+            'target': assessment.family.primary_contact_name if assessment.family else "N/A",
+            'family_code': assessment.family.family_code if assessment.family else '',
+            'overall_score': assessment.overall_score,
+            'findings': assessment.findings,
+            'recommendations': assessment.recommendations,
+        }
+
+    @classmethod
+    def case_summary_data(cls, case):
+        """
+        Plain-data snapshot of a case for the PDF renderer. Uses prefetched
+        family children and `recent_notes` when the caller provided them.
+        """
+        notes = getattr(case, 'recent_notes', None)
+        if notes is None:
+            notes = case.notes.order_by('-created_at')[:cls.RECENT_NOTES_LIMIT]
+        return {
+            'case_number': case.case_number,
+            'title': case.title,
+            'status': case.status,
+            'priority': case.priority,
+            'opened_date': case.opened_date.strftime('%d %b %Y'),
+            'family': case.family.primary_contact_name if case.family else "N/A",
+            'assigned_to': case.assigned_to.get_full_name() if case.assigned_to else "Unassigned",
+            'description': case.description,
+            'children': [
+                {'name': f"{child.first_name} {child.last_name}", 'age': child.age, 'gender': child.gender}
+                for child in case.family.children.all() if child.is_active
+            ],
+            'notes': [
+                {'date': note.created_at.strftime('%Y-%m-%d'), 'text': note.note, 'is_milestone': note.is_milestone}
+                for note in notes
+            ],
+        }
+
+    @classmethod
+    def generate_assessment_report_pdf(cls, assessment):
         """
         Generate a formal PDF report of a family/child assessment
         """
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # Header
-        elements.append(Paragraph("KINDRA CBO - ASSESSMENT REPORT", styles['Title']))
-        elements.append(Spacer(1, 0.2 * inch))
-
-        # Basic Info
-        info_data = [
-            ["Assessment ID", str(assessment.id)[:8]],
-            ["Date", assessment.assessment_date.strftime('%d %b %Y')],
-            ["Type", assessment.assessment_type],
-            ["Target", assessment.family.primary_contact_name if assessment.family else "N/A"],
-            ["Overall Score", str(assessment.overall_score)]
-        ]
-        
-        t = Table(info_data, colWidths=[1.5*inch, 4*inch])
-        t.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
-            ('BACKGROUND', (0,0), (0,-1), colors.whitesmoke),
-        ]))
-        elements.append(t)
-        elements.append(Spacer(1, 0.3 * inch))
-
-        # Findings / Notes
-        elements.append(Paragraph("Assessment Findings", styles['Heading2']))
-        elements.append(Paragraph(assessment.notes or "No notes provided.", styles['Normal']))
-        elements.append(Spacer(1, 0.3 * inch))
-
-        # Recommendation
-        elements.append(Paragraph("Recommendations", styles['Heading2']))
-        elements.append(Paragraph(assessment.recommendations or "No specific recommendations provided.", styles['Normal']))
-
-        doc.build(elements)
-        buffer.seek(0)
-        return buffer.read()
+        return render_assessment_report(cls.assessment_data(assessment))
 
-    @staticmethod
-    def generate_case_summary_pdf(case):
+    @classmethod
+    def generate_case_summary_pdf(cls, case):
         """
         Generate a structured PDF summary of a case
         """
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # Header
-        elements.append(Paragraph(f"CASE SUMMARY: {case.case_number}", styles['Title']))
-        elements.append(Paragraph(case.title, styles['Heading2']))
-        elements.append(Spacer(1, 0.2 * inch))
-
-        # Status Info
-        data = [
-            ["Status", case.status],
-            ["Priority", case.priority],
-            ["Opened Date", case.opened_date.strftime('%d %b %Y')],
-            ["Family", case.family.primary_contact_name if case.family else "N/A"],
-            ["Assigned To", case.assigned_to.get_full_name() if case.assigned_to else "Unassigned"]
-        ]
-        t = Table(data, colWidths=[1.5*inch, 4*inch])
-        t.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
-        ]))
-        elements.append(t)
-        elements.append(Spacer(1, 0.4 * inch))
-
-        # Description
-        elements.append(Paragraph("Case Description", styles['Heading3']))
-        elements.append(Paragraph(case.description or "N/A", styles['Normal']))
-        elements.append(Spacer(1, 0.4 * inch))
-
-        # Milestones / Notes
-        elements.append(Paragraph("Recent Milestones & Notes", styles['Heading3']))
-        notes = case.notes.all().order_by('-created_at')[:10]
-        if notes:
-            for note in notes:
-                text = f"<b>{note.created_at.strftime('%Y-%m-%d')}</b>: {note.content}"
-                if note.is_milestone:
-                    text = f"[MILESTONE] {text}"
-                elements.append(Paragraph(text, styles['Normal']))
-                elements.append(Spacer(1, 0.1 * inch))
+        return render_case_summary(cls.case_summary_data(case))
+
+
+class CaseBatchExportService:
+    """
+    Renders many case summaries or assessment reports into one zip archive.
+
+    Records are read in chunks with their family, children and notes
+    prefetched, turned into plain data, and rendered by a process pool. Each
+    PDF is written into a zip on a temporary file as soon as it is ready, so
+    memory use stays flat however many documents are exported. The archive
+    is then saved to the "exports" storage.
+    """
+
+    CASE_SUMMARIES = 'case_summaries'
+    ASSESSMENTS = 'assessments'
+    KINDS = (CASE_SUMMARIES, ASSESSMENTS)
+
+    MAX_DOCUMENTS = 5000
+    CHUNK_SIZE = 50
+    ARCHIVE_DIR = 'exports/case_management/'
+
+    @staticmethod
+    def queryset(kind, filters):
+        if kind == CaseBatchExportService.CASE_SUMMARIES:
+            recent_notes = CaseNote.objects.order_by('-created_at')[:CaseExportService.RECENT_NOTES_LIMIT]
+            queryset = Case.objects.select_related('family', 'assigned_to').prefetch_related(
+                'family__children', Prefetch('notes', queryset=recent_notes, to_attr='recent_notes')
+            )
+            lookups = {'county': 'family__county', 'status': 'status', 'priority': 'priority',
+                       'assigned_to': 'assigned_to', 'family': 'family'}
+        else:
+            queryset = Assessment.objects.select_related('family')
+            lookups = {'county': 'family__county', 'family': 'family', 'assessment_type': 'assessment_type'}
+        return queryset.filter(**{
+            lookups[name]: value for name, value in filters.items() if name in lookups and value
+        }).order_by('pk')
+
+    @staticmethod
+    def _executor():
+        processes = settings.PDF_EXPORT_PROCESSES
+        # Celery's prefork workers are daemonic and may not start children
+        if processes > 1 and not multiprocessing.current_process().daemon:
+            return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def _chunks(iterable, size):
+        chunk = []
+        for item in iterable:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def run(cls, kind, filters, archive_name=None, progress_callback=None):
+        """Build the archive and return a summary with its storage name"""
+        if kind == cls.CASE_SUMMARIES:
+            snapshot, render = CaseExportService.case_summary_data, render_case_summary
+            filename = lambda data: f"{data['case_number']}.pdf"
+        else:
+            snapshot, render = CaseExportService.assessment_data, render_assessment_report
+            filename = lambda data: f"assessment_{data['family_code']}_{data['id'][:8]}.pdf"
+
+        queryset = cls.queryset(kind, filters)
+        total = queryset.count()
+        processed = 0
+
+        with tempfile.TemporaryFile() as archive_file:
+            with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED) as archive, cls._executor() as pool:
+                for chunk in cls._chunks(queryset.iterator(chunk_size=cls.CHUNK_SIZE), cls.CHUNK_SIZE):
+                    documents = [snapshot(record) for record in chunk]
+                    for data, pdf in zip(documents, pool.map(render, documents)):
+                        archive.writestr(filename(data), pdf)
+                    processed += len(chunk)
+                    if progress_callback:
+                        progress_callback(processed, total)
+
+            size = archive_file.tell()
+            archive_file.seek(0)
+            name = storages['exports'].save(
+                f"{cls.ARCHIVE_DIR}{archive_name or uuid.uuid4()}.zip", File(archive_file)
+            )
+
+        return {'file': name, 'documents': processed, 'size': size}
+
+
+class DocumentUploadError(Exception):
+    """A direct upload token or file that cannot be accepted"""
+
+
+class DocumentUploadService:
+    """
+    Direct-to-storage uploads for case documents.
+
+    prepare() hands the client a signed upload token plus instructions for
+    sending the file straight to storage: a signed Cloudinary upload form in
+    production, or a PUT to the local stand-in endpoint otherwise. The client
+    then registers the document with the token; complete() resolves it to
+    the stored file name, size and checksum, which are saved on the Document
+    so listings never query the storage backend. Each upload is tracked by a
+    DocumentUpload row, which complete() claims so a token is used once.
+    """
+
+    TOKEN_SALT = 'case_management.document_upload'
+    UPLOAD_DIR = 'case_documents/%Y/%m/'
+    CHUNK_SIZE = 64 * 1024
+
+    @staticmethod
+    def uses_cloudinary():
+        return settings.STORAGES['default']['BACKEND'].startswith('cloudinary_storage')
+
+    @staticmethod
+    def file_metadata(file):
+        """Size and sha256 of a file uploaded through the API, read locally"""
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+        return {'file_size': file.size, 'checksum': f"sha256:{digest.hexdigest()}"}
+
+    @classmethod
+    def prepare(cls, user, filename, size):
+        if size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+            raise DocumentUploadError(
+                f"File too large. Maximum size is {settings.DOCUMENT_MAX_UPLOAD_SIZE // (1024 * 1024)}MB."
+            )
+        upload_id = uuid.uuid4()
+        filename = get_valid_filename(os.path.basename(filename))[-100:] or 'document'
+        name = f"{timezone.now().strftime(cls.UPLOAD_DIR)}{upload_id}/{filename}"
+
+        if cls.uses_cloudinary():
+            import cloudinary
+            import cloudinary.utils
+
+            # Same public id layout MediaCloudinaryStorage would produce
+            name = f"{settings.MEDIA_URL.strip('/')}/{os.path.splitext(name)[0]}"
+            config = cloudinary.config()
+            params = {'public_id': name, 'timestamp': int(time.time()), 'tags': 'media'}
+            upload = {
+                'method': 'POST',
+                'url': f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload",
+                'fields': {
+                    **params,
+                    'api_key': config.api_key,
+                    'signature': cloudinary.utils.api_sign_request(params, config.api_secret),
+                },
+                'file_field': 'file',
+            }
+        else:
+            upload = None
+
+        expired = timezone.now() - datetime.timedelta(seconds=settings.DOCUMENT_UPLOAD_TOKEN_MAX_AGE)
+        DocumentUpload.objects.filter(created_at__lt=expired).delete()
+        DocumentUpload.objects.create(id=upload_id, uploaded_by=user, name=name)
+
+        token = signing.dumps(
+            {'id': upload_id.hex, 'name': name, 'user': str(user.id), 'size': size},
+            salt=cls.TOKEN_SALT
+        )
+        if upload is None:
+            upload = {
+                'method': 'PUT',
+                'url': reverse('v1:case_management:document-upload-receive', args=[token]),
+            }
+        return {'upload_token': token, 'upload': upload, 'expires_in': settings.DOCUMENT_UPLOAD_TOKEN_MAX_AGE}
+
+    @classmethod
+    def read_token(cls, token, user):
+        try:
+            data = signing.loads(token, salt=cls.TOKEN_SALT, max_age=settings.DOCUMENT_UPLOAD_TOKEN_MAX_AGE)
+        except signing.BadSignature:
+            raise DocumentUploadError("Upload token is invalid or has expired.")
+        if data['user'] != str(user.id):
+            raise DocumentUploadError("Upload token belongs to another user.")
+        upload = DocumentUpload.objects.filter(pk=data['id'], uploaded_by=user).first()
+        if upload is None:
+            raise DocumentUploadError("Upload token is invalid or has expired.")
+        return upload
+
+    @classmethod
+    def receive(cls, token, user, stream):
+        """
+        Local storage stand-in for the direct upload: stream the request body
+        to storage, hashing as we go, and record what was stored.
+        """
+        upload_record = cls.read_token(token, user)
+        if upload_record.received_at:
+            raise DocumentUploadError("This file has already been uploaded.")
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.TemporaryFile() as upload:
+            while True:
+                chunk = stream.read(cls.CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+                    raise DocumentUploadError("File is larger than the maximum upload size.")
+                digest.update(chunk)
+                upload.write(chunk)
+            if not size:
+                raise DocumentUploadError("No file content received.")
+            upload.seek(0)
+            name = default_storage.save(upload_record.name, File(upload))
+
+        metadata = {'name': name, 'file_size': size, 'checksum': f"sha256:{digest.hexdigest()}"}
+        # Two concurrent PUTs with one token: the first to finish wins
+        received = DocumentUpload.objects.filter(pk=upload_record.pk, received_at__isnull=True).update(
+            received_at=timezone.now(), **metadata
+        )
+        if not received:
+            default_storage.delete(name)
+            raise DocumentUploadError("This file has already been uploaded.")
+        return metadata
+
+    @classmethod
+    def complete(cls, token, user):
+        """Resolve a token to the uploaded file's name, size and checksum (once)"""
+        upload = cls.read_token(token, user)
+
+        if cls.uses_cloudinary():
+            import cloudinary.api
+            from cloudinary.exceptions import NotFound
+
+            try:
+                resource = cloudinary.api.resource(upload.name, resource_type='image')
+            except NotFound:
+                raise DocumentUploadError("The file has not been uploaded yet.")
+            metadata = {'name': upload.name, 'file_size': resource['bytes'], 'checksum': f"md5:{resource['etag']}"}
         else:
-            elements.append(Paragraph("No notes or milestones recorded.", styles['Normal']))
+            if upload.received_at is None:
+                raise DocumentUploadError("The file has not been uploaded yet.")
+            metadata = {'name': upload.name, 'file_size': upload.file_size, 'checksum': upload.checksum}
+
+        if metadata['file_size'] > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+            raise DocumentUploadError("File is larger than the maximum upload size.")
+        # A token registers exactly one document: claim the row in one UPDATE
+        if not DocumentUpload.objects.filter(pk=upload.pk, used_at__isnull=True).update(used_at=timezone.now()):
+            raise DocumentUploadError("This upload has already been registered.")
+        return metadata
+
+
+class FamilyImportError(Exception):
+    """An import file that cannot be read at all"""
+
+
+class FamilyImportService:
+    """
+    Bulk registration of families and children from a partner's CSV or
+    Excel registry.
+
+    The file has one row per child. Rows that share a household_ref belong to
+    one family, whose details come from that household's first row. A row
+    with no child_ columns registers just the family. The rows are counted
+    before anything is written, so an oversized file is rejected whole. Rows
+    are then validated against the model fields as they are streamed from the
+    file. Valid rows are written in chunks with bulk_create, and family codes
+    are allocated a block at a time. Invalid rows are skipped and reported by
+    row number, in the summary and in a CSV error report.
+    """
+
+    FORMATS = ('csv', 'xlsx')
+    CHUNK_SIZE = 1000
+    MAX_ROWS = 50000
+    MAX_REPORTED_ERRORS = 500
+    UPLOAD_DIR = 'imports/case_management/'
+
+    HOUSEHOLD_COLUMN = 'household_ref'
+    CHILD_PREFIX = 'child_'
+    FAMILY_COLUMNS = [
+        'primary_contact_name', 'primary_contact_phone', 'primary_contact_email', 'primary_contact_relationship',
+        'county', 'sub_county', 'ward', 'village', 'physical_address', 'latitude', 'longitude',
+        'vulnerability_score', 'vulnerability_level', 'total_members', 'children_count', 'adults_count',
+        'monthly_income', 'income_source', 'housing_type',
+    ]
+    CHILD_COLUMNS = [
+        'first_name', 'middle_name', 'last_name', 'date_of_birth', 'gender', 'birth_certificate_number',
+        'legal_status', 'guardian_name', 'guardian_relationship', 'in_school', 'school_name', 'grade_level',
+        'has_disability', 'disability_description', 'medical_conditions', 'special_needs',
+    ]
+    REQUIRED_COLUMNS = [
+        'primary_contact_name', 'primary_contact_phone', 'primary_contact_relationship',
+        'county', 'physical_address', 'vulnerability_score',
+    ]
+
+    TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+    FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+    # Registries kept in Excel by hand rarely use ISO dates
+    DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y')
+
+    @classmethod
+    def template_columns(cls):
+        return [cls.HOUSEHOLD_COLUMN, *cls.FAMILY_COLUMNS, *(cls.CHILD_PREFIX + name for name in cls.CHILD_COLUMNS)]
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip()
+
+    @classmethod
+    def _parse_date(cls, value):
+        for date_format in cls.DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, date_format).date()
+            except ValueError:
+                pass
+        return value
+
+    @classmethod
+    def read_rows(cls, file, file_format):
+        """Yield (row_number, {column: value}) pairs from a CSV or XLSX file object"""
+        if file_format == 'xlsx':
+            try:
+                workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+            except Exception:
+                raise FamilyImportError("The file is not a valid Excel workbook.")
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+        else:
+            workbook = None
+            text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+            rows = csv.reader(text)
+
+        try:
+            try:
+                header = next(rows, None)
+            except UnicodeDecodeError:
+                raise FamilyImportError("CSV files must be UTF-8 encoded.")
+            if not header:
+                raise FamilyImportError("The file is empty.")
+            columns = [str(name or '').strip().lower().replace(' ', '_') for name in header]
+            missing = [name for name in cls.REQUIRED_COLUMNS if name not in columns]
+            if missing:
+                raise FamilyImportError(f"Missing required columns: {', '.join(missing)}")
+
+            for number, values in enumerate(rows, start=2):
+                row = {name: cls._cell(value) for name, value in zip(columns, values) if name}
+                if any(value != '' for value in row.values()):
+                    yield number, row
+        finally:
+            if workbook is not None:
+                workbook.close()
+            else:
+                # Leave the underlying file open so it can be read again
+                text.detach()
+
+    @classmethod
+    def count_rows(cls, file, file_format):
+        """Count the data rows of `file` (stopping past MAX_ROWS) and rewind it"""
+        count = sum(1 for _ in itertools.islice(cls.read_rows(file, file_format), cls.MAX_ROWS + 1))
+        file.seek(0)
+        return count
+
+    @staticmethod
+    def _choice_key(value):
+        # "With parents", "with_parents" and "WITH_PARENTS" all match
+        return re.sub(r'[\s_]+', ' ', str(value)).strip().lower()
+
+    @classmethod
+    def _field_cleaners(cls, model, names):
+        cleaners = {}
+        for name in names:
+            field = model._meta.get_field(name)
+            choices = {}
+            for value, label in field.choices or []:
+                choices[cls._choice_key(value)] = value
+                choices[cls._choice_key(label)] = value
+            cleaners[name] = (field, choices)
+        return cleaners
+
+    @classmethod
+    def _clean(cls, cleaners, row, prefix=''):
+        """Validate one record's columns with the model fields' own validators"""
+        values, errors = {}, {}
+        for name, (field, choices) in cleaners.items():
+            raw = row.get(prefix + name, '')
+            if raw == '':
+                if field.has_default():
+                    continue
+                if field.null:
+                    values[name] = None
+                    continue
+            elif choices and not isinstance(raw, datetime.date):
+                raw = choices.get(cls._choice_key(raw), raw)
+            elif isinstance(field, models.BooleanField) and not isinstance(raw, datetime.date):
+                lowered = raw.lower()
+                raw = True if lowered in cls.TRUE_VALUES else False if lowered in cls.FALSE_VALUES else raw
+            elif isinstance(field, models.DateField) and not isinstance(raw, datetime.date):
+                raw = cls._parse_date(raw)
+            try:
+                values[name] = field.clean(raw, None)
+            except ValidationError as e:
+                errors[prefix + name] = ' '.join(e.messages)
+        return values, errors
+
+    @classmethod
+    def run(cls, file, file_format, user=None, dry_run=False, report_name=None, progress_callback=None):
+        """Import every valid row of `file` and return a summary with row-level errors"""
+        total = cls.count_rows(file, file_format)
+        if total > cls.MAX_ROWS:
+            raise FamilyImportError(f"Imports are limited to {cls.MAX_ROWS} rows.")
+
+        family_cleaners = cls._field_cleaners(Family, cls.FAMILY_COLUMNS)
+        child_cleaners = cls._field_cleaners(Child, cls.CHILD_COLUMNS)
+        child_columns = [cls.CHILD_PREFIX + name for name in cls.CHILD_COLUMNS]
+
+        households = {}
+        families, children = [], []
+        summary = {
+            'rows': 0, 'families': 0, 'children': 0, 'rejected_rows': 0, 'errors': [], 'error_report': None,
+            'dry_run': dry_run,
+        }
+        report = io.StringIO()
+        report_writer = csv.writer(report)
+        report_writer.writerow(['row', 'column', 'error'])
+
+        def reject(number, errors):
+            summary['rejected_rows'] += 1
+            if len(summary['errors']) < cls.MAX_REPORTED_ERRORS:
+                summary['errors'].append({'row': number, 'errors': errors})
+            report_writer.writerows([number, column, message] for column, message in errors.items())
+
+        def flush():
+            if not dry_run and (families or children):
+                with transaction.atomic():
+                    codes = CodeSequenceService.next_codes(CodeSequenceService.FAMILY_CODE_PREFIX, len(families))
+                    for family, code in zip(families, codes):
+                        family.family_code = code
+                    Family.objects.bulk_create(families)
+                    Child.objects.bulk_create(children)
+                    # bulk_create skips the post_save signals that index records
+                    CaseSearchService.index([*families, *children])
+            summary['families'] += len(families)
+            summary['children'] += len(children)
+            families.clear()
+            children.clear()
+            if progress_callback:
+                progress_callback(summary['rows'], total)
+
+        for number, row in cls.read_rows(file, file_format):
+            summary['rows'] += 1
+            ref = row.get(cls.HOUSEHOLD_COLUMN) or None
+            if ref is not None:
+                ref = str(ref)
+            family = households.get(ref) if ref else None
+            if ref in households and family is None:
+                reject(number, {cls.HOUSEHOLD_COLUMN: f"Household {ref} was rejected on an earlier row."})
+                continue
+
+            errors = {}
+            if family is None:
+                family_values, errors = cls._clean(family_cleaners, row)
+            has_child = any(row.get(name, '') != '' for name in child_columns)
+            if has_child:
+                child_values, child_errors = cls._clean(child_cleaners, row, cls.CHILD_PREFIX)
+                errors.update(child_errors)
+            if errors:
+                reject(number, errors)
+                if ref and family is None:
+                    households[ref] = None
+                continue
+
+            if family is None:
+                family = Family(created_by=user, **family_values)
+                families.append(family)
+                if ref:
+                    households[ref] = family
+            if has_child:
+                children.append(Child(family=family, **child_values))
+
+            if len(families) + len(children) >= cls.CHUNK_SIZE:
+                flush()
+        flush()
+
+        if summary['families'] and not dry_run:
+            CaseStatisticsService.invalidate()
+            FamilyMapLayer.invalidate()
+        summary['households'] = {
+            ref: family.family_code for ref, family in households.items() if family is not None and not dry_run
+        }
+        if summary['rejected_rows']:
+            # Every rejected row, including those past MAX_REPORTED_ERRORS
+            summary['error_report'] = storages['exports'].save(
+                f"{cls.UPLOAD_DIR}{report_name or uuid.uuid4()}-errors.csv", ContentFile(report.getvalue().encode())
+            )
+        return summary
+
+
+class FamilyMapLayer(MapLayer):
+    """Active family households for the case map"""
+
+    name = 'families'
+    properties = ['family_code', 'vulnerability_level']
 
-        doc.build(elements)
-        buffer.seek(0)
-        return buffer.read()
+    @classmethod
+    def queryset(cls, user):
+        return Family.objects.filter(is_active=True), 'all'
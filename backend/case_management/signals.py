@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Case, CaseNote, Child, Family
+from .services import CaseSearchService, CaseStatisticsService, FamilyMapLayer
+
+
+@receiver(post_save, sender=Family)
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=CaseNote)
+def index_for_search(sender, instance, raw=False, **kwargs):
+    """Keep the case management search index in step with every save."""
+    if not raw:
+        CaseSearchService.index([instance])
+
+
+@receiver(post_save, sender=Family)
+@receiver(post_save, sender=Case)
+def index_dependents_for_search(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Children and notes are indexed with their family's and case's names."""
+    if not raw and not created:
+        CaseSearchService.index_dependents(instance, update_fields)
+
+
+@receiver(post_delete, sender=Family)
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=CaseNote)
+def remove_from_search(sender, instance, **kwargs):
+    CaseSearchService.remove(instance)
+
+
+@receiver(post_save, sender=Family)
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Case)
+@receiver(post_delete, sender=Family)
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Case)
+def invalidate_statistics(sender, **kwargs):
+    """Counts on the case dashboard are cached; drop them on any change."""
+    CaseStatisticsService.invalidate()
+
+
+@receiver(post_save, sender=Family)
+@receiver(post_delete, sender=Family)
+def invalidate_family_map(sender, **kwargs):
+    FamilyMapLayer.invalidate()
@@ -0,0 +1,126 @@
+"""
+Case Management Celery Tasks
+"""
+
+from celery import shared_task
+import logging
+
+from kindra_cbo.jobs import JobStatus, get_job, update_job
+
+logger = logging.getLogger('kindra_cbo')
+
+
+@shared_task(name='case_management.tasks.export_case_documents', ignore_result=True)
+def export_case_documents(job_id, kind, filters):
+    """
+    Render a batch of case summaries or assessments into a zip archive,
+    recording progress on the job and notifying the requester when done.
+    """
+    from accounts.models import Notification
+    from .services import CaseBatchExportService
+
+    def report(processed, total):
+        update_job(job_id, progress={'processed': processed, 'total': total})
+
+    job = get_job(job_id) or {}
+    recipient_id = job.get('requested_by')
+    update_job(job_id, status=JobStatus.RUNNING)
+
+    try:
+        summary = CaseBatchExportService.run(kind, filters, archive_name=job_id, progress_callback=report)
+    except Exception as e:
+        logger.error(f"Case export {job_id} failed: {str(e)}")
+        update_job(job_id, status=JobStatus.FAILED, error=str(e))
+        if recipient_id:
+            Notification.objects.create(
+                recipient_id=recipient_id,
+                title="Case Export Failed",
+                message="Your batch case export could not be completed. Please try again.",
+                type=Notification.Type.ERROR,
+                category=Notification.Category.CASE,
+            )
+        raise
+
+    update_job(job_id, status=JobStatus.COMPLETED, result=summary)
+    if recipient_id:
+        Notification.objects.create(
+            recipient_id=recipient_id,
+            title="Case Export Ready",
+            message=f"Your export of {summary['documents']} documents is ready to download.",
+            type=Notification.Type.SUCCESS,
+            category=Notification.Category.CASE,
+            link=f"/api/v1/cases/exports/{job_id}/download/"
+        )
+    logger.info(f"Case export {job_id}: {summary['documents']} documents, {summary['size']} bytes.")
+    return summary
+
+
+@shared_task(name='case_management.tasks.import_families', ignore_result=True)
+def import_families(job_id, file_name, file_format, dry_run=False):
+    """
+    Import a partner registry of families and children from a stored CSV or
+    XLSX file, recording progress on the job and sending the requester one
+    summary notification.
+    """
+    from django.core.files.storage import storages
+    from accounts.models import Notification, User
+    from .services import FamilyImportError, FamilyImportService
+
+    def report(rows, total):
+        update_job(job_id, progress={'rows': rows, 'total': total})
+
+    job = get_job(job_id) or {}
+    recipient_id = job.get('requested_by')
+    user = User.objects.filter(pk=recipient_id).first() if recipient_id else None
+    update_job(job_id, status=JobStatus.RUNNING)
+    storage = storages['exports']
+
+    try:
+        with storage.open(file_name, 'rb') as file:
+            summary = FamilyImportService.run(
+                file, file_format, user=user, dry_run=dry_run, report_name=job_id, progress_callback=report
+            )
+    except Exception as e:
+        # A FamilyImportError is a problem with the file, not with the worker
+        unexpected = not isinstance(e, FamilyImportError)
+        if unexpected:
+            logger.error(f"Family import {job_id} failed: {str(e)}")
+        update_job(job_id, status=JobStatus.FAILED, error=str(e))
+        if recipient_id:
+            Notification.objects.create(
+                recipient_id=recipient_id,
+                title="Family Import Failed",
+                message=f"Your family import could not be completed: {str(e)}",
+                type=Notification.Type.ERROR,
+                category=Notification.Category.CASE,
+            )
+        if unexpected:
+            raise
+        return None
+    finally:
+        storage.delete(file_name)
+
+    update_job(job_id, status=JobStatus.COMPLETED, result=summary)
+    if recipient_id:
+        if dry_run:
+            message = f"Checked {summary['rows']} rows: {summary['rejected_rows']} have errors."
+        else:
+            message = (
+                f"Registered {summary['families']} families and {summary['children']} children "
+                f"from {summary['rows']} rows; {summary['rejected_rows']} rows were rejected."
+            )
+        link = f"/api/v1/cases/families/import/{job_id}/"
+        if summary['error_report']:
+            message += " Download the error report to see why each row was rejected."
+            link += "errors/"
+        Notification.objects.create(
+            recipient_id=recipient_id,
+            title="Family Import Checked" if dry_run else "Family Import Complete",
+            message=message,
+            type=Notification.Type.WARNING if summary['rejected_rows'] else Notification.Type.SUCCESS,
+            category=Notification.Category.CASE,
+            link=link
+        )
+    logger.info(f"Family import {job_id}: {summary['families']} families, {summary['children']} children, "
+                f"{summary['rejected_rows']} rejected rows.")
+    return summary
@@ -0,0 +1,612 @@
+"""
+Case Management Tests
+"""
+
+import csv
+import hashlib
+import importlib
+import io
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import Notification, User
+from .models import Case, CaseNote, Child, Document, DocumentUpload, Family, SearchEntry
+from .services import CaseSearchService, CaseStatisticsService, CodeSequenceService, FamilyImportService, FamilyMapLayer
+
+
+def make_family(family_code, name='Jane Doe', phone='0700000000'):
+    return Family.objects.create(
+        family_code=family_code,
+        primary_contact_name=name,
+        primary_contact_phone=phone,
+        primary_contact_relationship='Mother',
+        county='Nairobi',
+        physical_address='Kibera',
+        vulnerability_score=50,
+    )
+
+
+class CodeSequenceServiceTests(TestCase):
+
+    def test_codes_are_sequential_per_prefix_and_year(self):
+        self.assertEqual(CodeSequenceService.next_code('FAM', year=2025), 'FAM-2025-00001')
+        self.assertEqual(CodeSequenceService.next_code('FAM', year=2025), 'FAM-2025-00002')
+        self.assertEqual(CodeSequenceService.next_code('CASE', year=2025), 'CASE-2025-00001')
+        self.assertEqual(CodeSequenceService.next_code('FAM', year=2026), 'FAM-2026-00001')
+
+    def test_block_allocation(self):
+        CodeSequenceService.next_code('FAM', year=2025)
+        self.assertEqual(
+            CodeSequenceService.next_codes('FAM', 3, year=2025),
+            ['FAM-2025-00002', 'FAM-2025-00003', 'FAM-2025-00004'],
+        )
+
+    def test_rejects_unsafe_prefix(self):
+        with self.assertRaises(ValueError):
+            CodeSequenceService.next_code('FAM; DROP')
+
+
+class CaseSearchTests(TestCase):
+
+    def setUp(self):
+        self.family = make_family('FAM-2025-00001', name='Wanjiru Kamau', phone='0712 345 678')
+        make_family('FAM-2025-00002', name='Achieng Otieno', phone='0722 000 111')
+        Child.objects.create(
+            family=self.family, first_name='Baraka', last_name='Kamau',
+            date_of_birth='2015-05-01', gender=Child.Gender.MALE,
+            legal_status=Child.LegalStatus.WITH_PARENTS,
+        )
+        self.case = Case.objects.create(
+            case_number='CASE-2025-00001', family=self.family, title='School fees support',
+            description='Kamau household needs help with fees', intervention_plan='Bursary',
+        )
+        CaseNote.objects.create(case=self.case, note='Visited the Kamau home, bursary approved')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='worker@example.com', role=User.Role.CASE_WORKER))
+
+    def test_search_ranks_hits_across_entity_types(self):
+        response = self.client.get('/api/v1/cases/search/', {'q': 'kamau'})
+
+        self.assertEqual(response.status_code, 200)
+        hits = response.data['results']
+        self.assertEqual(
+            {hit['entity_type'] for hit in hits},
+            {SearchEntry.EntityType.FAMILY, SearchEntry.EntityType.CHILD, SearchEntry.EntityType.CASE, SearchEntry.EntityType.NOTE},
+        )
+        # Title matches outrank matches in descriptions and notes
+        self.assertIn(hits[0]['entity_type'], [SearchEntry.EntityType.FAMILY, SearchEntry.EntityType.CHILD])
+
+    def test_partial_phone_number_and_type_filter(self):
+        response = self.client.get('/api/v1/cases/search/', {'q': '0712 345', 'types': 'family'})
+
+        self.assertEqual([hit['object_id'] for hit in response.data['results']], [str(self.family.id)])
+
+    def test_list_search_uses_index_and_deletes_are_removed(self):
+        response = self.client.get('/api/v1/cases/families/', {'search': 'otieno'})
+        self.assertEqual([family['family_code'] for family in response.data['results']], ['FAM-2025-00002'])
+
+        self.family.delete()
+        self.assertFalse(SearchEntry.objects.filter(title__icontains='kamau').exists())
+
+    def test_renaming_a_family_or_case_refreshes_child_and_note_entries(self):
+        self.family.family_code = 'FAM-2025-00099'
+        self.family.primary_contact_name = 'Wanjiru Mwangi'
+        self.family.save()
+        self.case.title = 'Bursary follow-up'
+        self.case.save(update_fields=['title'])
+
+        child = SearchEntry.objects.get(entity_type=SearchEntry.EntityType.CHILD)
+        self.assertEqual(child.subtitle, 'FAM-2025-00099 · Wanjiru Mwangi')
+        note = SearchEntry.objects.get(entity_type=SearchEntry.EntityType.NOTE)
+        self.assertEqual(note.subtitle, 'Bursary follow-up')
+        self.assertEqual(
+            [hit.entity_type for hit in CaseSearchService.search('follow-up')],
+            [SearchEntry.EntityType.CASE, SearchEntry.EntityType.NOTE],
+        )
+
+    def test_rebuild_command(self):
+        SearchEntry.objects.all().delete()
+        call_command('rebuild_search_index', stdout=io.StringIO())
+
+        self.assertEqual(SearchEntry.objects.count(), 5)
+        self.assertEqual(len(CaseSearchService.search('bursary')), 2)
+
+    def test_migration_backfills_rows_saved_before_the_index(self):
+        SearchEntry.objects.all().delete()
+        migration = importlib.import_module('case_management.migrations.0009_backfill_search_index')
+        state = MigrationLoader(connection).project_state(('case_management', '0009_backfill_search_index'))
+
+        migration.backfill_search_index(state.apps, None)
+
+        self.assertEqual(SearchEntry.objects.count(), 5)
+        self.assertEqual(
+            SearchEntry.objects.get(entity_type=SearchEntry.EntityType.CASE).subtitle,
+            f"{self.case.case_number} · {self.case.get_status_display()}",
+        )
+        self.assertEqual(len(CaseSearchService.search('bursary')), 2)
+
+
+class CaseNoteTimelineTests(TestCase):
+
+    def setUp(self):
+        self.case = Case.objects.create(
+            case_number='CASE-2025-00001', family=make_family('FAM-2025-00001'), title='School fees support',
+            description='Support', intervention_plan='Bursary',
+        )
+        worker = User.objects.create_user(email='worker@example.com', role=User.Role.CASE_WORKER)
+        notes = [CaseNote.objects.create(case=self.case, note=f'Visit {index}', created_by=worker) for index in range(8)]
+        # Saved in the same instant, e.g. by a bulk import
+        CaseNote.objects.filter(pk__in=[note.pk for note in notes[2:6]]).update(created_at=notes[2].created_at)
+        self.expected = [
+            str(note.pk) for note in CaseNote.objects.filter(case=self.case).order_by('-created_at', '-id')
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(worker)
+
+    def test_timeline_pages_ties_without_skipping_or_repeating(self):
+        seen = []
+        url = f'/api/v1/cases/cases/{self.case.id}/notes/?page_size=3'
+        while url:
+            page = self.client.get(url).data
+            seen.extend(note['id'] for note in page['results'])
+            url = page['next']
+
+        self.assertEqual(seen, self.expected)
+
+    def test_detail_inlines_the_latest_notes_from_one_prefetch(self):
+        # The case, then its latest notes with their authors
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/cases/cases/{self.case.id}/')
+
+        self.assertEqual([note['id'] for note in response.data['recent_notes']], self.expected[:5])
+        self.assertEqual(response.data['notes_count'], 8)
+
+
+class ListQueryCountTests(TestCase):
+
+    def setUp(self):
+        worker = User.objects.create_user(
+            email='worker@example.com', first_name='Grace', last_name='Wambui', role=User.Role.CASE_WORKER
+        )
+        for index in range(1, 11):
+            family = make_family(f'FAM-2025-{index:05d}')
+            family.assigned_case_worker = worker
+            family.save()
+            for child in range(index % 3 + 1):
+                Child.objects.create(
+                    family=family, first_name=f'Child {child}', last_name='Doe', date_of_birth='2015-05-01',
+                    gender=Child.Gender.FEMALE, legal_status=Child.LegalStatus.WITH_PARENTS,
+                    is_active=child != 0,
+                )
+            case = Case.objects.create(
+                case_number=f'CASE-2025-{index:05d}', family=family, title='Fees', description='Support',
+                intervention_plan='Plan', assigned_to=worker,
+                status=Case.Status.CLOSED if index % 2 else Case.Status.OPEN,
+            )
+            for note in range(index % 4):
+                CaseNote.objects.create(case=case, note=f'Visit {note}', created_by=worker)
+        self.client = APIClient()
+        self.client.force_authenticate(worker)
+
+    def test_family_list_query_count_is_independent_of_children_and_cases(self):
+        # Pagination count and the annotated page, with the case worker joined in
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/cases/families/')
+
+        self.assertEqual(response.status_code, 200)
+        families = {family['family_code']: family for family in response.data['results']}
+        self.assertEqual(len(families), 10)
+        self.assertEqual(families['FAM-2025-00002']['active_children_count'], 2)
+        self.assertEqual(families['FAM-2025-00002']['open_cases_count'], 1)
+        self.assertEqual(families['FAM-2025-00003']['open_cases_count'], 0)
+        self.assertEqual(families['FAM-2025-00003']['assigned_case_worker_name'], 'Grace Wambui')
+
+    def test_case_list_query_count_is_independent_of_notes(self):
+        # Pagination count and the annotated page, with family and assignee joined in
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/cases/cases/')
+
+        self.assertEqual(response.status_code, 200)
+        cases = {case['case_number']: case for case in response.data['results']}
+        self.assertEqual(len(cases), 10)
+        self.assertEqual(cases['CASE-2025-00003']['notes_count'], 3)
+        self.assertEqual(cases['CASE-2025-00003']['family_code'], 'FAM-2025-00003')
+        self.assertEqual(cases['CASE-2025-00003']['description'], 'Support')
+        self.assertEqual(cases['CASE-2025-00003']['intervention_plan'], 'Plan')
+        self.assertIsNone(cases['CASE-2025-00004']['last_note_at'])
+
+
+class CaseStatisticsTests(TestCase):
+
+    def setUp(self):
+        cache.delete(CaseStatisticsService.CACHE_KEY)
+        self.worker = User.objects.create_user(email='worker@example.com', first_name='Amina', last_name='Said', role=User.Role.CASE_WORKER)
+        nairobi = make_family('FAM-2025-00001')
+        kisumu = Family.objects.create(
+            family_code='FAM-2025-00002', primary_contact_name='Achieng Otieno', primary_contact_phone='0722000111',
+            primary_contact_relationship='Mother', county='Kisumu', physical_address='Nyalenda',
+            vulnerability_score=90, vulnerability_level=Family.VulnerabilityLevel.CRITICAL, is_active=False,
+        )
+        for family, priority, status, assigned_to in [
+            (nairobi, Case.Priority.HIGH, Case.Status.OPEN, self.worker),
+            (nairobi, Case.Priority.LOW, Case.Status.CLOSED, self.worker),
+            (kisumu, Case.Priority.HIGH, Case.Status.OPEN, None),
+        ]:
+            Case.objects.create(
+                case_number=CodeSequenceService.next_case_number(), family=family, title='Support',
+                description='Support', intervention_plan='Plan', priority=priority, status=status, assigned_to=assigned_to,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.worker)
+
+    def test_statistics_totals_and_breakdowns(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/cases/statistics/')
+
+        stats = response.data
+        self.assertEqual(
+            {key: stats[key] for key in ['total_families', 'total_cases', 'open_cases', 'high_priority_cases', 'critical_families']},
+            {'total_families': 1, 'total_cases': 3, 'open_cases': 2, 'high_priority_cases': 2, 'critical_families': 1},
+        )
+        self.assertEqual([entry['county'] for entry in stats['by_county']], ['Kisumu', 'Nairobi'])
+        self.assertEqual(stats['by_case_worker'][0], {
+            'case_worker': str(self.worker.id), 'name': 'Amina Said',
+            'cases': 2, 'open_cases': 1, 'high_priority_cases': 1,
+        })
+
+    def test_statistics_are_cached_until_a_write(self):
+        self.client.get('/api/v1/cases/statistics/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/cases/statistics/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Case.objects.filter(status=Case.Status.OPEN).first().delete()
+
+        self.assertEqual(self.client.get('/api/v1/cases/statistics/').data['open_cases'], 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), PDF_EXPORT_PROCESSES=1)
+class CaseBatchExportTests(TestCase):
+
+    def test_export_job_builds_archive_and_notifies_requester(self):
+        admin = User.objects.create_user(email='admin@example.com', role=User.Role.ADMIN)
+        family = make_family('FAM-2025-00001')
+        Child.objects.create(
+            family=family, first_name='Baraka', last_name='Doe', date_of_birth='2015-05-01',
+            gender=Child.Gender.MALE, legal_status=Child.LegalStatus.WITH_PARENTS,
+        )
+        for index in range(3):
+            case = Case.objects.create(
+                case_number=f'CASE-2025-0000{index + 1}', family=family, title='Fees <urgent>',
+                description='Support & follow-up', intervention_plan='Plan',
+            )
+            CaseNote.objects.create(case=case, note='Paid 1 < 2 terms')
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post('/api/v1/cases/exports/', {'kind': 'case_summaries', 'county': 'Nairobi'}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        job = client.get(f"/api/v1/cases/exports/{response.data['id']}/").data
+        self.assertEqual(job['status'], 'COMPLETED')
+        download = client.get(f"/api/v1/cases/exports/{response.data['id']}/download/")
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), [f'CASE-2025-0000{index}.pdf' for index in range(1, 4)])
+        self.assertTrue(Notification.objects.filter(recipient=admin, title='Case Export Ready').exists())
+
+    def test_export_progress_is_visible_to_other_processes(self):
+        from .tasks import export_case_documents
+
+        admin = User.objects.create_user(email='admin@example.com', role=User.Role.ADMIN)
+        outsider = User.objects.create_user(email='worker@example.com', role=User.Role.CASE_WORKER)
+        Case.objects.create(
+            case_number='CASE-2025-00001', family=make_family('FAM-2025-00001'), title='Fees',
+            description='Support', intervention_plan='Plan',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        with mock.patch('case_management.views.run_in_background') as queue:
+            response = client.post('/api/v1/cases/exports/', {'kind': 'case_summaries'}, format='json')
+        status_url = f"/api/v1/cases/exports/{response.data['id']}/"
+        self.assertEqual(client.get(status_url).data['status'], 'QUEUED')
+        self.assertEqual(client.get(f'{status_url}download/').status_code, 409)
+
+        # The worker runs the task; the web process shares nothing with it but the database
+        export_case_documents(**queue.call_args.kwargs)
+        cache.clear()
+
+        job = client.get(status_url).data
+        self.assertEqual(job['status'], 'COMPLETED')
+        self.assertEqual(job['progress'], {'processed': 1, 'total': 1})
+        download = client.get(f'{status_url}download/')
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content))).namelist(), ['CASE-2025-00001.pdf'])
+        client.force_authenticate(outsider)
+        self.assertEqual(client.get(status_url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DocumentUploadTests(TestCase):
+
+    def setUp(self):
+        self.family = make_family('FAM-2025-00001')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='worker@example.com', role=User.Role.CASE_WORKER))
+
+    def test_direct_upload_is_registered_once_with_size_and_checksum(self):
+        prepared = self.client.post('/api/v1/cases/documents/uploads/', {'file_name': 'Scan.pdf', 'file_size': 4096}, format='json')
+        self.assertEqual(prepared.status_code, 201)
+
+        body = b'%PDF' + b'x' * 4092
+        received = self.client.put(prepared.data['upload']['url'], body, content_type='application/pdf')
+        self.assertEqual(received.status_code, 200)
+        self.assertEqual(self.client.put(prepared.data['upload']['url'], body, content_type='application/pdf').status_code, 400)
+        cache.clear()  # Registration may land on another process
+
+        payload = {'upload_token': prepared.data['upload_token'], 'title': 'Scan', 'document_type': 'OTHER', 'family': str(self.family.id)}
+        response = self.client.post('/api/v1/cases/documents/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get()
+        self.assertEqual((document.file_size, document.checksum), (4096, 'sha256:' + hashlib.sha256(body).hexdigest()))
+
+        # A token registers exactly one document
+        cache.clear()
+        self.assertEqual(self.client.post('/api/v1/cases/documents/', payload, format='json').status_code, 400)
+        self.assertIsNotNone(DocumentUpload.objects.get().used_at)
+
+    def test_token_cannot_be_registered_before_the_file_arrives(self):
+        prepared = self.client.post('/api/v1/cases/documents/uploads/', {'file_name': 'Scan.pdf', 'file_size': 10}, format='json')
+        payload = {'upload_token': prepared.data['upload_token'], 'title': 'Scan', 'document_type': 'OTHER', 'family': str(self.family.id)}
+
+        response = self.client.post('/api/v1/cases/documents/', payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('not been uploaded', response.data['upload_token'][0])
+
+    @override_settings(DOCUMENT_MAX_UPLOAD_SIZE=1024)
+    def test_oversized_uploads_are_refused_up_front(self):
+        response = self.client.post('/api/v1/cases/documents/uploads/', {'file_name': 'Scan.pdf', 'file_size': 2048}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FamilyImportTests(TestCase):
+
+    REGISTRY = (
+        'household_ref,primary_contact_name,primary_contact_phone,primary_contact_relationship,county,'
+        'physical_address,vulnerability_score,child_first_name,child_last_name,child_date_of_birth,'
+        'child_gender,child_legal_status\n'
+        'H1,Wanjiru Kamau,0712345678,Mother,Nairobi,Kibera,60,Baraka,Kamau,01/05/2015,Male,With parents\n'
+        'H1,,,,,,,Amani,Kamau,2017-02-11,F,WITH_PARENTS\n'
+        'H2,Achieng Otieno,0722000111,Mother,Kisumu,Nyalenda,150,Zawadi,Otieno,2016-03-03,F,WITH_PARENTS\n'
+        'H2,,,,,,,Juma,Otieno,2018-01-01,M,WITH_PARENTS\n'
+        ',Hassan Ali,0733000222,Father,Mombasa,Likoni,30,,,,,\n'
+    )
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', role=User.Role.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def import_registry(self, **data):
+        upload = SimpleUploadedFile('registry.csv', self.REGISTRY.encode())
+        response = self.client.post('/api/v1/cases/families/import/', {'file': upload, **data}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        cache.clear()
+        return self.client.get(f"/api/v1/cases/families/import/{response.data['id']}/").data
+
+    def test_import_registers_valid_households_and_reports_row_errors(self):
+        job = self.import_registry()
+
+        self.assertEqual(job['status'], 'COMPLETED')
+        result = job['result']
+        self.assertEqual((result['families'], result['children'], result['rejected_rows']), (2, 2, 2))
+        self.assertEqual([error['row'] for error in result['errors']], [4, 5])
+        self.assertIn('vulnerability_score', result['errors'][0]['errors'])
+        kamau = Family.objects.get(family_code=result['households']['H1'])
+        self.assertEqual(sorted(kamau.children.values_list('first_name', flat=True)), ['Amani', 'Baraka'])
+        self.assertEqual(len(CaseSearchService.search('kamau')), 3)
+        self.assertEqual(job['progress'], {'rows': 5, 'total': 5})
+
+        notification = Notification.objects.get(recipient=self.admin, title='Family Import Complete')
+        self.assertEqual(notification.link, f"/api/v1/cases/families/import/{job['id']}/errors/")
+        report = self.client.get(notification.link)
+        rows = list(csv.reader(io.StringIO(b''.join(report.streaming_content).decode())))
+        self.assertEqual(rows[0], ['row', 'column', 'error'])
+        self.assertEqual([(row[0], row[1]) for row in rows[1:]], [('4', 'vulnerability_score'), ('5', 'household_ref')])
+
+    def test_dry_run_saves_nothing(self):
+        job = self.import_registry(dry_run=True)
+
+        self.assertEqual(job['result']['rejected_rows'], 2)
+        self.assertFalse(Family.objects.exists())
+
+    def test_oversized_file_is_rejected_before_any_row_is_written(self):
+        with mock.patch.object(FamilyImportService, 'MAX_ROWS', 4), mock.patch.object(FamilyImportService, 'CHUNK_SIZE', 1):
+            job = self.import_registry()
+
+        self.assertEqual(job['status'], 'FAILED')
+        self.assertIn('limited to 4 rows', job['error'])
+        self.assertFalse(Family.objects.exists())
+
+
+class FamilyGeoFilterTests(TestCase):
+
+    def setUp(self):
+        for code, lat, lng in [
+            ('FAM-2025-00001', '-1.300000', '36.780000'),  # Kibera, ~5km from the CBD
+            ('FAM-2025-00002', '-1.283000', '36.900000'),  # Embakasi, ~9km
+            ('FAM-2025-00003', '-0.091700', '34.768000'),  # Kisumu, ~265km
+        ]:
+            family = make_family(code)
+            Family.objects.filter(pk=family.pk).update(latitude=lat, longitude=lng)
+        make_family('FAM-2025-00004')  # Not yet located
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='worker@example.com', role=User.Role.CASE_WORKER))
+
+    def codes(self, **params):
+        response = self.client.get('/api/v1/cases/families/', params)
+        self.assertEqual(response.status_code, 200)
+        return [family['family_code'] for family in response.data['results']]
+
+    def test_bounding_box(self):
+        self.assertEqual(sorted(self.codes(bbox='36.5,-1.5,37,-1')), ['FAM-2025-00001', 'FAM-2025-00002'])
+
+    def test_nearest_are_ranked_by_distance(self):
+        response = self.client.get('/api/v1/cases/families/', {'near': '-1.2864,36.8172', 'nearest': 2})
+
+        results = response.data['results']
+        self.assertEqual([family['family_code'] for family in results], ['FAM-2025-00001', 'FAM-2025-00002'])
+        self.assertAlmostEqual(results[0]['distance_km'], 4.4, delta=0.5)
+        self.assertEqual(self.codes(near='-1.2864,36.8172', radius_km=300)[-1], 'FAM-2025-00003')
+
+    def test_invalid_coordinates_are_rejected(self):
+        response = self.client.get('/api/v1/cases/families/', {'near': '95,36'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class FamilyMapTests(TestCase):
+
+    KENYA = '33.5,-5,42,5'
+
+    def setUp(self):
+        cache.clear()
+        with self.commit():
+            for index, (lat, lng) in enumerate([('-1.300000', '36.780000'), ('-1.301000', '36.781000'), ('-0.091700', '34.768000')]):
+                family = make_family(f'FAM-2025-0000{index + 1}')
+                Family.objects.filter(pk=family.pk).update(latitude=lat, longitude=lng)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='worker@example.com', role=User.Role.CASE_WORKER))
+
+    @contextmanager
+    def commit(self):
+        """Run on_commit callbacks and drop them, as a real commit would"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            yield callbacks
+        connection.run_on_commit.clear()
+
+    def features(self, bbox, zoom):
+        response = self.client.get('/api/v1/cases/families/map/', {'bbox': bbox, 'zoom': zoom})
+        self.assertEqual(response.status_code, 200)
+        return response.data['features']
+
+    def test_low_zoom_clusters_and_high_zoom_points(self):
+        clusters = self.features(self.KENYA, 6)
+        self.assertEqual(sorted(feature['properties']['count'] for feature in clusters), [1, 2])
+
+        points = self.features('36.77,-1.31,36.79,-1.29', 16)
+        self.assertEqual(sorted(feature['properties']['family_code'] for feature in points), ['FAM-2025-00001', 'FAM-2025-00002'])
+        self.assertEqual(points[0]['geometry']['type'], 'Point')
+
+    def test_tiles_are_cached_until_a_family_changes(self):
+        self.features(self.KENYA, 6)
+        with self.assertNumQueries(0):  # Tiles and the layer version are both cached
+            self.features(self.KENYA, 6)
+
+        with self.commit():
+            Family.objects.get(family_code='FAM-2025-00003').delete()
+
+        self.assertEqual(sum(feature['properties']['count'] for feature in self.features(self.KENYA, 6)), 2)
+
+    def test_one_bump_per_transaction(self):
+        version = FamilyMapLayer.current_version()
+
+        with self.commit() as callbacks:
+            for family in Family.objects.all():
+                family.save()
+
+        self.assertEqual(len([c for c in callbacks if c == FamilyMapLayer.bump_version]), 1)
+        self.assertEqual(FamilyMapLayer.current_version(), version + 1)
+
+    def test_version_is_never_reused_after_cache_eviction(self):
+        version = FamilyMapLayer.current_version()
+        for _ in range(2):
+            with self.commit():
+                FamilyMapLayer.invalidate()
+        self.features(self.KENYA, 6)  # Tiles cached under version + 2
+
+        # The counter is evicted but one stale tile survives
+        cache.delete(FamilyMapLayer.version_key())
+        with self.commit():
+            Family.objects.filter(family_code='FAM-2025-00003').update(is_active=False)
+            FamilyMapLayer.invalidate()
+
+        self.assertGreater(FamilyMapLayer.current_version(), version + 2)
+        self.assertEqual(sum(feature['properties']['count'] for feature in self.features(self.KENYA, 6)), 2)
+
+    def test_viewport_too_large_for_zoom(self):
+        response = self.client.get('/api/v1/cases/families/map/', {'bbox': self.KENYA, 'zoom': 12})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentCodeAllocationTests(TransactionTestCase):
+    """Stress test: thousands of records created concurrently get unique codes"""
+
+    THREADS = 8
+    RECORDS_PER_THREAD = 250
+
+    def test_concurrent_family_and_case_creation_never_collides(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def retry_on_lock(fn, *args, **kwargs):
+            # Row-locking backends queue the writers, so every attempt must succeed
+            # first time. The SQLite test database is in-memory with a shared cache,
+            # which fails a conflicting writer with "database table is locked" at once
+            # (busy timeouts and BEGIN IMMEDIATE do not apply to shared-cache locks).
+            # The failed attempt rolls back whole, counter update included, so the
+            # retry cannot hide a duplicate: a collision raises IntegrityError.
+            retries = 100 if connection.vendor == 'sqlite' else 0
+            for attempt in range(retries + 1):
+                try:
+                    with transaction.atomic():
+                        return fn(*args, **kwargs)
+                except OperationalError as e:
+                    if attempt == retries or 'locked' not in str(e):
+                        raise
+                    time.sleep(0.005 * (attempt + 1))
+
+        def create_records():
+            barrier.wait()
+            try:
+                for _ in range(self.RECORDS_PER_THREAD):
+                    family = retry_on_lock(make_family, retry_on_lock(CodeSequenceService.next_family_code))
+                    retry_on_lock(
+                        Case.objects.create,
+                        case_number=retry_on_lock(CodeSequenceService.next_case_number),
+                        family=family,
+                        title='Support',
+                        description='Support',
+                        intervention_plan='Plan',
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=create_records) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.THREADS * self.RECORDS_PER_THREAD
+        family_numbers = sorted(int(code.rsplit('-', 1)[1]) for code in Family.objects.values_list('family_code', flat=True))
+        self.assertEqual(family_numbers, list(range(1, total + 1)))
+        self.assertEqual(Case.objects.values('case_number').distinct().count(), total)
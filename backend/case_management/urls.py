@@ -9,9 +9,12 @@ from .views import (
     CaseListCreateView, CaseDetailView,
     AssessmentListCreateView, AssessmentDetailView,
     DocumentListCreateView, DocumentDetailView,
-    CaseNoteListCreateView,
-    case_statistics,
-    export_assessment_pdf, export_case_summary_pdf
+    document_upload_prepare, document_upload_receive,
+    CaseNoteListCreateView, CaseNoteTimelineView,
+    case_statistics, case_search,
+    export_assessment_pdf, export_case_summary_pdf,
+    case_export_create, case_export_status, case_export_download,
+    family_import_create, family_import_errors, family_import_status, family_import_template, family_map
 )
 
 app_name = 'case_management'
@@ -20,6 +23,11 @@ urlpatterns = [
     # Families
     path('families/', FamilyListCreateView.as_view(), name='family-list'),
     path('families/<uuid:pk>/', FamilyDetailView.as_view(), name='family-detail'),
+    path('families/map/', family_map, name='family-map'),
+    path('families/import/', family_import_create, name='family-import-create'),
+    path('families/import/template/', family_import_template, name='family-import-template'),
+    path('families/import/<uuid:job_id>/', family_import_status, name='family-import-status'),
+    path('families/import/<uuid:job_id>/errors/', family_import_errors, name='family-import-errors'),
     
     # Children
     path('children/', ChildListCreateView.as_view(), name='child-list'),
@@ -28,6 +36,7 @@ urlpatterns = [
     # Cases
     path('cases/', CaseListCreateView.as_view(), name='case-list'),
     path('cases/<uuid:pk>/', CaseDetailView.as_view(), name='case-detail'),
+    path('cases/<uuid:pk>/notes/', CaseNoteTimelineView.as_view(), name='case-notes-timeline'),
     
     # Assessments
     path('assessments/', AssessmentListCreateView.as_view(), name='assessment-list'),
@@ -36,14 +45,22 @@ urlpatterns = [
     # Documents
     path('documents/', DocumentListCreateView.as_view(), name='document-list'),
     path('documents/<uuid:pk>/', DocumentDetailView.as_view(), name='document-detail'),
+    path('documents/uploads/', document_upload_prepare, name='document-upload-prepare'),
+    path('documents/uploads/<str:token>/', document_upload_receive, name='document-upload-receive'),
     
     # Case Notes
     path('notes/', CaseNoteListCreateView.as_view(), name='note-list'),
     
+    # Search
+    path('search/', case_search, name='search'),
+    
     # Statistics
     path('statistics/', case_statistics, name='statistics'),
     
     # Exports
     path('assessments/<uuid:pk>/export-pdf/', export_assessment_pdf, name='assessment-export-pdf'),
     path('cases/<uuid:pk>/export-summary/', export_case_summary_pdf, name='case-export-pdf'),
+    path('exports/', case_export_create, name='export-create'),
+    path('exports/<uuid:job_id>/', case_export_status, name='export-status'),
+    path('exports/<uuid:job_id>/download/', case_export_download, name='export-download'),
 ]
@@ -2,47 +2,116 @@
 Case Management Views
 """
 
+import csv
+
 from rest_framework import generics, permissions, filters, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Family, Child, Case, Assessment, Document, CaseNote
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from .models import Family, Child, Case, Assessment, Document, CaseNote, SearchEntry
 from .serializers import (
-    FamilySerializer, ChildSerializer, CaseSerializer,
-    AssessmentSerializer, DocumentSerializer, CaseNoteSerializer
+    FamilySerializer, FamilyListSerializer, ChildSerializer, CaseSerializer, CaseListSerializer,
+    AssessmentSerializer, DocumentSerializer, CaseNoteSerializer, SearchHitSerializer,
+    CaseBatchExportSerializer, DocumentUploadRequestSerializer, FamilyImportSerializer
 )
 from accounts.models import AuditLog, User, Notification
+from accounts.permissions import IsAdminOrManagement
+from kindra_cbo.background import run_in_background
+from kindra_cbo.geo import GeoFilterBackend
+from kindra_cbo.jobs import JobStatus, create_job, get_job
 from reporting.utils import log_analytics_event
 from reporting.models import AnalyticsEvent
-from .services import CaseExportService
-from django.http import HttpResponse
-import random
-import string
+from .services import (
+    CaseBatchExportService, CaseExportService, CaseSearchService, CaseStatisticsService, CodeSequenceService,
+    DocumentUploadError, DocumentUploadService, FamilyImportService, FamilyMapLayer
+)
+from django.core.files.storage import storages
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+
+
+def count_subquery(queryset, field):
+    """
+    Correlated COUNT(*) of `queryset` grouped on `field`, for annotating list
+    pages: it runs only for the rows on the page and avoids multiplying joins
+    when a model has several counted relations.
+    """
+    counts = queryset.order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class RankedSearchFilter(filters.BaseFilterBackend):
+    """
+    ?search= backed by CaseSearchService rather than icontains scans. Results
+    are ordered by relevance unless the request also asks for an ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get('search', '').strip()
+        if not text:
+            return queryset
+        matches = CaseSearchService.matching(text, [view.search_entity_type])
+        return queryset.filter(pk__in=matches.values('object_id')).annotate(
+            search_score=Subquery(matches.filter(object_id=OuterRef('pk')).values('score')[:1])
+        ).order_by('-search_score')
+
+
+def annotate_family_summary(queryset):
+    """Add active_children_count and open_cases_count to a Family queryset"""
+    return queryset.annotate(
+        active_children_count=count_subquery(
+            Child.objects.filter(family=OuterRef('pk'), is_active=True), 'family'
+        ),
+        open_cases_count=count_subquery(
+            Case.objects.filter(family=OuterRef('pk')).exclude(status=Case.Status.CLOSED), 'family'
+        ),
+    )
+
+
+def annotate_case_summary(queryset):
+    """Add notes_count and last_note_at to a Case queryset"""
+    notes = CaseNote.objects.filter(case=OuterRef('pk'))
+    return queryset.annotate(
+        notes_count=count_subquery(notes, 'case'),
+        last_note_at=Subquery(notes.order_by('-created_at').values('created_at')[:1]),
+    )
+
+
+def prefetch_recent_notes(queryset):
+    """Load each case's latest notes in one query, for CaseSerializer"""
+    notes = CaseNote.objects.select_related('created_by').order_by('-created_at', '-id')
+    return queryset.prefetch_related(
+        Prefetch('notes', queryset=notes[:CaseSerializer.RECENT_NOTES_LIMIT], to_attr='recent_notes')
+    )
 
 
 class FamilyListCreateView(generics.ListCreateAPIView):
     """List all families or create a new family"""
-    queryset = Family.objects.all()
+    queryset = Family.objects.all().select_related('assigned_case_worker')
     serializer_class = FamilySerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, GeoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['vulnerability_level', 'county', 'assigned_case_worker', 'is_active']
-    search_fields = ['family_code', 'primary_contact_name', 'primary_contact_phone']
+    search_entity_type = SearchEntry.EntityType.FAMILY
     ordering_fields = ['created_at', 'vulnerability_score', 'registration_date']
+
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return annotate_family_summary(super().get_queryset())
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        # The nested children are left to the detail endpoint
+        if self.request.method == 'GET':
+            return FamilyListSerializer
+        return FamilySerializer
     
     def perform_create(self, serializer):
-        # Generate unique family code: FAM-YYYY-XXXX (where XXXX is alphanumeric)
-        from django.utils import timezone
-        year = timezone.now().year
-        def generate_code():
-            chars = string.ascii_uppercase + string.digits
-            suffix = ''.join(random.choice(chars) for _ in range(4))
-            return f"FAM-{year}-{suffix}"
-        
-        family_code = generate_code()
-        while Family.objects.filter(family_code=family_code).exists():
-            family_code = generate_code()
-        
+        # Sequential family code: FAM-YYYY-NNNNN
+        family_code = CodeSequenceService.next_family_code()
         family = serializer.save(family_code=family_code, created_by=self.request.user)
         
         # Log creation
@@ -69,7 +138,7 @@ class FamilyListCreateView(generics.ListCreateAPIView):
 
 class FamilyDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a family"""
-    queryset = Family.objects.all()
+    queryset = Family.objects.all().select_related('assigned_case_worker').prefetch_related('children')
     serializer_class = FamilySerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -88,45 +157,46 @@ class FamilyDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class ChildListCreateView(generics.ListCreateAPIView):
     """List all children or create a new child"""
-    queryset = Child.objects.all()
+    queryset = Child.objects.all().select_related('family')
     serializer_class = ChildSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['family', 'gender', 'legal_status', 'in_school', 'is_active']
-    search_fields = ['first_name', 'last_name']
+    search_entity_type = SearchEntry.EntityType.CHILD
     ordering_fields = ['date_of_birth', 'created_at']
 
 
 class ChildDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a child"""
-    queryset = Child.objects.all()
+    queryset = Child.objects.all().select_related('family')
     serializer_class = ChildSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
 class CaseListCreateView(generics.ListCreateAPIView):
     """List all cases or create a new case"""
-    queryset = Case.objects.all()
+    queryset = Case.objects.all().select_related('family', 'assigned_to')
     serializer_class = CaseSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RankedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'priority', 'assigned_to', 'family']
-    search_fields = ['case_number', 'title']
+    search_entity_type = SearchEntry.EntityType.CASE
     ordering_fields = ['created_at', 'priority', 'opened_date']
+
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return annotate_case_summary(super().get_queryset())
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        # Notes are left to the detail endpoint
+        if self.request.method == 'GET':
+            return CaseListSerializer
+        return CaseSerializer
     
     def perform_create(self, serializer):
-        # Generate unique case number: CASE-YYYY-XXXXXX
-        from django.utils import timezone
-        year = timezone.now().year
-        def generate_number():
-            chars = string.ascii_uppercase + string.digits
-            suffix = ''.join(random.choice(chars) for _ in range(6))
-            return f"CASE-{year}-{suffix}"
-        
-        case_number = generate_number()
-        while Case.objects.filter(case_number=case_number).exists():
-            case_number = generate_number()
-        
+        # Sequential case number: CASE-YYYY-NNNNN
+        case_number = CodeSequenceService.next_case_number()
         case = serializer.save(case_number=case_number, created_by=self.request.user)
         
         # Log creation
@@ -165,10 +235,13 @@ class CaseListCreateView(generics.ListCreateAPIView):
 
 class CaseDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a case"""
-    queryset = Case.objects.all()
+    queryset = Case.objects.all().select_related('family', 'assigned_to')
     serializer_class = CaseSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return prefetch_recent_notes(annotate_case_summary(super().get_queryset()))
+
     def perform_destroy(self, instance):
         case_num = instance.case_number
         title = instance.title
@@ -182,8 +255,8 @@ class CaseDetailView(generics.RetrieveUpdateDestroyAPIView):
         )
 
     def perform_update(self, serializer):
-        old_status = self.get_object().status
-        old_assignee = self.get_object().assigned_to
+        old_status = serializer.instance.status
+        old_assignee = serializer.instance.assigned_to
         case = serializer.save()
         
         # Notify if status changed
@@ -231,8 +304,11 @@ class AssessmentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class DocumentListCreateView(generics.ListCreateAPIView):
-    """List all documents or upload a new document"""
-    queryset = Document.objects.all()
+    """
+    List all documents or register a new one, either from a multipart upload
+    or from an upload_token after a direct-to-storage upload
+    """
+    queryset = Document.objects.all().select_related('uploaded_by', 'family', 'child')
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -244,11 +320,45 @@ class DocumentListCreateView(generics.ListCreateAPIView):
 
 class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a document"""
-    queryset = Document.objects.all()
+    queryset = Document.objects.all().select_related('uploaded_by', 'family', 'child')
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def document_upload_prepare(request):
+    """
+    Start a direct-to-storage document upload. Returns a signed upload token
+    and where to send the file; register it afterwards by POSTing the token
+    with the document details to the documents endpoint.
+    """
+    serializer = DocumentUploadRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        upload = DocumentUploadService.prepare(
+            request.user,
+            serializer.validated_data['file_name'],
+            serializer.validated_data['file_size']
+        )
+    except DocumentUploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(upload, status=status.HTTP_201_CREATED)
+
+
+@api_view(['PUT'])
+@permission_classes([permissions.IsAuthenticated])
+def document_upload_receive(request, token):
+    """Local storage stand-in for direct uploads: the request body is the file"""
+    if DocumentUploadService.uses_cloudinary():
+        return Response({'error': 'Upload directly to storage'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        metadata = DocumentUploadService.receive(token, request.user, request)
+    except DocumentUploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'file_size': metadata['file_size'], 'checksum': metadata['checksum']})
+
+
 class CaseNoteListCreateView(generics.ListCreateAPIView):
     """List all case notes or create a new note"""
     queryset = CaseNote.objects.all()
@@ -261,19 +371,52 @@ class CaseNoteListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
+class CaseNoteTimelinePagination(CursorPagination):
+    """Newest first; cursors stay stable while new notes are being added"""
+    # id breaks ties between notes saved in the same instant
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CaseNoteTimelineView(generics.ListAPIView):
+    """Page through the full note history of one case"""
+    serializer_class = CaseNoteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CaseNoteTimelinePagination
+
+    def get_queryset(self):
+        case = get_object_or_404(Case, pk=self.kwargs['pk'])
+        return CaseNote.objects.filter(case=case).select_related('created_by')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def case_search(request):
+    """Ranked search across families, children, cases and case notes"""
+    text = request.query_params.get('q', '').strip()
+    if len(text) < 2:
+        return Response({'query': text, 'results': []})
+
+    types = [t.strip().upper() for t in request.query_params.get('types', '').split(',') if t.strip()]
+    unknown = set(types) - set(SearchEntry.EntityType.values)
+    if unknown:
+        return Response({'error': f"Unknown types: {', '.join(sorted(unknown))}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', CaseSearchService.DEFAULT_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    hits = CaseSearchService.search(text, types or None, max(limit, 1))
+    return Response({'query': text, 'results': SearchHitSerializer(hits, many=True).data})
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def case_statistics(request):
     """Get case management statistics"""
-    stats = {
-        'total_families': Family.objects.filter(is_active=True).count(),
-        'total_children': Child.objects.filter(is_active=True).count(),
-        'total_cases': Case.objects.count(),
-        'open_cases': Case.objects.filter(status=Case.Status.OPEN).count(),
-        'high_priority_cases': Case.objects.filter(priority=Case.Priority.HIGH).count(),
-        'critical_families': Family.objects.filter(vulnerability_level=Family.VulnerabilityLevel.CRITICAL).count(),
-    }
-    return Response(stats)
+    return Response(CaseStatisticsService.get())
 
 
 @api_view(['GET'])
@@ -304,3 +447,157 @@ def export_case_summary_pdf(request, pk):
         return response
     except Case.DoesNotExist:
         return Response({'error': 'Case not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+EXPORT_JOB_KIND = 'case_pdf_export'
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsAdminOrManagement])
+def case_export_create(request):
+    """
+    Queue a batch PDF export of case summaries or assessments.
+    Returns a job immediately; poll case_export_status, then download.
+    """
+    from .tasks import export_case_documents
+
+    serializer = CaseBatchExportSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    filters = {name: str(value) for name, value in serializer.validated_data.items() if name != 'kind'}
+    kind = serializer.validated_data['kind']
+
+    total = CaseBatchExportService.queryset(kind, filters).count()
+    if not total:
+        return Response({'error': 'No records match these filters'}, status=status.HTTP_400_BAD_REQUEST)
+    if total > CaseBatchExportService.MAX_DOCUMENTS:
+        return Response(
+            {'error': f'Exports are limited to {CaseBatchExportService.MAX_DOCUMENTS} documents; {total} match. Narrow the filters.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    job = create_job(EXPORT_JOB_KIND, user=request.user, progress={'processed': 0, 'total': total})
+    run_in_background(export_case_documents, job_id=job['id'], kind=kind, filters=filters)
+
+    log_analytics_event(
+        event_type='CASE_EXPORT_REQUESTED',
+        description=f'Requested batch export of {total} {kind.replace("_", " ")}',
+        user=request.user,
+        request=request,
+        event_data={'job_id': job['id'], 'kind': kind, 'filters': filters}
+    )
+    return Response(get_job(job['id']) or job, status=status.HTTP_202_ACCEPTED)
+
+
+def _get_job(request, job_id, kind):
+    job = get_job(job_id)
+    if job is None or job.get('kind') != kind:
+        return None
+    # Jobs carry sensitive case data: only the requester or an admin
+    if job.get('requested_by') != str(request.user.id) and not IsAdminOrManagement().has_permission(request, None):
+        return None
+    return job
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def case_export_status(request, job_id):
+    """Progress of a batch PDF export"""
+    job = _get_job(request, job_id, EXPORT_JOB_KIND)
+    if job is None:
+        return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def case_export_download(request, job_id):
+    """Download the zip archive of a completed batch export"""
+    job = _get_job(request, job_id, EXPORT_JOB_KIND)
+    if job is None:
+        return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job['status'] != JobStatus.COMPLETED:
+        return Response({'error': 'Export is not ready yet', 'status': job['status']}, status=status.HTTP_409_CONFLICT)
+
+    archive = storages['exports'].open(job['result']['file'], 'rb')
+    return FileResponse(archive, as_attachment=True, filename=f"case_export_{str(job_id)[:8]}.zip")
+
+
+IMPORT_JOB_KIND = 'family_import'
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsAdminOrManagement])
+def family_import_create(request):
+    """
+    Queue a bulk import of families and children from a CSV or XLSX file.
+    Returns a job immediately; poll family_import_status for row-level errors.
+    """
+    from .tasks import import_families
+
+    serializer = FamilyImportSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.validated_data['file']
+    dry_run = serializer.validated_data['dry_run']
+    file_format = upload.name.rsplit('.', 1)[-1].lower()
+
+    job = create_job(IMPORT_JOB_KIND, user=request.user, progress={'rows': 0, 'total': None}, dry_run=dry_run)
+    # Saved for the worker, which deletes it once the import has run
+    file_name = storages['exports'].save(f"{FamilyImportService.UPLOAD_DIR}{job['id']}.{file_format}", upload)
+    run_in_background(import_families, job_id=job['id'], file_name=file_name, file_format=file_format, dry_run=dry_run)
+
+    log_analytics_event(
+        event_type='FAMILY_IMPORT_REQUESTED',
+        description=f'Requested {"validation" if dry_run else "import"} of family registry {upload.name}',
+        user=request.user,
+        request=request,
+        event_data={'job_id': job['id'], 'file_name': upload.name, 'size': upload.size}
+    )
+    return Response(get_job(job['id']) or job, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def family_import_status(request, job_id):
+    """Progress and row-level errors of a family import"""
+    job = _get_job(request, job_id, IMPORT_JOB_KIND)
+    if job is None:
+        return Response({'error': 'Import not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def family_import_errors(request, job_id):
+    """CSV of every row a family import rejected, with the column and reason"""
+    job = _get_job(request, job_id, IMPORT_JOB_KIND)
+    if job is None:
+        return Response({'error': 'Import not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job['status'] != JobStatus.COMPLETED:
+        return Response({'error': 'Import is not finished yet', 'status': job['status']}, status=status.HTTP_409_CONFLICT)
+    if not job['result'].get('error_report'):
+        return Response({'error': 'No rows were rejected'}, status=status.HTTP_404_NOT_FOUND)
+
+    report = storages['exports'].open(job['result']['error_report'], 'rb')
+    return FileResponse(
+        report, as_attachment=True, content_type='text/csv', filename=f"family_import_errors_{str(job_id)[:8]}.csv"
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def family_import_template(request):
+    """Empty CSV with the columns a family import understands"""
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="family_import_template.csv"'
+    csv.writer(response).writerow(FamilyImportService.template_columns())
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def family_map(request):
+    """
+    Compact GeoJSON of active families in a map viewport:
+    ?bbox=min_lng,min_lat,max_lng,max_lat&zoom=N. Clustered at low zoom.
+    """
+    return Response(FamilyMapLayer.feature_collection(request))
@@ -2,6 +2,8 @@
 ASGI config for kindra_cbo project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP is handled by Django; WebSocket connections are dispatched by path to the
+plain ASGI applications in ``websocket_routes``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -13,4 +15,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindra_cbo.settings')
 
-application = get_asgi_application()
+# Set up Django before importing anything that touches models
+django_application = get_asgi_application()
+
+from kindra_cbo.log_filters import install_access_log_filter  # noqa: E402
+from social_chat.consumers import chat_websocket_application  # noqa: E402
+
+install_access_log_filter()
+
+websocket_routes = {
+    '/ws/chat/': chat_websocket_application,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        path = scope['path'] if scope['path'].endswith('/') else scope['path'] + '/'
+        handler = websocket_routes.get(path)
+        if handler is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
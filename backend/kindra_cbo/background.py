@@ -0,0 +1,84 @@
+"""
+Background Execution Helpers
+Dispatches work to Celery, falling back to a bounded in-process thread pool
+when the broker is unreachable.
+
+The pool has a fixed number of workers and a queue limit, so a traffic spike
+during a broker outage cannot spawn an unbounded number of threads. When the
+queue is full the caller runs the job itself, which applies back-pressure
+instead of dropping work.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger('kindra_cbo')
+
+
+class BoundedExecutor:
+    """Thread pool that refuses new jobs once `max_workers + queue_limit` are pending"""
+
+    def __init__(self, max_workers, queue_limit):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='kindra-background'
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + queue_limit)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule `fn`; returns a Future, or None if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            return self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Background job {getattr(fn, '__name__', fn)} failed: {str(e)}")
+        finally:
+            # Worker threads keep their own DB connections; honour CONN_MAX_AGE
+            close_old_connections()
+            self._slots.release()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide fallback executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor(
+                    max_workers=settings.BACKGROUND_MAX_WORKERS,
+                    queue_limit=settings.BACKGROUND_QUEUE_LIMIT
+                )
+    return _executor
+
+
+def run_in_background(task, *args, **kwargs):
+    """
+    Run a Celery task asynchronously.
+    Tries the broker first, then the bounded in-process pool, and finally
+    runs the task inline if the pool is saturated.
+    """
+    try:
+        task.delay(*args, **kwargs)
+        return
+    except Exception as e:
+        logger.warning(f"Celery unavailable for {task.name}, using in-process executor. Error: {str(e)}")
+
+    if get_executor().submit(task, *args, **kwargs) is None:
+        logger.warning(f"Background executor saturated, running {task.name} inline")
+        task(*args, **kwargs)
@@ -0,0 +1,367 @@
+"""
+Spatial Query Helpers
+Bounding-box and proximity filtering, and clustered GeoJSON map tiles, for
+models with plain latitude/longitude decimal columns (families, shelter homes).
+
+Every query starts with a latitude/longitude range, which a composite
+(latitude, longitude) index answers without a table scan. Only the rows
+inside that box are then ranked by great-circle (Haversine) distance. This
+needs neither PostGIS nor GDAL, and it behaves the same on SQLite.
+"""
+
+import math
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Floor, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+class BoundingBox:
+    """A latitude/longitude rectangle; may cross the antimeridian"""
+
+    def __init__(self, min_lat, min_lng, max_lat, max_lng):
+        self.min_lat, self.min_lng, self.max_lat, self.max_lng = min_lat, min_lng, max_lat, max_lng
+
+    @classmethod
+    def around(cls, lat, lng, radius_km):
+        """Smallest box containing every point within `radius_km` of (lat, lng)"""
+        delta_lat = radius_km / KM_PER_DEGREE_LATITUDE
+        min_lat, max_lat = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+        # Longitude degrees shrink towards the poles; the box's widest
+        # latitude decides how far it must reach
+        widest = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        if widest < 1e-6:
+            return cls(min_lat, -180.0, max_lat, 180.0)
+        delta_lng = radius_km / (KM_PER_DEGREE_LATITUDE * widest)
+        if delta_lng >= 180:
+            return cls(min_lat, -180.0, max_lat, 180.0)
+        return cls(min_lat, _wrap_longitude(lng - delta_lng), max_lat, _wrap_longitude(lng + delta_lng))
+
+    def q(self, lat_field='latitude', lng_field='longitude'):
+        """Filter matching points inside the box"""
+        q = Q(**{f'{lat_field}__gte': self.min_lat, f'{lat_field}__lte': self.max_lat})
+        if self.min_lng <= self.max_lng:
+            return q & Q(**{f'{lng_field}__gte': self.min_lng, f'{lng_field}__lte': self.max_lng})
+        return q & (Q(**{f'{lng_field}__gte': self.min_lng}) | Q(**{f'{lng_field}__lte': self.max_lng}))
+
+
+def _wrap_longitude(lng):
+    return (lng + 180.0) % 360.0 - 180.0
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points, in kilometres"""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_km(lat, lng, lat_field='latitude', lng_field='longitude'):
+    """Database expression for the Haversine distance from (lat, lng) to each row"""
+    row_lat = Cast(F(lat_field), FloatField())
+    row_lng = Cast(F(lng_field), FloatField())
+    a = (
+        Power(Sin(Radians(row_lat - Value(lat)) / 2), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(Radians(row_lat)) * Power(Sin(Radians(row_lng - Value(lng)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def within_radius(queryset, lat, lng, radius_km, lat_field='latitude', lng_field='longitude'):
+    """Rows within `radius_km` of (lat, lng), annotated with distance_km"""
+    return queryset.filter(BoundingBox.around(lat, lng, radius_km).q(lat_field, lng_field)).annotate(
+        distance_km=distance_km(lat, lng, lat_field, lng_field)
+    ).filter(distance_km__lte=radius_km)
+
+
+def nearest(queryset, lat, lng, count, max_radius_km, start_radius_km=5.0, lat_field='latitude', lng_field='longitude'):
+    """
+    Radius around (lat, lng) that holds the `count` nearest rows, capped at
+    `max_radius_km`. The search radius doubles until enough rows fall inside
+    it, so each step is a cheap indexed range count and only the final
+    candidates are ranked.
+    """
+    radius = min(start_radius_km, max_radius_km)
+    while radius < max_radius_km:
+        if within_radius(queryset, lat, lng, radius, lat_field, lng_field).count() >= count:
+            return radius
+        radius = min(radius * 2, max_radius_km)
+    return max_radius_km
+
+
+class GeoFilterBackend(BaseFilterBackend):
+    """
+    Spatial filters for list endpoints of models with latitude/longitude:
+
+    ?bbox=min_lng,min_lat,max_lng,max_lat   only rows inside the box (GeoJSON order)
+    ?near=lat,lng&radius_km=10              rows within the radius, nearest first
+    ?near=lat,lng&nearest=20                the 20 nearest rows
+
+    Proximity results are annotated with distance_km. Views may override
+    the column names with geo_fields = (lat_field, lng_field).
+    """
+
+    DEFAULT_RADIUS_KM = 25
+    MAX_RADIUS_KM = 1000
+    MAX_NEAREST = 200
+
+    @staticmethod
+    def _floats(value, count, name):
+        try:
+            numbers = [float(part) for part in value.split(',')]
+        except ValueError:
+            numbers = []
+        if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+            raise ValidationError({name: f'Expected {count} comma-separated numbers.'})
+        return numbers
+
+    @staticmethod
+    def _check_point(lat, lng, name):
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValidationError({name: 'Coordinates are out of range.'})
+
+    @classmethod
+    def parse_bbox(cls, value):
+        min_lng, min_lat, max_lng, max_lat = cls._floats(value, 4, 'bbox')
+        cls._check_point(min_lat, min_lng, 'bbox')
+        cls._check_point(max_lat, max_lng, 'bbox')
+        if min_lat > max_lat:
+            raise ValidationError({'bbox': 'min_lat must not exceed max_lat.'})
+        # min_lng > max_lng is a box crossing the antimeridian
+        return BoundingBox(min_lat, min_lng, max_lat, max_lng)
+
+    def filter_queryset(self, request, queryset, view):
+        lat_field, lng_field = getattr(view, 'geo_fields', ('latitude', 'longitude'))
+        params = request.query_params
+
+        if params.get('bbox'):
+            queryset = queryset.filter(self.parse_bbox(params['bbox']).q(lat_field, lng_field))
+
+        if not params.get('near'):
+            return queryset
+
+        lat, lng = self._floats(params['near'], 2, 'near')
+        self._check_point(lat, lng, 'near')
+        try:
+            radius = float(params.get('radius_km', self.DEFAULT_RADIUS_KM))
+            count = int(params['nearest']) if params.get('nearest') else None
+        except ValueError:
+            raise ValidationError({'near': 'radius_km and nearest must be numbers.'})
+        if not 0 < radius <= self.MAX_RADIUS_KM:
+            raise ValidationError({'radius_km': f'Must be between 0 and {self.MAX_RADIUS_KM}.'})
+        if count is not None and not 0 < count <= self.MAX_NEAREST:
+            raise ValidationError({'nearest': f'Must be between 1 and {self.MAX_NEAREST}.'})
+
+        if count is not None:
+            max_radius = radius if 'radius_km' in params else self.MAX_RADIUS_KM
+            radius = nearest(queryset, lat, lng, count, max_radius, lat_field=lat_field, lng_field=lng_field)
+
+        queryset = within_radius(queryset, lat, lng, radius, lat_field, lng_field)
+        if count is not None:
+            ranked = queryset.order_by('distance_km', 'pk').values('pk')[:count]
+            queryset = queryset.filter(pk__in=ranked)
+        return queryset.order_by('distance_km')
+
+
+class MapLayer:
+    """
+    Compact GeoJSON for a map viewport, built tile by tile.
+
+    The viewport is split into Web Mercator tiles (the z/x/y grid used by
+    Leaflet and OpenStreetMap) at the requested zoom. Each tile is cached
+    separately, so panning only computes tiles not seen before. Below
+    CLUSTER_MAX_ZOOM, or when a tile holds too many points, each tile is
+    summarised as a grid of clusters with one grouped query. Otherwise
+    individual points are sent with only the `properties` listed on the layer.
+
+    Subclasses set `name`, `properties` and `queryset(user)`, and call
+    invalidate() when their points change. The layer's version, part of every
+    tile key, is a counter in the same cache as the tiles, bumped atomically
+    with cache.incr. It is seeded from the clock in microseconds, so a counter
+    lost to eviction restarts above every number handed out before.
+    """
+
+    name = None
+    properties = []
+    lat_field, lng_field = 'latitude', 'longitude'
+
+    CACHE_TTL = 60 * 10
+    MAX_ZOOM = 20
+    CLUSTER_MAX_ZOOM = 13
+    GRID_SIZE = 8
+    MAX_TILES = 64
+    MAX_POINTS_PER_TILE = 500
+    MAX_MERCATOR_LAT = 85.05112878
+
+    @classmethod
+    def queryset(cls, user):
+        """Return (queryset, scope): the points `user` may see, and a cache key part
+        shared by every user who sees the same points (None to skip caching)"""
+        raise NotImplementedError
+
+    @classmethod
+    def version_key(cls):
+        return f'map:{cls.name}:version'
+
+    @staticmethod
+    def _version_seed():
+        return time.time_ns() // 1000
+
+    @classmethod
+    def current_version(cls):
+        key = cls.version_key()
+        version = cache.get(key)
+        if version is None:
+            seed = cls._version_seed()
+            # Another process may have seeded it first
+            version = seed if cache.add(key, seed, timeout=None) else cache.get(key, seed)
+        return version
+
+    @classmethod
+    def bump_version(cls):
+        try:
+            cache.incr(cls.version_key())
+        except ValueError:
+            # Evicted or never read: a fresh seed is already past every old version
+            cache.add(cls.version_key(), cls._version_seed(), timeout=None)
+
+    @classmethod
+    def invalidate(cls):
+        """Retire every cached tile once the current transaction commits"""
+        # Bulk writes call this per row; one bump per transaction is enough.
+        # Registered callbacks are dropped on rollback, so this check never
+        # suppresses the bump for a later transaction.
+        if any(callback == cls.bump_version for _, callback, _ in connection.run_on_commit):
+            return
+        # The points are already committed: a failed bump is logged, not
+        # raised into the write, and only delays fresh tiles by CACHE_TTL
+        transaction.on_commit(cls.bump_version, robust=True)
+
+    @staticmethod
+    def tile_x(lng, zoom):
+        return int((lng + 180.0) / 360.0 * (1 << zoom))
+
+    @classmethod
+    def tile_y(cls, lat, zoom):
+        lat = math.radians(max(-cls.MAX_MERCATOR_LAT, min(cls.MAX_MERCATOR_LAT, lat)))
+        return int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * (1 << zoom))
+
+    @staticmethod
+    def tile_bounds(zoom, x, y):
+        n = 1 << zoom
+        lat = lambda row: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+        return BoundingBox(lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0)
+
+    @classmethod
+    def tiles_covering(cls, bbox, zoom):
+        last = (1 << zoom) - 1
+        min_y, max_y = cls.tile_y(bbox.max_lat, zoom), cls.tile_y(bbox.min_lat, zoom)
+        if bbox.min_lng <= bbox.max_lng:
+            columns = range(cls.tile_x(bbox.min_lng, zoom), min(cls.tile_x(bbox.max_lng, zoom), last) + 1)
+        else:
+            columns = [*range(cls.tile_x(bbox.min_lng, zoom), last + 1), *range(0, cls.tile_x(bbox.max_lng, zoom) + 1)]
+        return [(x, y) for x in columns for y in range(min_y, min(max_y, last) + 1)]
+
+    @classmethod
+    def _in_tile(cls, queryset, bounds):
+        # Half-open, so a point on a tile edge is drawn once
+        return queryset.filter(**{
+            f'{cls.lat_field}__gte': bounds.min_lat, f'{cls.lat_field}__lt': bounds.max_lat,
+            f'{cls.lng_field}__gte': bounds.min_lng, f'{cls.lng_field}__lt': bounds.max_lng,
+        })
+
+    @staticmethod
+    def _json_value(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, Decimal):
+            return float(value)
+        return str(value)
+
+    @classmethod
+    def _points(cls, queryset):
+        rows = list(queryset.values('pk', cls.lat_field, cls.lng_field, *cls.properties)[:cls.MAX_POINTS_PER_TILE + 1])
+        if len(rows) > cls.MAX_POINTS_PER_TILE:
+            return None
+        return [{
+            'type': 'Feature',
+            'id': str(row['pk']),
+            'geometry': {'type': 'Point', 'coordinates': [
+                round(float(row[cls.lng_field]), 5), round(float(row[cls.lat_field]), 5)
+            ]},
+            'properties': {name: cls._json_value(row[name]) for name in cls.properties},
+        } for row in rows]
+
+    @classmethod
+    def _clusters(cls, queryset, bounds):
+        lat = Cast(F(cls.lat_field), FloatField())
+        lng = Cast(F(cls.lng_field), FloatField())
+        cell_height = (bounds.max_lat - bounds.min_lat) / cls.GRID_SIZE
+        cell_width = (bounds.max_lng - bounds.min_lng) / cls.GRID_SIZE
+        cells = queryset.annotate(
+            cell_row=Floor((lat - Value(bounds.min_lat)) / Value(cell_height)),
+            cell_column=Floor((lng - Value(bounds.min_lng)) / Value(cell_width)),
+        ).values('cell_row', 'cell_column').annotate(
+            point_count=Count('pk'), center_lat=Avg(lat), center_lng=Avg(lng)
+        ).order_by()
+        return [{
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(cell['center_lng'], 4), round(cell['center_lat'], 4)]},
+            'properties': {'cluster': True, 'count': cell['point_count']},
+        } for cell in cells]
+
+    @classmethod
+    def tile(cls, queryset, zoom, x, y, scope=None, version=None):
+        """Features for one tile, from the cache when the layer hasn't changed"""
+        key = None
+        if scope is not None:
+            if version is None:
+                version = cls.current_version()
+            key = f'map:{cls.name}:{version}:{scope}:{zoom}:{x}:{y}'
+            features = cache.get(key)
+            if features is not None:
+                return features
+
+        bounds = cls.tile_bounds(zoom, x, y)
+        in_tile = cls._in_tile(queryset, bounds)
+        features = cls._points(in_tile) if zoom > cls.CLUSTER_MAX_ZOOM else None
+        if features is None:
+            features = cls._clusters(in_tile, bounds)
+
+        if key is not None:
+            cache.set(key, features, cls.CACHE_TTL)
+        return features
+
+    @classmethod
+    def feature_collection(cls, request):
+        """GeoJSON FeatureCollection for ?bbox=min_lng,min_lat,max_lng,max_lat&zoom="""
+        params = request.query_params
+        if not params.get('bbox'):
+            raise ValidationError({'bbox': 'This parameter is required.'})
+        bbox = GeoFilterBackend.parse_bbox(params['bbox'])
+        try:
+            zoom = int(params.get('zoom', ''))
+        except ValueError:
+            raise ValidationError({'zoom': 'Must be a whole number.'})
+        if not 0 <= zoom <= cls.MAX_ZOOM:
+            raise ValidationError({'zoom': f'Must be between 0 and {cls.MAX_ZOOM}.'})
+
+        tiles = cls.tiles_covering(bbox, zoom)
+        if len(tiles) > cls.MAX_TILES:
+            raise ValidationError({'bbox': 'The viewport is too large for this zoom level.'})
+
+        queryset, scope = cls.queryset(request.user)
+        version = cls.current_version() if scope is not None else None
+        features = []
+        for x, y in tiles:
+            features.extend(cls.tile(queryset, zoom, x, y, scope, version))
+        return {'type': 'FeatureCollection', 'zoom': zoom, 'features': features}
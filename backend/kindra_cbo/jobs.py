@@ -0,0 +1,95 @@
+"""
+Background Job Progress Tracking
+Status records for long-running Celery jobs so that API endpoints can enqueue
+work and let the client poll for progress.
+
+Celery results are disabled in settings (CELERY_TASK_IGNORE_RESULT), so jobs
+report their own progress here instead. Records live in the database
+(accounts.BackgroundJob) rather than the cache: the cache may be per-process
+LocMem, and a job's progress is written by a worker but read by whichever web
+process answers the poll.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+JOB_TTL = 60 * 60 * 24  # Keep finished job records for a day
+
+
+class JobStatus:
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+
+
+def _as_dict(job):
+    return {
+        **job.details,
+        'id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'requested_by': str(job.requested_by_id) if job.requested_by_id else None,
+        'progress': job.progress,
+        'result': job.result,
+        'error': job.error or None,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat(),
+    }
+
+
+def _expired():
+    from accounts.models import BackgroundJob
+    return BackgroundJob.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=JOB_TTL))
+
+
+def create_job(kind, user=None, progress=None, **details):
+    """Register a new job and return its record (including the generated `id`)"""
+    from accounts.models import BackgroundJob
+
+    _expired().delete()
+    job = BackgroundJob.objects.create(
+        kind=kind,
+        requested_by=user if user and user.is_authenticated else None,
+        progress=progress or {},
+        details=details,
+    )
+    return _as_dict(job)
+
+
+def get_job(job_id):
+    """Return the job record, or None if unknown or expired"""
+    from accounts.models import BackgroundJob
+
+    try:
+        job_id = uuid.UUID(str(job_id))
+    except ValueError:
+        return None
+    job = BackgroundJob.objects.filter(pk=job_id).first()
+    if job is None or job.updated_at < timezone.now() - timedelta(seconds=JOB_TTL):
+        return None
+    return _as_dict(job)
+
+
+def update_job(job_id, **fields):
+    """Merge `fields` into the job record; `progress` dicts are merged key by key"""
+    from accounts.models import BackgroundJob
+
+    with transaction.atomic():
+        job = BackgroundJob.objects.select_for_update().filter(pk=job_id).first()
+        if job is None:
+            return None
+        progress = fields.pop('progress', None)
+        if progress:
+            job.progress = {**job.progress, **progress}
+        for name in ('status', 'result'):
+            if name in fields:
+                setattr(job, name, fields.pop(name))
+        if 'error' in fields:
+            job.error = fields.pop('error') or ''
+        job.details = {**job.details, **fields}
+        job.save()
+    return _as_dict(job)
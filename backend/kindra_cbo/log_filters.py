@@ -0,0 +1,45 @@
+"""
+Logging Filters for Kindra CBO
+"""
+
+import logging
+import re
+
+# Streaming endpoints accept the JWT as ?token= because browsers cannot set
+# headers on EventSource/WebSocket; request lines must not leak it to logs
+TOKEN_PATTERN = re.compile(r'([?&](?:token|access_token)=)[^&\s"]*')
+
+
+def redact_tokens(value):
+    if isinstance(value, str):
+        return TOKEN_PATTERN.sub(r'\1[REDACTED]', value)
+    if isinstance(value, bytes):
+        return redact_tokens(value.decode('latin-1'))
+    return value
+
+
+class RedactTokenFilter(logging.Filter):
+    """Replace token query parameters in log messages and their arguments"""
+
+    def filter(self, record):
+        record.msg = redact_tokens(record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact_tokens(arg) for arg in record.args)
+        elif isinstance(record.args, dict):
+            record.args = {key: redact_tokens(arg) for key, arg in record.args.items()}
+        return True
+
+
+ACCESS_LOGGERS = ('uvicorn.access', 'gunicorn.access')
+
+
+def install_access_log_filter():
+    """
+    Redact tokens from the server's access log. gunicorn and uvicorn set up
+    these loggers themselves (listing them in LOGGING would drop their
+    handlers), so the filter is attached from the ASGI/WSGI entry points.
+    """
+    for name in ACCESS_LOGGERS:
+        logger = logging.getLogger(name)
+        if not any(isinstance(existing, RedactTokenFilter) for existing in logger.filters):
+            logger.addFilter(RedactTokenFilter())
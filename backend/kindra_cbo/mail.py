@@ -0,0 +1,184 @@
+"""
+Outbound Email Helpers
+Reuses one SMTP connection across messages instead of opening a new SSL
+session per email, and paces batches to stay within the provider's rate limit.
+
+Application code calls queue_email(). Emails queued within EMAIL_QUEUE_DELAY
+seconds of each other are sent as one paced batch by the send_queued_emails
+task, so a burst (registrations, notification fan-out) costs one handshake.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_connection = None
+_last_used = 0.0
+
+# At most one flush is scheduled per EMAIL_QUEUE_DELAY window
+FLUSH_SCHEDULED_KEY = 'mail:flush-scheduled'
+# A claim older than this belongs to a worker that died mid-send
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def build_message(recipient, subject, message, html_message=None, from_email=None):
+    """Build a plain-text email with an optional HTML alternative"""
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[recipient],
+    )
+    if html_message:
+        email.attach_alternative(html_message, 'text/html')
+    return email
+
+
+def _close_connection():
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+        _connection = None
+
+
+def _open_connection():
+    """Return the process-wide connection, reopening it if idle for too long"""
+    global _connection
+    if _connection is not None and time.monotonic() - _last_used > settings.EMAIL_CONNECTION_MAX_IDLE:
+        # The server has most likely dropped an idle session already
+        _close_connection()
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        _connection.open()
+    return _connection
+
+
+def send_pooled(messages):
+    """
+    Send messages over the process-wide persistent SMTP connection.
+    Reconnects once if the server closed the session. Returns the number sent.
+    """
+    global _last_used
+    with _lock:
+        for attempt in (1, 2):
+            connection = _open_connection()
+            try:
+                sent = connection.send_messages(messages) or 0
+                _last_used = time.monotonic()
+                return sent
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                _close_connection()
+                if attempt == 2:
+                    raise
+
+
+def send_batched(messages, batch_size=None, rate_per_minute=None):
+    """
+    Send many messages over one reused connection, pacing batches of
+    `batch_size` so no more than `rate_per_minute` go out per minute.
+    A failed message is logged and skipped so it does not hold up the rest.
+    Returns the number of messages sent.
+    """
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    rate_per_minute = rate_per_minute or settings.EMAIL_RATE_LIMIT_PER_MINUTE
+    interval = 60.0 * batch_size / rate_per_minute if rate_per_minute else 0
+
+    sent = 0
+    next_batch_at = time.monotonic()
+    for start in range(0, len(messages), batch_size):
+        delay = next_batch_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_batch_at = time.monotonic() + interval
+
+        # Messages go out one at a time on the shared connection so a single
+        # rejected address neither aborts nor duplicates the rest of the batch
+        for email in messages[start:start + batch_size]:
+            try:
+                sent += send_pooled([email])
+            except smtplib.SMTPException as e:
+                logger.error(f"Failed to send email to {', '.join(email.to)}: {str(e)}")
+    return sent
+
+
+def queue_email(recipient, subject, message, html_message=None):
+    """
+    Queue an email for grouped delivery once the current transaction commits.
+    Returns immediately; the send happens on a worker.
+    """
+    from accounts.models import QueuedEmail
+
+    QueuedEmail.objects.create(
+        recipient=recipient,
+        subject=subject,
+        message=message,
+        html_message=html_message or '',
+    )
+    transaction.on_commit(_schedule_flush)
+
+
+def _schedule_flush():
+    from kindra_cbo.background import run_in_background
+    from kindra_cbo.tasks import send_queued_emails
+
+    delay = settings.EMAIL_QUEUE_DELAY
+    if not cache.add(FLUSH_SCHEDULED_KEY, True, timeout=max(delay, 1)):
+        return  # The pending flush will pick this email up too
+    try:
+        send_queued_emails.apply_async(countdown=delay)
+    except Exception as e:
+        logger.warning(f"Celery unavailable for queued emails, sending in-process. Error: {str(e)}")
+        cache.delete(FLUSH_SCHEDULED_KEY)
+        run_in_background(send_queued_emails)
+
+
+def claim_queued_emails(limit):
+    """
+    Claim up to `limit` of the oldest unsent emails for this worker.
+    The claim is a conditional UPDATE, so concurrent flushes never share an email.
+    """
+    from accounts.models import QueuedEmail
+
+    now = timezone.now()
+    claimable = Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_TIMEOUT)
+    ids = list(QueuedEmail.objects.filter(claimable).values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    claim = uuid.uuid4()
+    QueuedEmail.objects.filter(claimable, id__in=ids).update(claim=claim, claimed_at=now)
+    return list(QueuedEmail.objects.filter(claim=claim))
+
+
+def send_queued(limit=None):
+    """
+    Send up to `limit` queued emails (a minute's worth by default) as one
+    paced batch, then delete them. Returns (sent, claimed).
+    """
+    from accounts.models import QueuedEmail
+
+    queued = claim_queued_emails(limit or settings.EMAIL_RATE_LIMIT_PER_MINUTE or settings.EMAIL_BATCH_SIZE)
+    if not queued:
+        return 0, 0
+    sent = send_batched([
+        build_message(email.recipient, email.subject, email.message, email.html_message or None)
+        for email in queued
+    ])
+    # Failures were logged by send_batched; retrying a refused address would only fail again
+    QueuedEmail.objects.filter(id__in=[email.id for email in queued]).delete()
+    return sent, len(queued)
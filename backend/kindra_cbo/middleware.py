@@ -4,8 +4,10 @@ Handles global exception handling and security
 """
 
 import logging
+import time
 import traceback
 from django.conf import settings
+from django.contrib.auth import SESSION_KEY
 from django.http import JsonResponse
 from django.db import DatabaseError, IntegrityError
 from rest_framework.exceptions import APIException, ValidationError, PermissionDenied, NotAuthenticated
@@ -118,3 +120,41 @@ class SecurityHeadersMiddleware:
             response['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
         
         return response
+
+
+class SessionRefreshMiddleware:
+    """
+    Sliding session expiry without a session write on every request.
+    Replaces SESSION_SAVE_EVERY_REQUEST: an unmodified session is only
+    re-saved (extending its expiry) once SESSION_REFRESH_THRESHOLD of
+    SESSION_COOKIE_AGE has passed since it was last written.
+    Must be placed after SessionMiddleware.
+    """
+    
+    REFRESHED_AT_KEY = '_session_refreshed_at'
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        
+        session = getattr(request, 'session', None)
+        if session is None or settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return response
+        # Only sessions that loaded from the store and belong to a signed-in
+        # user: writing to a stale cookie's empty session would create a new one
+        if session.is_empty() or session.session_key is None or SESSION_KEY not in session:
+            return response
+        
+        now = int(time.time())
+        if session.modified:
+            # Being saved anyway: record it so the next refresh is deferred
+            session[self.REFRESHED_AT_KEY] = now
+            return response
+        
+        refresh_interval = settings.SESSION_COOKIE_AGE * settings.SESSION_REFRESH_THRESHOLD
+        if now - session.get(self.REFRESHED_AT_KEY, 0) >= refresh_interval:
+            session[self.REFRESHED_AT_KEY] = now  # Marks the session modified
+        
+        return response
@@ -0,0 +1,267 @@
+"""
+Real-time Event Broker for Kindra CBO
+Fans out server-side events (new notifications, chat activity) to clients
+connected through the ASGI application.
+
+Uses Redis pub/sub when REALTIME_REDIS_URL is configured so that events
+published by any web or Celery process reach every ASGI worker. Without Redis
+an in-process broker is used, which is enough for single-node deployments,
+local development and tests.
+
+Brokers also keep presence sets: members (one per open connection) that
+expire unless refreshed, so a worker that dies without cleaning up does not
+leave users shown as online forever.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+
+logger = logging.getLogger('kindra_cbo')
+
+CHANNEL_PREFIX = 'kindra:rt:'
+
+
+class Subscription(ABC):
+    """
+    Handle returned by ``broker.subscribe()``.
+    Await ``get()`` for the next event and always ``close()`` when done
+    (or use ``async with``).
+    """
+
+    def __init__(self, channels):
+        self.channels = tuple(channels)
+
+    @abstractmethod
+    async def get(self, timeout=None):
+        """Return the next event payload, or None if `timeout` seconds pass first."""
+
+    @abstractmethod
+    async def close(self):
+        """Stop receiving events and release the connection."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class _LocalSubscription(Subscription):
+    """Subscription fed by InMemoryBroker through a per-connection asyncio queue"""
+
+    def __init__(self, broker, channels, loop, max_queue_size):
+        super().__init__(channels)
+        self._broker = broker
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=max_queue_size)
+
+    def _deliver(self, message):
+        # Publishers may run on any thread (sync views, signals), so hand the
+        # message to the subscriber's own event loop.
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # Event loop already closed; the connection is gone.
+            self._broker._unsubscribe(self)
+
+    def _put(self, message):
+        if self._queue.full():
+            # Slow consumer: drop the oldest event rather than grow unbounded
+            self._queue.get_nowait()
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        try:
+            message = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return json.loads(message)
+
+    async def close(self):
+        self._broker._unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Process-local pub/sub broker.
+    Only reaches subscribers living in the same process as the publisher.
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = {}
+        self._presence = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, payload):
+        message = json.dumps(payload, default=str)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription._deliver(message)
+        return len(subscribers)
+
+    async def subscribe(self, *channels):
+        subscription = _LocalSubscription(
+            self, channels, asyncio.get_running_loop(), self.max_queue_size
+        )
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def touch_presence(self, key, member, ttl):
+        with self._lock:
+            self._presence.setdefault(key, {})[member] = time.time() + ttl
+
+    def remove_presence(self, key, member):
+        with self._lock:
+            members = self._presence.get(key, {})
+            members.pop(member, None)
+
+    def get_presence(self, key):
+        now = time.time()
+        with self._lock:
+            members = self._presence.get(key, {})
+            for member in [m for m, expires in members.items() if expires <= now]:
+                del members[member]
+            return list(members)
+
+
+class _RedisSubscription(Subscription):
+    """Subscription backed by a dedicated async Redis pub/sub connection"""
+
+    def __init__(self, client, pubsub, channels):
+        super().__init__(channels)
+        self._client = client
+        self._pubsub = pubsub
+
+    async def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            message = await self._pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=remaining,
+            )
+            if message is not None:
+                return json.loads(message['data'])
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+    async def close(self):
+        try:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.aclose()
+            await self._client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing realtime subscription: {str(e)}")
+
+
+class RedisBroker:
+    """
+    Redis pub/sub broker shared by every web, ASGI and Celery process.
+    Publishing is synchronous so it can be called from ordinary views and tasks.
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=5, socket_connect_timeout=5
+        )
+
+    def publish(self, channel, payload):
+        return self._client.publish(
+            CHANNEL_PREFIX + channel, json.dumps(payload, default=str)
+        )
+
+    async def subscribe(self, *channels):
+        import redis.asyncio as aioredis
+
+        client = aioredis.from_url(self.url, socket_connect_timeout=5)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*[CHANNEL_PREFIX + channel for channel in channels])
+        return _RedisSubscription(client, pubsub, channels)
+
+    # Presence sets are sorted sets scored by expiry time
+
+    def touch_presence(self, key, member, ttl):
+        self._client.zadd(CHANNEL_PREFIX + key, {member: time.time() + ttl})
+
+    def remove_presence(self, key, member):
+        self._client.zrem(CHANNEL_PREFIX + key, member)
+
+    def get_presence(self, key):
+        name = CHANNEL_PREFIX + key
+        now = time.time()
+        pipe = self._client.pipeline()
+        pipe.zremrangebyscore(name, '-inf', now)
+        pipe.zrangebyscore(name, now, '+inf')
+        return [member.decode() for member in pipe.execute()[1]]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker, building it from settings on first use"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'REALTIME_REDIS_URL', '')
+                if url:
+                    _broker = RedisBroker(url)
+                else:
+                    _broker = InMemoryBroker(
+                        max_queue_size=getattr(settings, 'REALTIME_MAX_QUEUE_SIZE', 100)
+                    )
+    return _broker
+
+
+def publish(channel, payload):
+    """
+    Publish an event to a channel.
+    Never raises: real-time delivery is best-effort and must not break the
+    request or task that produced the event.
+    """
+    try:
+        return get_broker().publish(channel, payload)
+    except Exception as e:
+        logger.warning(f"Realtime publish to {channel} failed: {str(e)}")
+        return 0
+
+
+def user_channel(user_id):
+    """Channel carrying events addressed to a single user"""
+    return f"user:{user_id}"
+
+
+def format_sse(data, event=None, event_id=None):
+    """Encode one Server-Sent Events frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
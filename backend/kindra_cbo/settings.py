@@ -85,6 +85,7 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files in production
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'kindra_cbo.middleware.SessionRefreshMiddleware',  # Coalesces session expiry writes
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -115,6 +116,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'kindra_cbo.wsgi.application'
+ASGI_APPLICATION = 'kindra_cbo.asgi.application'
 
 # ==================================
 # DATABASE CONFIGURATION
@@ -178,9 +180,14 @@ else:
             "LOCATION": "unique-snowflake",
         }
     }
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
 # Session configuration
+# Sessions live in Redis when it is available; otherwise cached_db serves
+# reads from the local cache and only writes through to the DB on change.
+if _django_redis_available:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 SESSION_CACHE_ALIAS = 'default'
 
 # ==================================
@@ -240,6 +247,10 @@ MAX_UPLOAD_SIZE = config('MAX_UPLOAD_SIZE_MB', default=10, cast=int) * 1024 * 10
 DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
 FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE
 
+# Case documents are uploaded directly to storage and may be large scans
+DOCUMENT_MAX_UPLOAD_SIZE = config('DOCUMENT_MAX_UPLOAD_SIZE_MB', default=50, cast=int) * 1024 * 1024
+DOCUMENT_UPLOAD_TOKEN_MAX_AGE = 60 * 60
+
 # ==================================
 # CLOUDINARY FILE STORAGE (Production)
 # ==================================
@@ -264,6 +275,10 @@ if config('CLOUDINARY_CLOUD_NAME', default=''):
         "default": {
             "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
         },
+        # Zip archives and other non-media files
+        "exports": {
+            "BACKEND": "cloudinary_storage.storage.RawMediaCloudinaryStorage",
+        },
         "staticfiles": {
             "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
         },
@@ -274,6 +289,9 @@ else:
         "default": {
             "BACKEND": "django.core.files.storage.FileSystemStorage",
         },
+        "exports": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+        },
         "staticfiles": {
             "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
         },
@@ -390,6 +408,13 @@ CELERY_BROKER_TRANSPORT_OPTIONS = {
     'socket_connect_timeout': 5.0,
 }
 
+# In-process fallback when the broker is unreachable (see kindra_cbo.background)
+BACKGROUND_MAX_WORKERS = config('BACKGROUND_MAX_WORKERS', default=4, cast=int)
+BACKGROUND_QUEUE_LIMIT = config('BACKGROUND_QUEUE_LIMIT', default=100, cast=int)
+
+# Worker processes used to render PDFs for batch case exports
+PDF_EXPORT_PROCESSES = config('PDF_EXPORT_PROCESSES', default=2, cast=int)
+
 # Scheduled periodic tasks
 CELERY_BEAT_SCHEDULE = {
     'cleanup-old-notifications-daily': {
@@ -397,8 +422,23 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': 86400,  # Every 24 hours (seconds)
         'kwargs': {'days': 90},
     },
+    'send-queued-emails': {
+        'task': 'kindra_cbo.tasks.send_queued_emails',
+        'schedule': 60,  # Picks up emails whose worker died mid-send
+    },
 }
 
+# ==================================
+# REAL-TIME EVENTS (SSE / WebSocket)
+# ==================================
+# Redis pub/sub fans events out across all ASGI workers; without it an
+# in-process broker is used (single-node deployments and tests).
+
+REALTIME_REDIS_URL = config('REALTIME_REDIS_URL', default=_REDIS_URL)
+REALTIME_KEEPALIVE_SECONDS = config('REALTIME_KEEPALIVE_SECONDS', default=25, cast=int)
+REALTIME_MAX_QUEUE_SIZE = 100  # Per-connection buffer before old events are dropped
+LONG_POLL_MAX_WAIT_SECONDS = 25  # Upper bound a long-poll request is held open
+
 # ==================================
 # EMAIL CONFIGURATION (Zoho SMTP)
 # ==================================
@@ -413,6 +453,12 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 EMAIL_TIMEOUT = 60
 
+# Connection reuse and batching (see kindra_cbo.mail)
+EMAIL_CONNECTION_MAX_IDLE = config('EMAIL_CONNECTION_MAX_IDLE', default=30, cast=int)  # Seconds before reconnecting
+EMAIL_BATCH_SIZE = config('EMAIL_BATCH_SIZE', default=50, cast=int)
+EMAIL_RATE_LIMIT_PER_MINUTE = config('EMAIL_RATE_LIMIT_PER_MINUTE', default=60, cast=int)  # Provider sending limit
+EMAIL_QUEUE_DELAY = config('EMAIL_QUEUE_DELAY', default=5, cast=int)  # Seconds queued emails wait to be grouped
+
 
 # Email templates
 EMAIL_TEMPLATES = {
@@ -485,7 +531,8 @@ CSP_CONNECT_SRC = ("'self'", config('CORS_ALLOWED_ORIGINS', default='', cast=str
 SESSION_COOKIE_AGE = 3600  # 1 hour
 SESSION_COOKIE_HTTPONLY = True  # Prevent JavaScript access
 SESSION_COOKIE_SAMESITE = 'Lax'  # Relaxed for dev
-SESSION_SAVE_EVERY_REQUEST = True  # Extend session on each request
+SESSION_SAVE_EVERY_REQUEST = False  # Expiry is extended by SessionRefreshMiddleware instead
+SESSION_REFRESH_THRESHOLD = 0.25  # Re-save once this fraction of SESSION_COOKIE_AGE has elapsed
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 # CSRF Protection
@@ -512,17 +559,24 @@ LOGGING = {
             'style': '{',
         },
     },
+    'filters': {
+        'redact_tokens': {
+            '()': 'kindra_cbo.log_filters.RedactTokenFilter',
+        },
+    },
     'handlers': {
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'logs' / 'kindra_cbo.log',
             'formatter': 'verbose',
+            'filters': ['redact_tokens'],
         },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
+            'filters': ['redact_tokens'],
         },
     },
     'loggers': {
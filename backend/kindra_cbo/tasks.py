@@ -48,19 +48,12 @@ def backup_database():
 def send_email_notification(recipient, subject, message, html_message=None):
     """
     Send email notification
+    Reuses the worker's persistent SMTP connection (see kindra_cbo.mail)
     """
-    from django.core.mail import send_mail
-    from django.conf import settings
+    from kindra_cbo.mail import build_message, send_pooled
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[recipient],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        send_pooled([build_message(recipient, subject, message, html_message)])
         logger.info(f"Email sent to {recipient}: {subject}")
         return f"Email sent to {recipient}"
     except Exception as e:
@@ -68,6 +61,50 @@ def send_email_notification(recipient, subject, message, html_message=None):
         raise
 
 
+@shared_task(name='kindra_cbo.tasks.send_email_batch', ignore_result=True)
+def send_email_batch(messages):
+    """
+    Send a group of emails over a single SMTP connection, paced to respect
+    EMAIL_RATE_LIMIT_PER_MINUTE.
+    `messages` is a list of dicts with recipient, subject, message and
+    optional html_message keys.
+    Pacing can sleep for minutes, so queue this with .delay() on a worker;
+    never through run_in_background, whose fallback may run it inline.
+    """
+    from kindra_cbo.mail import build_message, send_batched
+
+    emails = [
+        build_message(
+            item['recipient'],
+            item['subject'],
+            item['message'],
+            item.get('html_message')
+        )
+        for item in messages
+    ]
+    sent = send_batched(emails)
+    logger.info(f"Email batch sent: {sent}/{len(emails)} delivered.")
+    return f"Sent {sent} of {len(emails)} emails"
+
+
+@shared_task(name='kindra_cbo.tasks.send_queued_emails', ignore_result=True)
+def send_queued_emails():
+    """
+    Send the emails queued with kindra_cbo.mail.queue_email, one minute's
+    worth per run over a single connection. Re-queues itself while more are
+    waiting; the beat schedule also runs it to pick up abandoned claims.
+    """
+    from django.conf import settings
+    from kindra_cbo.mail import send_queued
+
+    sent, claimed = send_queued()
+    if claimed:
+        logger.info(f"Queued emails sent: {sent}/{claimed} delivered.")
+    if claimed and claimed >= (settings.EMAIL_RATE_LIMIT_PER_MINUTE or settings.EMAIL_BATCH_SIZE):
+        send_queued_emails.delay()
+    return f"Sent {sent} of {claimed} queued emails"
+
+
 @shared_task
 def send_sms_notification(phone_number, message):
     """
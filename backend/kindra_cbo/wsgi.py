@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindra_cbo.settings')
 
 application = get_wsgi_application()
+
+from kindra_cbo.log_filters import install_access_log_filter  # noqa: E402
+
+install_access_log_filter()
@@ -1,12 +1,12 @@
 from .models import AnalyticsEvent
 
-def log_analytics_event(event_type, description='', event_data=None, user=None, request=None):
+def log_analytics_event(event_type, description='', event_data=None, user=None, request=None,
+                        ip_address=None, user_agent=''):
     """
     Utility to log analytics events
+    Pass `ip_address`/`user_agent` explicitly when logging outside the request
+    (e.g. from a background task); otherwise they are read from `request`.
     """
-    ip_address = None
-    user_agent = ''
-    
     if request:
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
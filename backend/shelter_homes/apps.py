@@ -5,3 +5,6 @@ class ShelterHomesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shelter_homes'
     verbose_name = 'Shelter Home Coordination'
+
+    def ready(self):
+        import shelter_homes.signals
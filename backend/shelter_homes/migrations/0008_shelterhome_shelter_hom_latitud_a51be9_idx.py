@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shelter_homes', '0007_shelterhome_bank_account_number_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shelterhome',
+            index=models.Index(fields=['latitude', 'longitude'], name='shelter_hom_latitud_a51be9_idx'),
+        ),
+    ]
@@ -129,6 +129,7 @@ class ShelterHome(models.Model):
         indexes = [
             models.Index(fields=['county']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['latitude', 'longitude']),
         ]
     
     def __str__(self):
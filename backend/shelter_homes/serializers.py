@@ -27,6 +27,7 @@ class ShelterHomeSerializer(serializers.ModelSerializer):
     available_beds = serializers.ReadOnlyField()
     occupancy_percentage = serializers.ReadOnlyField()
     photos = ShelterPhotoSerializer(many=True, read_only=True)
+    distance_km = serializers.FloatField(read_only=True, help_text='Present on ?near= queries')
     uploaded_photos = serializers.ListField(
         child=serializers.ImageField(),
         write_only=True,
@@ -0,0 +1,25 @@
+"""
+Shelter Home Services
+"""
+
+from kindra_cbo.geo import MapLayer
+from .models import ShelterHome
+
+
+class ShelterMapLayer(MapLayer):
+    """Shelter pins for the map, with the visibility rules of the shelter list"""
+
+    name = 'shelters'
+    properties = ['name', 'county', 'total_capacity', 'current_occupancy']
+
+    @classmethod
+    def queryset(cls, user):
+        approved = ShelterHome.objects.filter(approval_status='APPROVED')
+        if not user or not user.is_authenticated:
+            return approved, 'approved'
+        if user.is_superuser or user.role in ['ADMIN', 'MANAGEMENT']:
+            return ShelterHome.objects.all(), 'all'
+        if user.role == 'SHELTER_PARTNER':
+            # A partner's own shelter only; not worth caching
+            return ShelterHome.objects.filter(partner_user=user), None
+        return approved, 'approved'
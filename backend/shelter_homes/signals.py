@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ShelterHome
+from .services import ShelterMapLayer
+
+
+@receiver(post_save, sender=ShelterHome)
+@receiver(post_delete, sender=ShelterHome)
+def invalidate_shelter_map(sender, **kwargs):
+    """Cached map tiles show shelter pins and occupancy; drop them on any change."""
+    ShelterMapLayer.invalidate()
@@ -9,7 +9,7 @@ from .views import (
     ResourceListCreateView, ResourceDetailView,
     StaffCredentialListCreateView, StaffCredentialDetailView,
     ResourceRequestListCreateView, IncidentReportListCreateView,
-    add_shelter_photo, delete_shelter_photo, set_primary_shelter_photo,
+    add_shelter_photo, delete_shelter_photo, set_primary_shelter_photo, shelter_map,
 )
 from .approval_views import ShelterApprovalView, PendingSheltersView
 
@@ -18,6 +18,7 @@ app_name = 'shelter_homes'
 urlpatterns = [
     path('', ShelterHomeListCreateView.as_view(), name='shelter-list'),
     path('<uuid:pk>/', ShelterHomeDetailView.as_view(), name='shelter-detail'),
+    path('map/', shelter_map, name='shelter-map'),
     
     # Approval endpoints (Admin only)
     path('<uuid:pk>/approve/', ShelterApprovalView.as_view(), name='shelter-approve'),
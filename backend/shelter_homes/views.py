@@ -16,6 +16,7 @@ from .serializers import (
     StaffCredentialSerializer, ResourceRequestSerializer, IncidentReportSerializer
 )
 from accounts.models import User, Notification
+from kindra_cbo.geo import GeoFilterBackend
 from reporting.utils import log_analytics_event
 
 
@@ -23,7 +24,7 @@ class ShelterHomeListCreateView(generics.ListCreateAPIView):
     serializer_class = ShelterHomeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]  # For file uploads
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, GeoFilterBackend]
     filterset_fields = ['county', 'is_active', 'approval_status']
     
     def get_queryset(self):
@@ -222,6 +223,7 @@ class IncidentReportListCreateView(generics.ListCreateAPIView):
 from rest_framework.decorators import api_view, permission_classes
 from .models import ShelterPhoto
 from accounts.permissions import IsAdminOrManagement
+from .services import ShelterMapLayer
 
 
 @api_view(['POST'])
@@ -370,3 +372,13 @@ def set_primary_shelter_photo(request, shelter_id, photo_id):
             {'error': f'Failed to set primary photo: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def shelter_map(request):
+    """
+    Compact GeoJSON of shelters in a map viewport:
+    ?bbox=min_lng,min_lat,max_lng,max_lat&zoom=N. Clustered at low zoom.
+    """
+    return Response(ShelterMapLayer.feature_collection(request))
@@ -0,0 +1,231 @@
+"""
+Community Chat WebSocket Transport
+A plain ASGI WebSocket application, mounted by kindra_cbo.asgi at /ws/chat/.
+
+Each connection subscribes to the public room and to its user's private
+channel on the real-time broker, so a message posted on any worker (over the
+socket or through the REST API) reaches every open chat without polling.
+
+Client frames (JSON):
+    {"type": "message", "content": "...", "is_private": false, "recipient": null}
+    {"type": "typing", "is_typing": true, "recipient": null}
+        (a private recipient must share a conversation with the sender)
+    {"type": "ping"}
+
+Server frames:
+    ready, ack, error, pong, and the relayed events in CHAT_EVENT_TYPES
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from accounts.authentication import get_user_from_token
+from kindra_cbo.realtime import get_broker, user_channel
+from .realtime import (
+    CHAT_EVENT_TYPES, PUBLIC_CHANNEL, online_user_ids, publish_chat_message,
+    publish_presence, publish_typing, remove_presence, touch_presence,
+)
+from .serializers import ChatMessageSerializer
+from .services import ChatMessageService
+
+logger = logging.getLogger('kindra_cbo')
+
+# Close codes in the 4000-4999 range are reserved for applications
+CLOSE_UNAUTHORIZED = 4401
+
+
+def database_sync_to_async(fn):
+    """Run ORM code in a worker thread, discarding stale connections like a request would"""
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper)
+
+
+def _save_message(user, data):
+    """Validate and persist a message exactly as the REST endpoint does"""
+    serializer = ChatMessageSerializer(data=data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    message = serializer.save(user=user)
+    ChatMessageService.schedule_mention_notifications(message)
+    publish_chat_message(message)
+    return message, None
+
+
+class ChatConsumer:
+    """One WebSocket connection to the community chat"""
+
+    def __init__(self, scope, receive, send):
+        self.scope = scope
+        self.receive = receive
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.user = None
+        self.user_id = None
+        self.connection_id = uuid.uuid4().hex
+        self._presence_at = 0.0
+        # Private typing recipients already checked on this connection
+        self._typing_recipients = set()
+
+    def get_token(self):
+        # Browsers cannot set headers on a WebSocket handshake, so the JWT
+        # arrives as ?token= or in the access_token cookie
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        if query.get('token'):
+            return query['token'][0]
+        for name, value in self.scope.get('headers', []):
+            if name == b'cookie':
+                cookie = SimpleCookie()
+                cookie.load(value.decode('latin-1'))
+                if 'access_token' in cookie:
+                    return cookie['access_token'].value
+        return None
+
+    async def send_json(self, data):
+        async with self._send_lock:
+            await self._send({'type': 'websocket.send', 'text': json.dumps(data, default=str)})
+
+    async def run(self):
+        event = await self.receive()
+        if event['type'] != 'websocket.connect':
+            return
+
+        self.user = await database_sync_to_async(get_user_from_token)(self.get_token())
+        if self.user is None:
+            await self._send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+            return
+        self.user_id = str(self.user.id)
+        await self._send({'type': 'websocket.accept'})
+
+        subscription = await get_broker().subscribe(PUBLIC_CHANNEL, user_channel(self.user_id))
+        try:
+            await self.join()
+            await self.send_json({
+                'type': 'ready',
+                'user_id': self.user_id,
+                'online': await sync_to_async(online_user_ids, thread_sensitive=False)(),
+            })
+
+            tasks = {
+                asyncio.create_task(self.read_loop()),
+                asyncio.create_task(self.relay_loop(subscription)),
+            }
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"Chat socket for user {self.user_id} failed: {str(task.exception())}")
+        finally:
+            await subscription.close()
+            await self.leave()
+
+    async def join(self):
+        await self.refresh_presence()
+        await sync_to_async(publish_presence, thread_sensitive=False)(self.user_id, 'online')
+
+    async def leave(self):
+        def _leave():
+            remove_presence(self.user_id, self.connection_id)
+            # Other tabs or devices may still be connected
+            if self.user_id not in online_user_ids():
+                publish_presence(self.user_id, 'offline')
+
+        try:
+            await sync_to_async(_leave, thread_sensitive=False)()
+        except Exception as e:
+            logger.warning(f"Failed to clear chat presence for {self.user_id}: {str(e)}")
+
+    async def refresh_presence(self):
+        await sync_to_async(touch_presence, thread_sensitive=False)(self.user_id, self.connection_id)
+        self._presence_at = time.monotonic()
+
+    async def read_loop(self):
+        """Handle frames sent by the client until it disconnects"""
+        while True:
+            event = await self.receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            if event['type'] != 'websocket.receive':
+                continue
+
+            try:
+                data = json.loads(event.get('text') or event.get('bytes') or '')
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                await self.send_json({'type': 'error', 'error': 'Frames must be JSON objects.'})
+                continue
+
+            kind = data.get('type')
+            if kind == 'message':
+                await self.handle_message(data)
+            elif kind == 'typing':
+                await self.handle_typing(data)
+            elif kind == 'ping':
+                await self.refresh_presence()
+                await self.send_json({'type': 'pong'})
+            else:
+                await self.send_json({'type': 'error', 'error': f"Unknown frame type: {kind}"})
+
+    async def handle_message(self, data):
+        payload = {
+            'content': data.get('content', ''),
+            'is_private': bool(data.get('is_private')),
+            'recipient': data.get('recipient'),
+        }
+        message, errors = await database_sync_to_async(_save_message)(self.user, payload)
+        if errors:
+            await self.send_json({'type': 'error', 'error': errors, 'client_id': data.get('client_id')})
+            return
+        # The message itself arrives through the broker like everyone else's
+        await self.send_json({'type': 'ack', 'id': message.id, 'client_id': data.get('client_id')})
+
+    async def handle_typing(self, data):
+        recipient = data.get('recipient') or None
+        if recipient is not None:
+            recipient = str(recipient)
+            # Only people already talking privately may signal each other
+            if recipient not in self._typing_recipients:
+                if not await database_sync_to_async(ChatMessageService.has_conversation)(self.user, recipient):
+                    await self.send_json({'type': 'error', 'error': 'No conversation with this recipient.'})
+                    return
+                self._typing_recipients.add(recipient)
+        await sync_to_async(publish_typing, thread_sensitive=False)(self.user, data.get('is_typing', True), recipient)
+
+    async def relay_loop(self, subscription):
+        """Forward broker events to the client, refreshing presence as we go"""
+        keepalive = settings.REALTIME_KEEPALIVE_SECONDS
+        while True:
+            event = await subscription.get(timeout=keepalive)
+            if time.monotonic() - self._presence_at >= keepalive:
+                await self.refresh_presence()
+            if event is None or event.get('type') not in CHAT_EVENT_TYPES:
+                continue
+
+            if event['type'] == 'typing' and event.get('user_id') == self.user_id:
+                continue
+            if event['type'] == 'message':
+                message = dict(event['message'])
+                message['is_sender'] = str(message['user']['id']) == self.user_id
+                event = dict(event, message=message)
+            await self.send_json(event)
+
+
+async def chat_websocket_application(scope, receive, send):
+    """ASGI entry point for /ws/chat/"""
+    await ChatConsumer(scope, receive, send).run()
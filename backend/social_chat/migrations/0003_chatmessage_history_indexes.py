@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_chat', '0002_chatmessage_is_private_chatmessage_recipient'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['is_private', 'timestamp'], name='social_chat_is_priv_79c3a5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'timestamp'], name='social_chat_user_id_36ec95_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['recipient', 'timestamp'], name='social_chat_recipie_0a54c9_idx'),
+        ),
+    ]
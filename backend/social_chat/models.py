@@ -11,6 +11,12 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # One index per branch of the chat history UNION
+            models.Index(fields=['is_private', 'timestamp']),
+            models.Index(fields=['user', 'timestamp']),
+            models.Index(fields=['recipient', 'timestamp']),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.content[:20]}"
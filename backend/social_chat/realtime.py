@@ -0,0 +1,90 @@
+"""
+Community Chat Real-time Events
+Channels, event publishing and presence tracking shared by the REST views
+and the WebSocket transport.
+
+Public messages and typing indicators go to the public room channel; private
+ones go to the sender's and recipient's user channels, which each chat
+connection subscribes to alongside the room.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from kindra_cbo.realtime import get_broker, publish, user_channel
+from .serializers import ChatMessageSerializer
+
+PUBLIC_CHANNEL = 'chat:public'
+PRESENCE_KEY = 'chat:presence'
+
+# Event types relayed to chat sockets; anything else on a user channel
+# (e.g. notifications for the SSE stream) is ignored by the chat transport
+CHAT_EVENT_TYPES = ('message', 'message_deleted', 'typing', 'presence')
+
+
+def message_channels(message):
+    """Channels that must receive events about `message`"""
+    if not message.is_private:
+        return {PUBLIC_CHANNEL}
+    channels = {user_channel(message.user_id)}
+    if message.recipient_id:
+        channels.add(user_channel(message.recipient_id))
+    return channels
+
+
+def publish_chat_message(message):
+    """Broadcast a saved message once the surrounding transaction commits"""
+    data = ChatMessageSerializer(message).data
+    channels = message_channels(message)
+
+    def _publish():
+        for channel in channels:
+            publish(channel, {'type': 'message', 'message': data})
+
+    transaction.on_commit(_publish)
+
+
+def publish_message_deleted(message):
+    """Tell connected clients to drop a deleted message"""
+    message_id = message.id
+    channels = message_channels(message)
+
+    def _publish():
+        for channel in channels:
+            publish(channel, {'type': 'message_deleted', 'id': message_id})
+
+    transaction.on_commit(_publish)
+
+
+def publish_typing(user, is_typing, recipient_id=None):
+    """Typing indicator for the public room, or for one private conversation"""
+    channel = user_channel(recipient_id) if recipient_id else PUBLIC_CHANNEL
+    publish(channel, {
+        'type': 'typing',
+        'user_id': str(user.id),
+        'name': user.get_full_name(),
+        'recipient': str(recipient_id) if recipient_id else None,
+        'is_typing': bool(is_typing),
+    })
+
+
+def presence_ttl():
+    # Connections refresh their entry every keepalive interval; allow one miss
+    return settings.REALTIME_KEEPALIVE_SECONDS * 2 + 5
+
+
+def touch_presence(user_id, connection_id):
+    get_broker().touch_presence(PRESENCE_KEY, f"{user_id}:{connection_id}", presence_ttl())
+
+
+def remove_presence(user_id, connection_id):
+    get_broker().remove_presence(PRESENCE_KEY, f"{user_id}:{connection_id}")
+
+
+def online_user_ids():
+    """Ids of users with at least one live chat connection on any worker"""
+    return sorted({member.split(':', 1)[0] for member in get_broker().get_presence(PRESENCE_KEY)})
+
+
+def publish_presence(user_id, status):
+    publish(PUBLIC_CHANNEL, {'type': 'presence', 'user_id': str(user_id), 'status': status})
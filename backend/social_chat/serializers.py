@@ -5,6 +5,9 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 class ChatUserSerializer(serializers.ModelSerializer):
+    # Users have no username; expose the handle used for @mentions instead
+    username = serializers.CharField(source='mention_handle', read_only=True)
+
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 'role', 'profile_picture']
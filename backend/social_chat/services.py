@@ -0,0 +1,260 @@
+"""
+Social Chat Services
+Message creation side effects and cursor-based history queries for the
+community chat
+"""
+
+import binascii
+import logging
+import re
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+
+from accounts.models import Notification, User as KindraUser, mention_handle_expression
+from accounts.notifications import publish_notifications
+from kindra_cbo.background import run_in_background
+from .models import ChatMessage
+
+logger = logging.getLogger('kindra_cbo')
+
+
+class ChatMessageService:
+    """
+    Side effects of posting a message, shared by the REST and WebSocket paths
+    """
+
+    # Email local parts may contain dots, plus signs and hyphens between word characters
+    MENTION_PATTERN = re.compile(r'@(\w+(?:[.+-]\w+)*)')
+
+    # Upper bound on handles resolved per message, so one post cannot fan out
+    # a notification to the whole directory
+    MAX_MENTIONS = 50
+
+    @classmethod
+    def extract_mentions(cls, content):
+        """Distinct lower-cased @handles in `content`, in order of appearance"""
+        handles = dict.fromkeys(tag.lower() for tag in cls.MENTION_PATTERN.findall(content))
+        return list(handles)[:cls.MAX_MENTIONS]
+
+    @staticmethod
+    def has_conversation(user, other_user_id):
+        """Whether `user` and `other_user_id` have exchanged a private message"""
+        try:
+            other_user_id = uuid.UUID(str(other_user_id))
+        except ValueError:
+            return False
+        return ChatMessage.objects.filter(
+            Q(user=user, recipient_id=other_user_id) | Q(user_id=other_user_id, recipient=user),
+            is_private=True,
+        ).exists()
+
+    @classmethod
+    def schedule_mention_notifications(cls, message):
+        """Queue mention notifications to run after the message is committed"""
+        if not cls.MENTION_PATTERN.search(message.content):
+            return
+        from .tasks import notify_mentions
+
+        message_id = message.id
+        transaction.on_commit(lambda: run_in_background(notify_mentions, message_id=message_id))
+
+    @staticmethod
+    def mention_candidates(message):
+        """
+        Users a mention in `message` may refer to: the recipient of a private
+        message, or, in the public room, members who could see the message
+        and have posted there themselves
+        """
+        users = KindraUser.objects.filter(is_active=True).exclude(id=message.user_id)
+        if message.is_private:
+            return users.filter(id=message.recipient_id)
+        return users.filter(
+            Exists(ChatMessage.objects.filter(user=OuterRef('pk'), is_private=False)),
+            date_joined__lte=message.timestamp,
+        )
+
+    @classmethod
+    def notify_mentions(cls, message):
+        """
+        Notify users tagged with @handle in the message.
+        Handles are email local parts, which are not unique, so they are only
+        resolved among the conversation's participants, and a handle shared by
+        several participants is skipped rather than notifying all of them.
+        All handles are resolved in one query and notified with one insert.
+        """
+        handles = cls.extract_mentions(message.content)
+        if not handles:
+            return []
+
+        sender = message.user
+        matches = {}
+        candidates = (
+            cls.mention_candidates(message)
+            .annotate(handle=mention_handle_expression())
+            .filter(handle__in=handles)
+            .only('id')
+        )
+        for candidate in candidates:
+            matches.setdefault(candidate.handle, []).append(candidate)
+        ambiguous = sorted(handle for handle, users in matches.items() if len(users) > 1)
+        if ambiguous:
+            logger.info(f"Chat message {message.id}: skipped ambiguous mentions {', '.join(ambiguous)}")
+
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient=users[0],
+                title="You were mentioned in Community Chat",
+                message=f"{sender.get_full_name()} mentioned you: {message.content[:50]}...",
+                type=Notification.Type.INFO,
+                category=Notification.Category.SYSTEM,
+                link="/dashboard/overview" # Adjust as needed
+            )
+            for users in matches.values() if len(users) == 1
+        ])
+        # bulk_create skips the post_save push, so publish explicitly
+        publish_notifications(notifications)
+        return notifications
+
+
+class ChatDirectoryService:
+    """
+    Prefix search over active users for @mention autocomplete.
+
+    Matches the start of the mention handle, first name or last name, each
+    backed by an index on its lower-cased value. Results for a prefix are the
+    same for every caller, so they are cached briefly and shared.
+    """
+
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 25
+    MAX_PREFIX_LENGTH = 50
+    CACHE_PREFIX = 'chat:directory:'
+    CACHE_TTL = 60  # seconds; new or renamed users appear within a minute
+
+    @classmethod
+    def search(cls, prefix, exclude_user=None, limit=None):
+        """Serialized top `limit` users whose handle or name starts with `prefix`"""
+        from .serializers import ChatUserSerializer
+
+        prefix = (prefix or '').strip().lstrip('@').lower()[:cls.MAX_PREFIX_LENGTH]
+        limit = min(max(int(limit or cls.DEFAULT_LIMIT), 1), cls.MAX_LIMIT)
+        if not prefix:
+            return []
+
+        # One extra row so the caller can still get `limit` after dropping themselves
+        cache_key = f"{cls.CACHE_PREFIX}{limit}:{prefix}"
+        results = cache.get(cache_key)
+        if results is None:
+            users = (
+                KindraUser.objects.filter(is_active=True)
+                .alias(
+                    handle=mention_handle_expression(),
+                    first_lower=Lower('first_name'),
+                    last_lower=Lower('last_name'),
+                )
+                .filter(
+                    Q(handle__startswith=prefix) |
+                    Q(first_lower__startswith=prefix) |
+                    Q(last_lower__startswith=prefix)
+                )
+                .order_by('first_name', 'last_name', 'id')
+                .only('id', 'email', 'first_name', 'last_name', 'role', 'profile_picture')
+                [:limit + 1]
+            )
+            results = ChatUserSerializer(users, many=True).data
+            cache.set(cache_key, results, cls.CACHE_TTL)
+
+        if exclude_user is not None:
+            results = [user for user in results if str(user['id']) != str(exclude_user.id)]
+        return results[:limit]
+
+
+class ChatHistoryService:
+    """
+    Returns pages of the messages a user may see, keyed by (timestamp, id).
+
+    Cursors are opaque strings encoding the (timestamp, id) of a message, the
+    same order the history is shown in, so paging never skips or repeats a
+    message however ids and timestamps interleave. Visibility is an OR of
+    three conditions (public since joining, private sent, private received).
+    Instead of one OR'd query with DISTINCT, each condition is its own branch
+    served by a (column, timestamp) index and the branches are combined with
+    UNION ALL.
+    """
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    @staticmethod
+    def encode_cursor(message):
+        raw = f"{message.timestamp.isoformat()}|{message.id}"
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (timestamp, id) for a cursor; raises ValueError if malformed"""
+        try:
+            raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            timestamp, message_id = raw.split('|')
+            return datetime.fromisoformat(timestamp), int(message_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise ValueError('Invalid cursor') from e
+
+    @staticmethod
+    def visible_branches(user):
+        """The disjoint querysets whose union is everything `user` can read"""
+        return [
+            ChatMessage.objects.filter(is_private=False, timestamp__gte=user.date_joined),
+            ChatMessage.objects.filter(is_private=True, user=user),
+            # Excluding own messages keeps the branches disjoint for UNION ALL
+            ChatMessage.objects.filter(is_private=True, recipient=user).exclude(user=user),
+        ]
+
+    @classmethod
+    def get_page(cls, user, after=None, before=None, limit=None):
+        """
+        Return `(messages, has_more)`, oldest first.
+
+        after:  cursor; only messages newer than it (polling for new messages)
+        before: cursor; the page of messages just older than it (scrolling back)
+        neither: the latest page
+        Raises ValueError for a malformed cursor.
+        """
+        limit = min(max(int(limit or cls.DEFAULT_PAGE_SIZE), 1), cls.MAX_PAGE_SIZE)
+        newest_first = after is None
+
+        keyset = None
+        if after is not None:
+            timestamp, message_id = cls.decode_cursor(after)
+            keyset = Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id)
+        elif before is not None:
+            timestamp, message_id = cls.decode_cursor(before)
+            keyset = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id)
+
+        ordering = ('-timestamp', '-id') if newest_first else ('timestamp', 'id')
+        branches = []
+        for branch in cls.visible_branches(user):
+            if keyset is not None:
+                branch = branch.filter(keyset)
+            branch = branch.order_by().values_list('id', 'timestamp')
+            if connection.features.supports_slicing_ordering_in_compound:
+                # Let each branch stop after one page instead of scanning its whole range
+                branch = branch.order_by(*ordering)[:limit + 1]
+            branches.append(branch)
+
+        rows = list(branches[0].union(*branches[1:], all=True).order_by(*ordering)[:limit + 1])
+        has_more = len(rows) > limit
+        ids = [row[0] for row in rows[:limit]]
+
+        messages = list(
+            ChatMessage.objects.filter(id__in=ids)
+            .select_related('user', 'recipient')
+            .order_by('timestamp', 'id')
+        )
+        return messages, has_more
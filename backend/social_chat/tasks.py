@@ -0,0 +1,21 @@
+"""
+Social Chat Celery Tasks
+"""
+
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='social_chat.tasks.notify_mentions', ignore_result=True)
+def notify_mentions(message_id):
+    """Notify users @mentioned in a chat message, deferred from posting it"""
+    from .models import ChatMessage
+    from .services import ChatMessageService
+
+    message = ChatMessage.objects.select_related('user').filter(id=message_id).first()
+    if message is None:
+        logger.warning(f"Mention notifications skipped, message {message_id} no longer exists.")
+        return
+    ChatMessageService.notify_mentions(message)
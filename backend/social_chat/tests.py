@@ -1,3 +1,221 @@
-from django.test import TestCase
+"""
+Social Chat Tests
+"""
 
-# Create your tests here.
+import asyncio
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Notification, User
+from kindra_cbo import realtime
+from kindra_cbo.asgi import application
+from .models import ChatMessage
+from .services import ChatMessageService
+
+
+class ChatDirectoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='me@example.com', first_name='Mary', last_name='Otieno')
+        for email, first, last in [
+            ('wanjiru.k@example.com', 'Wanjiru', 'Kamau'),
+            ('jkamau@example.com', 'John', 'Kamau'),
+            ('akinyi@example.com', 'Akinyi', 'Odhiambo'),
+        ]:
+            User.objects.create_user(email=email, first_name=first, last_name=last)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, q):
+        response = self.client.get('/api/v1/chat/messages/users/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return sorted(user['username'] for user in response.data)
+
+    def test_prefix_matches_handle_first_or_last_name(self):
+        self.assertEqual(self.search('@WANJ'), ['wanjiru.k'])
+        self.assertEqual(self.search('kam'), ['jkamau', 'wanjiru.k'])
+        self.assertEqual(self.search('m'), [])  # Never the caller
+
+    def test_directory_is_paginated_without_a_prefix(self):
+        for index in range(25):
+            User.objects.create_user(email=f'member{index:02d}@example.com', first_name='Member')
+
+        first = self.client.get('/api/v1/chat/messages/users/').data
+        second = self.client.get('/api/v1/chat/messages/users/', {'page': 2}).data
+
+        self.assertEqual(first['count'], 28)
+        self.assertEqual(len(first['results']), 20)
+        handles = [user['username'] for user in first['results'] + second['results']]
+        self.assertEqual(len(set(handles)), 28)
+        self.assertNotIn('me', handles)
+
+
+class ChatHistoryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='me@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Ids and timestamps disagree, and two messages share a timestamp
+        start = timezone.now() + timedelta(minutes=1)
+        offsets = [3, 0, 1, 1, 5]
+        for index, offset in enumerate(offsets):
+            message = ChatMessage.objects.create(user=self.user, content=f'm{index}')
+            ChatMessage.objects.filter(pk=message.pk).update(timestamp=start + timedelta(seconds=offset))
+        self.expected = ['m1', 'm2', 'm3', 'm0', 'm4']
+
+    def page(self, **params):
+        response = self.client.get('/api/v1/chat/messages/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_scrolling_back_visits_every_message_once(self):
+        page = self.page(limit=2)
+        seen = [message['content'] for message in page['results']]
+        while page['has_more']:
+            page = self.page(limit=2, before=page['oldest_cursor'])
+            seen = [message['content'] for message in page['results']] + seen
+
+        self.assertEqual(seen, self.expected)
+
+    def test_polling_after_a_cursor_returns_only_newer_messages(self):
+        first = self.page(limit=3, before=self.page(limit=2)['oldest_cursor'])
+        self.assertEqual([message['content'] for message in first['results']], ['m1', 'm2', 'm3'])
+
+        newer = self.page(after=first['newest_cursor'])
+        self.assertEqual([message['content'] for message in newer['results']], ['m0', 'm4'])
+        self.assertEqual(self.page(after=newer['newest_cursor'])['newest_cursor'], newer['newest_cursor'])
+
+    def test_malformed_cursor_is_rejected(self):
+        response = self.client.get('/api/v1/chat/messages/', {'after': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class WebSocketClient:
+    """Drives an ASGI WebSocket application directly, frame by frame"""
+
+    def __init__(self, path, token=None):
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        scope = {
+            'type': 'websocket', 'path': path, 'headers': [],
+            'query_string': f'token={token}'.encode() if token else b'',
+        }
+        self.task = asyncio.create_task(application(scope, self.inbox.get, self.outbox.put))
+
+    async def connect(self):
+        await self.inbox.put({'type': 'websocket.connect'})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.outbox.get(), timeout=5)
+
+    async def send_json(self, data):
+        await self.inbox.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def receive_json(self, frame_type):
+        """Next frame of `frame_type`, skipping presence and other chatter"""
+        while True:
+            frame = json.loads((await self.receive())['text'])
+            if frame['type'] == frame_type:
+                return frame
+
+    async def disconnect(self):
+        await self.inbox.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+@override_settings(REALTIME_REDIS_URL='', REALTIME_KEEPALIVE_SECONDS=30)
+class ChatConsumerTests(TransactionTestCase):
+
+    def setUp(self):
+        realtime._broker = None
+        self.alice = User.objects.create_user(email='alice@example.com', first_name='Alice')
+        self.bob = User.objects.create_user(email='bob@example.com', first_name='Bob')
+        self.tokens = {user.email: str(AccessToken.for_user(user)) for user in (self.alice, self.bob)}
+
+    def tearDown(self):
+        realtime._broker = None
+
+    async def open(self, user):
+        client = WebSocketClient('/ws/chat/', self.tokens[user.email])
+        self.assertEqual((await client.connect())['type'], 'websocket.accept')
+        await client.receive_json('ready')
+        return client
+
+    async def test_connection_requires_a_token_and_a_known_path(self):
+        unauthenticated = WebSocketClient('/ws/chat/')
+        self.assertEqual(await unauthenticated.connect(), {'type': 'websocket.close', 'code': 4401})
+
+        unknown = WebSocketClient('/ws/elsewhere/', self.tokens[self.alice.email])
+        self.assertEqual(await unknown.receive(), {'type': 'websocket.close', 'code': 4404})
+
+    async def test_messages_are_acknowledged_and_relayed(self):
+        alice, bob = await self.open(self.alice), await self.open(self.bob)
+
+        await alice.send_json({'type': 'message', 'content': 'Hello room', 'client_id': 'c1'})
+
+        self.assertEqual((await alice.receive_json('ack'))['client_id'], 'c1')
+        relayed = await bob.receive_json('message')
+        self.assertEqual(relayed['message']['content'], 'Hello room')
+        self.assertFalse(relayed['message']['is_sender'])
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_private_typing_needs_an_existing_conversation(self):
+        alice, bob = await self.open(self.alice), await self.open(self.bob)
+
+        await alice.send_json({'type': 'typing', 'recipient': str(self.bob.id)})
+        self.assertEqual((await alice.receive_json('error'))['error'], 'No conversation with this recipient.')
+
+        await bob.send_json({'type': 'message', 'content': 'Hi Alice', 'is_private': True, 'recipient': str(self.alice.id)})
+        await bob.receive_json('ack')
+        await alice.send_json({'type': 'typing', 'recipient': str(self.bob.id)})
+
+        typing = await bob.receive_json('typing')
+        self.assertEqual((typing['user_id'], typing['recipient']), (str(self.alice.id), str(self.bob.id)))
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+@override_settings(REALTIME_REDIS_URL='')
+class MentionNotificationTests(TestCase):
+
+    def setUp(self):
+        realtime._broker = None
+        self.sender = User.objects.create_user(email='amina@example.com', first_name='Amina')
+        # Two different people share the handle "john"
+        self.john = User.objects.create_user(email='john@kindra.org')
+        self.other_john = User.objects.create_user(email='john@example.com')
+        self.grace = User.objects.create_user(email='grace@example.com')
+        for user in (self.john, self.grace):
+            ChatMessage.objects.create(user=user, content='Hello everyone')
+
+    def tearDown(self):
+        realtime._broker = None
+
+    def notified(self, **message):
+        message = ChatMessage.objects.create(user=self.sender, **message)
+        ChatMessageService.notify_mentions(message)
+        return set(Notification.objects.filter(title__contains='mentioned').values_list('recipient__email', flat=True))
+
+    def test_public_mentions_resolve_among_room_participants(self):
+        self.assertEqual(self.notified(content='@John and @grace, see @nobody'), {'john@kindra.org', 'grace@example.com'})
+
+    def test_private_mentions_only_reach_the_recipient(self):
+        notified = self.notified(content='@john @grace', is_private=True, recipient=self.other_john)
+
+        self.assertEqual(notified, {'john@example.com'})
+
+    def test_handles_shared_by_participants_are_skipped(self):
+        ChatMessage.objects.create(user=self.other_john, content='Hi')
+
+        self.assertEqual(self.notified(content='@john @grace'), {'grace@example.com'})
@@ -1,11 +1,13 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from django.db.models import Q
-from accounts.models import Notification, User as KindraUser
-import re
+from accounts.models import User as KindraUser
 from .models import ChatMessage
 from .serializers import ChatMessageSerializer
+from .services import ChatDirectoryService, ChatHistoryService, ChatMessageService
+from .realtime import publish_chat_message, publish_message_deleted
 
 class IsAdminOrOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
@@ -32,35 +34,77 @@ class MessageViewSet(viewsets.ModelViewSet):
             Q(is_private=True, recipient=user)
         ).distinct().order_by('timestamp')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Cursor-paginated history, oldest first.
+        ?after=<cursor> returns only newer messages (for polling), ?before=<cursor>
+        the page just older than that message, and neither the latest page.
+        Cursors are the newest_cursor / oldest_cursor of an earlier response.
+        """
+        params = {}
+        for name in ('after', 'before'):
+            value = request.query_params.get(name)
+            if value:
+                params[name] = value
+        limit = request.query_params.get('limit')
+        if limit not in (None, ''):
+            try:
+                params['limit'] = int(limit)
+            except ValueError:
+                raise ValidationError({'limit': 'Must be an integer.'})
+
+        try:
+            messages, has_more = ChatHistoryService.get_page(request.user, **params)
+        except ValueError:
+            raise ValidationError({'detail': 'Invalid cursor.'})
+        serializer = self.get_serializer(messages, many=True)
+        return Response({
+            'results': serializer.data,
+            'has_more': has_more,
+            # An empty page keeps the cursor the client sent
+            'oldest_cursor': ChatHistoryService.encode_cursor(messages[0]) if messages else params.get('before'),
+            'newest_cursor': ChatHistoryService.encode_cursor(messages[-1]) if messages else params.get('after'),
+        })
+
     def perform_create(self, serializer):
         message = serializer.save(user=self.request.user)
-        
-        # Tagging support: Detect @username in content
-        tags = re.findall(r'@(\w+)', message.content)
-        for username in tags:
-            try:
-                tagged_user = KindraUser.objects.get(username=username)
-                if tagged_user != self.request.user:
-                    # Create notification
-                    Notification.objects.create(
-                        recipient=tagged_user,
-                        title="You were mentioned in Community Chat",
-                        message=f"{self.request.user.get_full_name()} mentioned you: {message.content[:50]}...",
-                        type=Notification.Type.INFO,
-                        category=Notification.Category.SYSTEM,
-                        link="/dashboard/overview" # Adjust as needed
-                    )
-            except KindraUser.DoesNotExist:
-                continue
+        ChatMessageService.schedule_mention_notifications(message)
+        publish_chat_message(message)
+
+    def perform_destroy(self, instance):
+        publish_message_deleted(instance)
+        instance.delete()
 
     @action(detail=False, methods=['get'])
     def users(self, request):
-        """Endpoint to get users for tagging autocompletion"""
-        users = KindraUser.objects.filter(is_active=True).exclude(id=request.user.id)
+        """
+        Endpoint to get users for tagging autocompletion.
+        With ?q=<prefix> returns only the top matches (?limit=, default 10);
+        without it, a page of the directory (?page=).
+        """
+        if 'q' in request.query_params:
+            try:
+                limit = int(request.query_params.get('limit') or ChatDirectoryService.DEFAULT_LIMIT)
+            except ValueError:
+                raise ValidationError({'limit': 'Must be an integer.'})
+            return Response(ChatDirectoryService.search(
+                request.query_params['q'],
+                exclude_user=request.user,
+                limit=limit
+            ))
+
+        # Without a prefix, page through the whole directory
+        users = (
+            KindraUser.objects.filter(is_active=True)
+            .exclude(id=request.user.id)
+            .order_by('first_name', 'last_name', 'id')
+            .only('id', 'email', 'first_name', 'last_name', 'role', 'profile_picture')
+        )
         # Note: reusing ChatUserSerializer
         from .serializers import ChatUserSerializer
-        serializer = ChatUserSerializer(users, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(users)
+        serializer = ChatUserSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
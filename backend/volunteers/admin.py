@@ -84,11 +84,12 @@ class TaskAdmin(admin.ModelAdmin):
 class EventAdmin(admin.ModelAdmin):
     list_display = (
         'title', 'event_type', 'start_datetime',
-        'location', 'max_volunteers', 'is_active', 'is_cancelled'
+        'location', 'max_volunteers', 'registered_count', 'is_active', 'is_cancelled'
     )
     list_filter = ('event_type', 'is_active', 'is_cancelled', 'start_datetime')
     search_fields = ('title', 'description', 'location')
     filter_horizontal = ('registered_volunteers',)
+    readonly_fields = ('registered_count',)
     date_hierarchy = 'start_datetime'
     ordering = ('-start_datetime',)
     
@@ -103,7 +104,7 @@ class EventAdmin(admin.ModelAdmin):
             'fields': ('start_datetime', 'end_datetime')
         }),
         ('Capacity', {
-            'fields': ('max_volunteers', 'registered_volunteers')
+            'fields': ('max_volunteers', 'registered_count', 'registered_volunteers')
         }),
         ('Requirements', {
             'fields': ('required_skills',)
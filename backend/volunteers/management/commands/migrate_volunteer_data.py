@@ -1,42 +1,222 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from volunteers.models import Volunteer, Skill, AvailabilitySlot
+from pathlib import Path
 import logging
+import time
 
 logger = logging.getLogger('kindra_cbo')
 
+# Legacy availability text is matched on day names
+DAYS = {
+    'Monday': AvailabilitySlot.DayOfWeek.MONDAY,
+    'Tuesday': AvailabilitySlot.DayOfWeek.TUESDAY,
+    'Wednesday': AvailabilitySlot.DayOfWeek.WEDNESDAY,
+    'Thursday': AvailabilitySlot.DayOfWeek.THURSDAY,
+    'Friday': AvailabilitySlot.DayOfWeek.FRIDAY,
+    'Saturday': AvailabilitySlot.DayOfWeek.SATURDAY,
+    'Sunday': AvailabilitySlot.DayOfWeek.SUNDAY,
+}
+DEFAULT_START_TIME = "09:00:00"  # Default if not specified
+DEFAULT_END_TIME = "17:00:00"
+
+SKILL_NAME_MAX_LENGTH = Skill._meta.get_field('name').max_length
+
+
+def normalize_skill(name):
+    """Collapse whitespace and fit the name to the Skill.name column"""
+    return ' '.join(name.split())[:SKILL_NAME_MAX_LENGTH].strip()
+
+
+def skill_key(name):
+    # "First Aid", "first  aid" and "FIRST AID" are one skill
+    return normalize_skill(name).casefold()
+
+
+def parse_skills(text):
+    """Distinct normalized skill names in a legacy comma-separated list"""
+    names = {}
+    for name in (text or '').split(','):
+        name = normalize_skill(name)
+        if name:
+            names.setdefault(skill_key(name), name)
+    return list(names.values())
+
+
+def skill_index():
+    """Map skill_key(name) to id for every Skill, oldest spelling first"""
+    index = {}
+    for name, skill_id in Skill.objects.order_by('name').values_list('name', 'id'):
+        index.setdefault(skill_key(name), skill_id)
+    return index
+
+
+def parse_days(text):
+    text = (text or '').lower()
+    return [day for day_name, day in DAYS.items() if day_name.lower() in text]
+
+
 class Command(BaseCommand):
     help = 'Migrates legacy volunteer skills and availability to new relational models'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batched',
+            action='store_true',
+            help='Set-based migration: bulk inserts per chunk, resumable from a checkpoint'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Volunteers migrated per chunk in batched mode'
+        )
+        parser.add_argument(
+            '--checkpoint-file',
+            default='migrate_volunteer_data.checkpoint',
+            help='Where batched mode records the last migrated volunteer'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore an existing checkpoint and start from the first volunteer'
+        )
+
     def handle(self, *args, **options):
+        if options['batched']:
+            return self.handle_batched(
+                chunk_size=options['chunk_size'],
+                checkpoint=Path(options['checkpoint_file']),
+                restart=options['restart']
+            )
+
         volunteers = Volunteer.objects.all()
         self.stdout.write(f"Starting migration for {volunteers.count()} volunteers...")
 
         for volunteer in volunteers:
             # 1. Migrate Skills
             if volunteer.skills:
-                skills_list = [s.strip() for s in volunteer.skills.split(',') if s.strip()]
-                for skill_name in skills_list:
-                    skill, created = Skill.objects.get_or_create(name=skill_name)
-                    volunteer.skills_list.add(skill)
-                    if created:
+                for skill_name in parse_skills(volunteer.skills):
+                    skill = Skill.objects.filter(name__iexact=skill_name).first()
+                    if skill is None:
+                        skill = Skill.objects.create(name=skill_name)
                         self.stdout.write(self.style.SUCCESS(f"Created new Skill: {skill_name}"))
+                    volunteer.skills_list.add(skill)
 
             # 2. Migrate Availability (Basic parsing)
             # Since availability is a TextField, we'll try to find keywords
-            days = {
-                'Monday': 1, 'Tuesday': 2, 'Wednesday': 3, 'Thursday': 4,
-                'Friday': 5, 'Saturday': 6, 'Sunday': 0
-            }
             if volunteer.availability:
-                for day_name, day_enum in days.items():
-                    if day_name.lower() in volunteer.availability.lower():
-                        slot, created = AvailabilitySlot.objects.get_or_create(
-                            day_of_week=day_enum,
-                            start_time="09:00:00",  # Default if not specified
-                            end_time="17:00:00"
-                        )
-                        volunteer.availability_slots.add(slot)
+                for day in parse_days(volunteer.availability):
+                    slot, created = AvailabilitySlot.objects.get_or_create(
+                        day_of_week=day,
+                        start_time=DEFAULT_START_TIME,
+                        end_time=DEFAULT_END_TIME
+                    )
+                    volunteer.availability_slots.add(slot)
 
             self.stdout.write(f"Migrated data for: {volunteer.full_name}")
 
         self.stdout.write(self.style.SUCCESS("Migration completed successfully!"))
+
+    def handle_batched(self, chunk_size, checkpoint, restart):
+        volunteers = Volunteer.objects.exclude(skills='', availability='').order_by('id')
+
+        last_id = None
+        if checkpoint.exists() and not restart:
+            last_id = checkpoint.read_text().strip() or None
+            self.stdout.write(f"Resuming after volunteer {last_id}")
+        if last_id:
+            volunteers = volunteers.filter(id__gt=last_id)
+
+        total = volunteers.count()
+        self.stdout.write(f"Starting batched migration for {total} volunteers...")
+
+        self.create_skill_vocabulary(volunteers)
+        skill_ids = skill_index()
+        slot_ids = self.ensure_default_slots()
+        # Names with no Skill row, e.g. added to a profile after the vocabulary pass
+        unmatched = {}
+
+        SkillLink = Volunteer.skills_list.through
+        SlotLink = Volunteer.availability_slots.through
+        processed = 0
+        started = time.monotonic()
+
+        while True:
+            chunk_started = time.monotonic()
+            chunk = list(
+                (volunteers.filter(id__gt=last_id) if last_id else volunteers)
+                .values_list('id', 'skills', 'availability')[:chunk_size]
+            )
+            if not chunk:
+                break
+
+            skill_links = []
+            for volunteer_id, skills, _ in chunk:
+                for name in parse_skills(skills):
+                    skill_id = skill_ids.get(skill_key(name))
+                    if skill_id is None:
+                        unmatched.setdefault(skill_key(name), name)
+                    else:
+                        skill_links.append(SkillLink(volunteer_id=volunteer_id, skill_id=skill_id))
+            slot_links = [
+                SlotLink(volunteer_id=volunteer_id, availabilityslot_id=slot_ids[day])
+                for volunteer_id, _, availability in chunk
+                for day in parse_days(availability)
+            ]
+
+            # Links that already exist (earlier runs) are skipped by the unique constraint
+            with transaction.atomic():
+                SkillLink.objects.bulk_create(skill_links, ignore_conflicts=True, batch_size=chunk_size)
+                SlotLink.objects.bulk_create(slot_links, ignore_conflicts=True, batch_size=chunk_size)
+
+            last_id = chunk[-1][0]
+            checkpoint.write_text(str(last_id))
+            processed += len(chunk)
+
+            elapsed = time.monotonic() - started
+            chunk_rate = len(chunk) / max(time.monotonic() - chunk_started, 1e-6)
+            self.stdout.write(
+                f"Migrated {processed}/{total} volunteers "
+                f"({chunk_rate:.0f}/s this chunk, {processed / max(elapsed, 1e-6):.0f}/s overall)"
+            )
+
+        checkpoint.unlink(missing_ok=True)
+        if unmatched:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {len(unmatched)} skill names with no Skill record "
+                f"(re-run to link them): {', '.join(sorted(unmatched.values())[:20])}"
+            ))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Migration completed successfully! {processed} volunteers in {elapsed:.1f}s."
+        ))
+
+    def create_skill_vocabulary(self, volunteers):
+        """Create every distinct legacy skill name up front, in one insert"""
+        names = {}
+        for skills in volunteers.exclude(skills='').values_list('skills', flat=True).iterator(chunk_size=2000):
+            for name in parse_skills(skills):
+                names.setdefault(skill_key(name), name)
+
+        # Matched on the normalized key, so existing spellings are reused
+        existing = skill_index()
+        new = [name for key, name in names.items() if key not in existing]
+        Skill.objects.bulk_create([Skill(name=name) for name in sorted(new)], ignore_conflicts=True, batch_size=1000)
+        self.stdout.write(f"Skill vocabulary: {len(names)} names, {len(new)} new")
+
+    def ensure_default_slots(self):
+        """Map each weekday to its default availability slot, creating missing ones"""
+        slots = {}
+        for slot in AvailabilitySlot.objects.filter(
+            start_time=DEFAULT_START_TIME, end_time=DEFAULT_END_TIME
+        ).order_by('id'):
+            slots.setdefault(slot.day_of_week, slot.id)
+
+        missing = [
+            AvailabilitySlot(day_of_week=day, start_time=DEFAULT_START_TIME, end_time=DEFAULT_END_TIME)
+            for day in DAYS.values() if day not in slots
+        ]
+        for slot in AvailabilitySlot.objects.bulk_create(missing):
+            slots[slot.day_of_week] = slot.id
+        return slots
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('volunteers', '0005_availabilityslot_skill_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmessage',
+            index=models.Index(fields=['group', 'created_at'], name='volunteers__group_i_fcb67e_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:15
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_registered_count(apps, schema_editor):
+    Event = apps.get_model('volunteers', 'Event')
+    Registration = Event.registered_volunteers.through
+    counts = (
+        Registration.objects.filter(event_id=OuterRef('pk'))
+        .values('event_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Event.objects.update(registered_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('volunteers', '0006_groupmessage_group_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='registered_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Maintained count of registered volunteers, used to enforce capacity'),
+        ),
+        migrations.CreateModel(
+            name='EventWaitlistEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='volunteers.event')),
+                ('volunteer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_waitlists', to='volunteers.volunteer')),
+            ],
+            options={
+                'verbose_name': 'event waitlist entry',
+                'verbose_name_plural': 'event waitlist entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['event', 'created_at'], name='volunteers__event_i_6aaae1_idx')],
+                'unique_together': {('event', 'volunteer')},
+            },
+        ),
+        migrations.RunPython(backfill_registered_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('volunteers', '0007_event_registered_count_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='county',
+            field=models.CharField(blank=True, help_text='Defaults to the shelter county when empty', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='required_skills',
+            field=models.ManyToManyField(blank=True, related_name='tasks', to='volunteers.skill'),
+        ),
+    ]
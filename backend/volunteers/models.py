@@ -165,8 +165,12 @@ class Task(models.Model):
     
     # Location
     location = models.CharField(max_length=200, help_text=_('Specific location/address'), default='General Location')
+    county = models.CharField(max_length=100, blank=True, help_text=_('Defaults to the shelter county when empty'))
     shelter = models.ForeignKey(ShelterHome, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
     
+    # Requirements (used for volunteer matching)
+    required_skills = models.ManyToManyField(Skill, blank=True, related_name='tasks')
+    
     priority = models.CharField(max_length=20, choices=Priority.choices, default=Priority.MEDIUM)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
     
@@ -275,6 +279,11 @@ class Event(models.Model):
     # Capacity
     max_volunteers = models.IntegerField(null=True, blank=True)
     registered_volunteers = models.ManyToManyField(Volunteer, blank=True, related_name='events')
+    registered_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_('Maintained count of registered volunteers, used to enforce capacity')
+    )
     
     # Requirements
     required_skills = models.TextField(blank=True, help_text=_('Skills needed for this event'))
@@ -312,7 +321,30 @@ class Event(models.Model):
         """Check if event is at capacity"""
         if not self.max_volunteers:
             return False
-        return self.registered_volunteers.count() >= self.max_volunteers
+        return self.registered_count >= self.max_volunteers
+
+
+class EventWaitlistEntry(models.Model):
+    """
+    Volunteers queued for a full event, promoted in order as places free up
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist')
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='event_waitlists')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('event waitlist entry')
+        verbose_name_plural = _('event waitlist entries')
+        unique_together = ['event', 'volunteer']
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['event', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.volunteer.full_name} waiting for {self.event.title}"
 
 
 class EventPhoto(models.Model):
@@ -498,6 +530,9 @@ class GroupMessage(models.Model):
         verbose_name = _('group message')
         verbose_name_plural = _('group messages')
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['group', 'created_at']),
+        ]
         
     def __str__(self):
         return f"Msg from {self.sender.email} in {self.group.name}"
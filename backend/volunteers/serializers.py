@@ -66,6 +66,21 @@ class TaskApplicationSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'applied_at', 'reviewed_at', 'reviewed_by')
 
 
+class VolunteerMatchSerializer(serializers.ModelSerializer):
+    """A ranked volunteer from VolunteerMatchingService, with its score breakdown"""
+    score = serializers.FloatField(read_only=True)
+    matched_skills = serializers.IntegerField(read_only=True)
+    is_available = serializers.BooleanField(read_only=True)
+    same_county = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Volunteer
+        fields = (
+            'id', 'full_name', 'email', 'county', 'total_hours',
+            'score', 'matched_skills', 'is_available', 'same_county'
+        )
+
+
 class TaskSerializer(serializers.ModelSerializer):
     assignees_details = serializers.SerializerMethodField()
     assigned_by_name = serializers.CharField(source='assigned_by.get_full_name', read_only=True)
@@ -106,10 +121,17 @@ class TaskSerializer(serializers.ModelSerializer):
     def get_assignees_details(self, obj):
         return [{'id': v.id, 'name': v.full_name, 'email': v.email} for v in obj.assignees.all()]
 
+    # Task views annotate both values (annotate_task_applications); the
+    # fallbacks cover tasks that were not loaded through those querysets
+
     def get_application_count(self, obj):
+        if hasattr(obj, 'application_count'):
+            return obj.application_count
         return obj.applications.count()
         
     def get_has_applied(self, obj):
+        if hasattr(obj, 'has_applied'):
+            return obj.has_applied
         request = self.context.get('request')
         if request and hasattr(request.user, 'volunteer_profile'):
             return obj.applications.filter(volunteer=request.user.volunteer_profile).exists()
@@ -124,7 +146,6 @@ class EventPhotoSerializer(serializers.ModelSerializer):
 
 class EventSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
-    registered_count = serializers.SerializerMethodField()
     is_full = serializers.ReadOnlyField()
     photos = EventPhotoSerializer(many=True, read_only=True)
     
@@ -152,9 +173,6 @@ class EventSerializer(serializers.ModelSerializer):
         if len(value) > 200:
             raise serializers.ValidationError('Location is too long.')
         return value
-    
-    def get_registered_count(self, obj):
-        return obj.registered_volunteers.count()
 
 
 class EventRegistrationSerializer(serializers.Serializer):
@@ -188,6 +206,13 @@ class TimeLogApprovalSerializer(serializers.ModelSerializer):
         fields = ['status', 'rejection_reason']
 
 
+class TimeLogBulkReviewSerializer(serializers.Serializer):
+    """Serializer for approving/rejecting many time logs at once"""
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=5000)
+    status = serializers.ChoiceField(choices=[TimeLog.Status.APPROVED, TimeLog.Status.REJECTED])
+    rejection_reason = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class TrainingSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     completion_count = serializers.SerializerMethodField()
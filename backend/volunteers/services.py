@@ -1,7 +1,20 @@
 import io
 import logging
+import binascii
+import math
+from decimal import Decimal
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, Exists, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Cast, Coalesce, Least
+from kindra_cbo.realtime import publish
 import os
 
 logger = logging.getLogger('kindra_cbo')
@@ -43,3 +56,442 @@ class CertificateService:
         except Exception as e:
             logger.error(f"Error generating certificate for completion {completion.id}: {str(e)}")
             return None
+
+
+class GroupMessageFeedService:
+    """
+    Incremental feed of a volunteer group's messages.
+
+    Cursors are opaque strings encoding the (created_at, id) of the last
+    message a client has seen; an empty cursor means "from the beginning".
+    Every read is one indexed keyset query, so no process-local state can
+    hide a message. Long-polls park on the group's real-time channel between
+    reads, so a quiet group costs one query per poll rather than a busy loop.
+    """
+
+    PAGE_SIZE = 100
+
+    @staticmethod
+    def channel(group_id):
+        return f"group:{group_id}"
+
+    @staticmethod
+    def encode_cursor(message):
+        raw = f"{message.created_at.isoformat()}|{message.id}"
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (created_at, id) for a cursor; raises ValueError if malformed"""
+        try:
+            raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            created_at, message_id = raw.split('|')
+            return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise ValueError('Invalid cursor') from e
+
+    @classmethod
+    def messages_since(cls, group_id, cursor='', limit=None):
+        """
+        Return (messages, next_cursor, has_more) for messages after `cursor`,
+        oldest first.
+        """
+        from .models import GroupMessage
+
+        limit = limit or cls.PAGE_SIZE
+        queryset = GroupMessage.objects.filter(group_id=group_id).select_related('sender')
+        if cursor:
+            created_at, message_id = cls.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+            )
+        messages = list(queryset.order_by('created_at', 'id')[:limit + 1])
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        next_cursor = cls.encode_cursor(messages[-1]) if messages else cursor
+        return messages, next_cursor, has_more
+
+    @classmethod
+    def message_posted(cls, message):
+        """Wake the group's long-polls once the message is committed"""
+        channel = cls.channel(message.group_id)
+        cursor = cls.encode_cursor(message)
+        transaction.on_commit(lambda: publish(channel, {'type': 'group_message', 'cursor': cursor}))
+
+
+class EventRegistrationService:
+    """
+    Capacity-enforced event registration with a waitlist.
+
+    Claiming a place is a single conditional UPDATE on Event.registered_count
+    ("increment if below capacity"), so concurrent registrations cannot
+    oversubscribe an event: once the last place is taken the UPDATE matches
+    no row and the volunteer joins the waitlist instead. Freed places are
+    handed to the waitlist in arrival order.
+    """
+
+    REGISTERED = 'registered'
+    WAITLISTED = 'waitlisted'
+    ALREADY_REGISTERED = 'already_registered'
+    ALREADY_WAITLISTED = 'already_waitlisted'
+    UNREGISTERED = 'unregistered'
+    LEFT_WAITLIST = 'left_waitlist'
+    NOT_REGISTERED = 'not_registered'
+
+    @staticmethod
+    def _registrations():
+        from .models import Event
+        return Event.registered_volunteers.through.objects
+
+    @staticmethod
+    def _claim_place(event_id):
+        """Take one place if the event has room; returns False when it is full"""
+        from .models import Event
+
+        # No limit (null or 0) behaves like Event.is_full
+        has_room = (
+            Q(max_volunteers__isnull=True) |
+            Q(max_volunteers=0) |
+            Q(registered_count__lt=F('max_volunteers'))
+        )
+        claimed = Event.objects.filter(has_room, id=event_id).update(
+            registered_count=F('registered_count') + 1
+        )
+        return claimed == 1
+
+    @classmethod
+    def register(cls, event, volunteer):
+        """Register `volunteer`, or waitlist them if the event is full"""
+        from .models import EventWaitlistEntry
+
+        registrations = cls._registrations()
+        if registrations.filter(event_id=event.id, volunteer_id=volunteer.id).exists():
+            return cls.ALREADY_REGISTERED
+
+        try:
+            with transaction.atomic():
+                if cls._claim_place(event.id):
+                    registrations.create(event_id=event.id, volunteer_id=volunteer.id)
+                    EventWaitlistEntry.objects.filter(event_id=event.id, volunteer_id=volunteer.id).delete()
+                    return cls.REGISTERED
+        except IntegrityError:
+            # A concurrent request registered the same volunteer; the place
+            # claimed above was rolled back with the failed insert
+            return cls.ALREADY_REGISTERED
+
+        _, created = EventWaitlistEntry.objects.get_or_create(event_id=event.id, volunteer_id=volunteer.id)
+        # A place may have been freed between the failed claim and joining the queue
+        promoted = cls.promote_waitlist(event)
+        if any(promoted_volunteer.id == volunteer.id for promoted_volunteer in promoted):
+            return cls.REGISTERED
+        return cls.WAITLISTED if created else cls.ALREADY_WAITLISTED
+
+    @classmethod
+    def unregister(cls, event, volunteer):
+        """Give up a place (or a waitlist spot) and promote the next in line"""
+        from .models import Event, EventWaitlistEntry
+
+        with transaction.atomic():
+            deleted, _ = cls._registrations().filter(event_id=event.id, volunteer_id=volunteer.id).delete()
+            if not deleted:
+                left, _ = EventWaitlistEntry.objects.filter(event_id=event.id, volunteer_id=volunteer.id).delete()
+                return cls.LEFT_WAITLIST if left else cls.NOT_REGISTERED
+            Event.objects.filter(id=event.id, registered_count__gt=0).update(
+                registered_count=F('registered_count') - 1
+            )
+
+        cls.promote_waitlist(event)
+        return cls.UNREGISTERED
+
+    @classmethod
+    def promote_waitlist(cls, event):
+        """
+        Move waitlisted volunteers into free places, oldest first.
+        Returns the promoted volunteers, who are also notified.
+        """
+        from .models import EventWaitlistEntry
+
+        promoted = []
+        while True:
+            with transaction.atomic():
+                # skip_locked lets concurrent promotions take different entries
+                entry = (
+                    EventWaitlistEntry.objects.select_for_update(skip_locked=True, of=('self',))
+                    .filter(event_id=event.id)
+                    .select_related('volunteer')
+                    .order_by('created_at')
+                    .first()
+                )
+                if entry is None or not cls._claim_place(event.id):
+                    break
+                cls._registrations().create(event_id=event.id, volunteer_id=entry.volunteer_id)
+                entry.delete()
+            promoted.append(entry.volunteer)
+
+        if promoted:
+            cls.notify_promoted(event, promoted)
+        return promoted
+
+    @staticmethod
+    def notify_promoted(event, volunteers):
+        from accounts.models import Notification
+        from accounts.notifications import publish_notifications
+
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                recipient_id=volunteer.user_id,
+                title="You're registered!",
+                message=f"A place opened up and you have been moved from the waitlist to {event.title}.",
+                type=Notification.Type.SUCCESS,
+                category=Notification.Category.VOLUNTEER,
+            )
+            for volunteer in volunteers if volunteer.user_id
+        ])
+        publish_notifications(notifications)
+
+    @classmethod
+    def recount(cls, event_ids):
+        """Resynchronise registered_count after registrations changed outside this service"""
+        from .models import Event
+
+        counts = (
+            cls._registrations().filter(event_id=OuterRef('pk'))
+            .values('event_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        Event.objects.filter(id__in=event_ids).update(registered_count=Coalesce(Subquery(counts), 0))
+
+
+class VolunteerMatchingService:
+    """
+    Ranks volunteers for a task in a single SQL query.
+
+    Each active volunteer gets a score in [0, 1] from:
+    - skill overlap: share of the task's required skills they have
+    - availability: an availability slot on the task's due-date weekday
+    - location: living in the task's county
+    - experience: logged hours, capped at EXPERIENCE_HOURS_CAP
+
+    Scoring happens in SQL (correlated lookups on the indexed skill and
+    availability join tables) and only the top K rows come back to Python.
+    Volunteers in the task's county are scored first; everyone else is only
+    considered if they hold enough of the required skills to beat that
+    shortlist, found by grouping the skill join table (an inverted index from
+    skill to volunteers), so most of the table is never scored.
+    """
+
+    WEIGHTS = {
+        'skills': 0.5,
+        'availability': 0.2,
+        'location': 0.2,
+        'experience': 0.1,
+    }
+    EXPERIENCE_HOURS_CAP = 100
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    @staticmethod
+    def task_county(task):
+        if task.county:
+            return task.county
+        return task.shelter.county if task.shelter_id else ''
+
+    @classmethod
+    def rank(cls, task, limit=None):
+        """Top `limit` volunteers for `task`, best first, with score components annotated"""
+        from .models import Volunteer
+
+        limit = min(max(int(limit or cls.DEFAULT_LIMIT), 1), cls.MAX_LIMIT)
+        required_skill_ids = list(task.required_skills.values_list('id', flat=True))
+        county = cls.task_county(task)
+
+        queryset = (
+            Volunteer.objects.filter(status=Volunteer.Status.ACTIVE)
+            .exclude(tasks=task)
+        )
+
+        # Score the (small, indexed) set of volunteers in the task's county first
+        ranked = []
+        others = queryset
+        if county:
+            ranked = cls._score(queryset.filter(county__iexact=county), task, required_skill_ids, county, limit)
+            others = queryset.exclude(county__iexact=county)
+
+        # Anyone outside the county needs enough matching skills to beat the
+        # current K-th score; look those up through the skill join table
+        # instead of scoring the whole volunteer table
+        if len(ranked) == limit:
+            threshold = ranked[-1].score - 1e-9
+            headroom = threshold - cls.WEIGHTS['availability'] - cls.WEIGHTS['experience']
+            if headroom > 0:
+                if not required_skill_ids:
+                    return ranked
+                min_matches = math.ceil(headroom / cls.WEIGHTS['skills'] * len(required_skill_ids))
+                if min_matches > len(required_skill_ids):
+                    return ranked
+                others = others.filter(id__in=(
+                    Volunteer.skills_list.through.objects
+                    .filter(skill_id__in=required_skill_ids)
+                    .values('volunteer_id')
+                    .annotate(total=Count('pk'))
+                    .filter(total__gte=min_matches)
+                    .values('volunteer_id')
+                ))
+
+        ranked += cls._score(others, task, required_skill_ids, county, limit)
+        ranked.sort(key=lambda volunteer: (-volunteer.score, -volunteer.total_hours, str(volunteer.id)))
+        return ranked[:limit]
+
+    @classmethod
+    def _score(cls, queryset, task, required_skill_ids, county, limit):
+        queryset = queryset.annotate(
+            matched_skills=cls._matched_skills(required_skill_ids),
+            is_available=cls._is_available(task),
+            same_county=(
+                Case(When(county__iexact=county, then=Value(1)), default=Value(0), output_field=IntegerField())
+                if county else Value(0, output_field=IntegerField())
+            ),
+            experience=ExpressionWrapper(
+                Cast(Least(F('total_hours'), Value(cls.EXPERIENCE_HOURS_CAP)), FloatField())
+                / cls.EXPERIENCE_HOURS_CAP,
+                output_field=FloatField()
+            ),
+        )
+
+        skill_share = (
+            Cast(F('matched_skills'), FloatField()) / len(required_skill_ids)
+            if required_skill_ids else Value(0.0)
+        )
+        score = (
+            skill_share * cls.WEIGHTS['skills'] +
+            Cast(F('is_available'), FloatField()) * cls.WEIGHTS['availability'] +
+            Cast(F('same_county'), FloatField()) * cls.WEIGHTS['location'] +
+            F('experience') * cls.WEIGHTS['experience']
+        )
+        return list(
+            queryset.annotate(score=ExpressionWrapper(score, output_field=FloatField()))
+            .order_by('-score', '-total_hours', 'id')[:limit]
+        )
+
+    @staticmethod
+    def _matched_skills(required_skill_ids):
+        from .models import Volunteer
+
+        if not required_skill_ids:
+            return Value(0, output_field=IntegerField())
+        through = Volunteer.skills_list.through.objects
+        matches = (
+            through.filter(volunteer_id=OuterRef('pk'), skill_id__in=required_skill_ids)
+            .values('volunteer_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(matches, output_field=IntegerField()), Value(0))
+
+    @staticmethod
+    def _is_available(task):
+        from .models import Volunteer
+
+        if not task.due_date:
+            return Value(0, output_field=IntegerField())
+        through = Volunteer.availability_slots.through.objects
+        has_slot = Exists(through.filter(
+            volunteer_id=OuterRef('pk'),
+            availabilityslot__day_of_week=task.due_date.weekday()
+        ))
+        # 0/1 rather than a boolean so it can be weighted in the score
+        return Case(When(has_slot, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+
+class TimeLogReviewService:
+    """
+    Approves or rejects time logs in bulk.
+
+    All logs are updated in one transaction. Each affected volunteer's
+    total_hours moves by the net change in their approved hours, in a single
+    UPDATE keyed by volunteer (F() arithmetic, so concurrent reviews cannot
+    lose each other's hours). Each volunteer then gets one summary
+    notification for the whole batch.
+    """
+
+    @classmethod
+    def review(cls, log_ids, status, reviewer, rejection_reason=''):
+        """
+        Set `status` on the given logs. Logs already in that status are left
+        alone, so repeating a review never counts hours twice.
+        Returns the number of logs changed.
+        """
+        from .models import TimeLog, Volunteer
+
+        with transaction.atomic():
+            logs = list(
+                TimeLog.objects.select_for_update()
+                .filter(id__in=log_ids)
+                .exclude(status=status)
+                .values('id', 'volunteer_id', 'hours', 'date', 'status')
+            )
+            if not logs:
+                return 0
+
+            TimeLog.objects.filter(id__in=[log['id'] for log in logs]).update(
+                status=status,
+                approved_by=reviewer,
+                approved_at=timezone.now(),
+                rejection_reason=rejection_reason if status == TimeLog.Status.REJECTED else '',
+                updated_at=timezone.now(),
+            )
+
+            # Net hours per volunteer: approving adds, withdrawing an approval subtracts
+            deltas = {}
+            summaries = {}
+            for log in logs:
+                delta = Decimal('0')
+                if status == TimeLog.Status.APPROVED:
+                    delta = log['hours']
+                elif log['status'] == TimeLog.Status.APPROVED:
+                    delta = -log['hours']
+                deltas[log['volunteer_id']] = deltas.get(log['volunteer_id'], Decimal('0')) + delta
+                count, hours, _ = summaries.get(log['volunteer_id'], (0, Decimal('0'), None))
+                summaries[log['volunteer_id']] = (count + 1, hours + log['hours'], log['date'])
+
+            deltas = {volunteer_id: delta for volunteer_id, delta in deltas.items() if delta}
+            if deltas:
+                Volunteer.objects.filter(id__in=deltas).update(total_hours=Case(
+                    *[When(id=volunteer_id, then=F('total_hours') + delta) for volunteer_id, delta in deltas.items()],
+                    default=F('total_hours'),
+                ))
+
+            cls.notify_volunteers(summaries, status)
+        return len(logs)
+
+    @staticmethod
+    def notify_volunteers(summaries, status):
+        """One notification per volunteer summarising their reviewed logs"""
+        from accounts.models import Notification
+        from accounts.notifications import publish_notifications
+        from .models import TimeLog, Volunteer
+
+        users = dict(
+            Volunteer.objects.filter(id__in=summaries, user__isnull=False).values_list('id', 'user_id')
+        )
+        verb = status.lower()
+        notifications = []
+        for volunteer_id, (count, hours, date) in summaries.items():
+            if volunteer_id not in users:
+                continue
+            if count == 1:
+                message = f"Your time log for {hours} hours on {date} has been {verb}."
+            else:
+                message = f"{count} of your time logs totalling {hours} hours have been {verb}."
+            if status == TimeLog.Status.REJECTED:
+                message += " Please contact your coordinator for details."
+            notifications.append(Notification(
+                recipient_id=users[volunteer_id],
+                title=f"Time Log{'s' if count > 1 else ''} {status.capitalize()}",
+                message=message,
+                type=Notification.Type.SUCCESS if status == TimeLog.Status.APPROVED else Notification.Type.WARNING,
+                category=Notification.Category.VOLUNTEER,
+                link="/dashboard/volunteers/hours"
+            ))
+        publish_notifications(Notification.objects.bulk_create(notifications))
@@ -1,8 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from accounts.models import User
-from .models import Volunteer
+from .models import Volunteer, Event, GroupMessage
+from .services import EventRegistrationService, GroupMessageFeedService
 
 @receiver(post_save, sender=User)
 def create_or_update_volunteer_profile(sender, instance, created, **kwargs):
@@ -32,3 +33,31 @@ def create_or_update_volunteer_profile(sender, instance, created, **kwargs):
                 updated = True
             if updated:
                 profile.save()
+
+
+@receiver(post_save, sender=GroupMessage)
+def publish_group_message(sender, instance, created, **kwargs):
+    """Let incremental feeds and long-polls know the group has a new message."""
+    if created:
+        GroupMessageFeedService.message_posted(instance)
+
+
+@receiver(m2m_changed, sender=Event.registered_volunteers.through)
+def sync_event_registered_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Event.registered_count right when registrations are edited directly
+    (e.g. in the admin) instead of through EventRegistrationService.
+    """
+    if reverse and action == 'pre_clear':
+        instance._cleared_event_ids = list(instance.events.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        event_ids = [instance.pk]
+    elif action == 'post_clear':
+        event_ids = getattr(instance, '_cleared_event_ids', [])
+    else:
+        event_ids = list(pk_set or [])
+    EventRegistrationService.recount(event_ids)
@@ -0,0 +1,323 @@
+"""
+Volunteer Management Tests
+"""
+
+import asyncio
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Notification, User
+from .models import (
+    AvailabilitySlot, Event, EventWaitlistEntry, GroupMessage, Skill, Task, TaskApplication, TimeLog, Volunteer,
+    VolunteerGroup,
+)
+from .management.commands.migrate_volunteer_data import Command as MigrateVolunteerDataCommand
+from .services import EventRegistrationService, GroupMessageFeedService, TimeLogReviewService, VolunteerMatchingService
+
+
+def make_volunteer(index):
+    user = User.objects.create_user(
+        email=f'volunteer{index}@example.com',
+        first_name='Volunteer',
+        last_name=str(index),
+        role=User.Role.VOLUNTEER,
+    )
+    return Volunteer.objects.get(user=user)
+
+
+def make_event(max_volunteers):
+    start = timezone.now() + timedelta(days=7)
+    return Event.objects.create(
+        title='Community clean-up',
+        description='Clean-up day',
+        event_type=Event.EventType.COMMUNITY,
+        location='Nairobi',
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=3),
+        max_volunteers=max_volunteers,
+    )
+
+
+class EventRegistrationServiceTests(TestCase):
+
+    def test_full_event_waitlists_and_promotes_on_cancellation(self):
+        event = make_event(max_volunteers=2)
+        first, second, third = (make_volunteer(i) for i in range(3))
+
+        self.assertEqual(EventRegistrationService.register(event, first), EventRegistrationService.REGISTERED)
+        self.assertEqual(EventRegistrationService.register(event, second), EventRegistrationService.REGISTERED)
+        self.assertEqual(EventRegistrationService.register(event, third), EventRegistrationService.WAITLISTED)
+        self.assertEqual(EventRegistrationService.register(event, first), EventRegistrationService.ALREADY_REGISTERED)
+
+        self.assertEqual(EventRegistrationService.unregister(event, first), EventRegistrationService.UNREGISTERED)
+
+        event.refresh_from_db()
+        self.assertEqual(event.registered_count, 2)
+        self.assertTrue(event.registered_volunteers.filter(id=third.id).exists())
+        self.assertFalse(EventWaitlistEntry.objects.filter(event=event).exists())
+
+    def test_direct_m2m_edits_keep_count_in_sync(self):
+        event = make_event(max_volunteers=5)
+        volunteers = [make_volunteer(i) for i in range(3)]
+
+        event.registered_volunteers.add(*volunteers)
+        event.refresh_from_db()
+        self.assertEqual(event.registered_count, 3)
+
+        volunteers[0].events.clear()
+        event.refresh_from_db()
+        self.assertEqual(event.registered_count, 2)
+
+
+class ConcurrentEventRegistrationTests(TransactionTestCase):
+    """Load test: many simultaneous registrations must never exceed capacity"""
+
+    CAPACITY = 5
+    VOLUNTEERS = 25
+
+    def test_concurrent_registration_does_not_oversubscribe(self):
+        event = make_event(max_volunteers=self.CAPACITY)
+        volunteers = [make_volunteer(i) for i in range(self.VOLUNTEERS)]
+        barrier = threading.Barrier(len(volunteers))
+        results = []
+        lock = threading.Lock()
+
+        def register(volunteer):
+            barrier.wait()
+            result = None
+            try:
+                for attempt in range(50):
+                    try:
+                        result = EventRegistrationService.register(event, volunteer)
+                        break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting
+                        time.sleep(0.01 * (attempt + 1))
+                with lock:
+                    results.append(result)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=register, args=(volunteer,)) for volunteer in volunteers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        event.refresh_from_db()
+        self.assertEqual(results.count(EventRegistrationService.REGISTERED), self.CAPACITY)
+        self.assertEqual(event.registered_count, self.CAPACITY)
+        self.assertEqual(event.registered_volunteers.count(), self.CAPACITY)
+        self.assertEqual(EventWaitlistEntry.objects.filter(event=event).count(), self.VOLUNTEERS - self.CAPACITY)
+
+
+class TaskListQueryCountTests(TestCase):
+
+    def test_task_list_query_count_is_independent_of_page_size(self):
+        volunteers = [make_volunteer(i) for i in range(3)]
+        for index in range(20):
+            task = Task.objects.create(title=f'Task {index}', description='Help out')
+            task.assignees.add(volunteers[0])
+            for volunteer in volunteers[:index % 3 + 1]:
+                TaskApplication.objects.create(task=task, volunteer=volunteer)
+
+        client = APIClient()
+        client.force_authenticate(volunteers[1].user)
+
+        # Pagination count, the annotated task page, and the assignees and
+        # required skills prefetches
+        with self.assertNumQueries(4):
+            response = client.get('/api/v1/volunteers/tasks/')
+
+        self.assertEqual(response.status_code, 200)
+        tasks = {task['title']: task for task in response.data['results']}
+        self.assertEqual(tasks['Task 0']['application_count'], 1)
+        self.assertFalse(tasks['Task 0']['has_applied'])
+        self.assertEqual(tasks['Task 2']['application_count'], 3)
+        self.assertTrue(tasks['Task 2']['has_applied'])
+
+
+class VolunteerMatchingServiceTests(TestCase):
+
+    def test_ranks_by_skills_county_and_availability(self):
+        first_aid, cooking = Skill.objects.create(name='First Aid'), Skill.objects.create(name='Cooking')
+        monday = AvailabilitySlot.objects.create(day_of_week=0, start_time='09:00', end_time='12:00')
+        task = Task.objects.create(
+            title='Soup kitchen', description='Serve meals', county='Kisumu',
+            due_date=timezone.localdate() + timedelta(days=7 - timezone.localdate().weekday())
+        )
+        task.required_skills.set([first_aid, cooking])
+
+        best, local, remote, assigned = (make_volunteer(i) for i in range(4))
+        Volunteer.objects.filter(id__in=[best.id, local.id, assigned.id]).update(county='Kisumu')
+        Volunteer.objects.filter(id=remote.id).update(county='Nairobi')
+        best.skills_list.set([first_aid, cooking])
+        best.availability_slots.set([monday])
+        remote.skills_list.set([first_aid])
+        task.assignees.add(assigned)
+
+        ranked = VolunteerMatchingService.rank(task, limit=3)
+
+        self.assertEqual([volunteer.id for volunteer in ranked], [best.id, remote.id, local.id])
+        self.assertAlmostEqual(ranked[0].score, 0.9)
+
+
+class TimeLogReviewServiceTests(TestCase):
+
+    def test_bulk_approval_rolls_up_hours_once_with_one_notification_each(self):
+        reviewer = User.objects.create_user(email='coordinator@example.com', first_name='C', last_name='C', role=User.Role.ADMIN)
+        alice, bob = make_volunteer(1), make_volunteer(2)
+        logs = [
+            TimeLog.objects.create(volunteer=volunteer, date=timezone.localdate(), hours=Decimal(hours), description='Work')
+            for volunteer, hours in [(alice, '2.5'), (alice, '3'), (bob, '4')]
+        ]
+        ids = [log.id for log in logs]
+
+        self.assertEqual(TimeLogReviewService.review(ids, TimeLog.Status.APPROVED, reviewer), 3)
+        # Repeating the review changes nothing
+        self.assertEqual(TimeLogReviewService.review(ids, TimeLog.Status.APPROVED, reviewer), 0)
+
+        alice.refresh_from_db()
+        bob.refresh_from_db()
+        self.assertEqual(alice.total_hours, Decimal('5.5'))
+        self.assertEqual(bob.total_hours, Decimal('4'))
+        self.assertEqual(Notification.objects.filter(recipient=alice.user).count(), 1)
+
+        TimeLogReviewService.review([logs[0].id], TimeLog.Status.REJECTED, reviewer, rejection_reason='Duplicate')
+        alice.refresh_from_db()
+        self.assertEqual(alice.total_hours, Decimal('3'))
+
+    def test_rejection_reason_can_be_edited_on_its_own(self):
+        reviewer = User.objects.create_user(email='coordinator@example.com', role=User.Role.ADMIN)
+        volunteer = make_volunteer(1)
+        rejected, approved = (
+            TimeLog.objects.create(volunteer=volunteer, date=timezone.localdate(), hours=Decimal('2'), description='Work')
+            for _ in range(2)
+        )
+        TimeLogReviewService.review([rejected.id], TimeLog.Status.REJECTED, reviewer, rejection_reason='Duplicate')
+        TimeLogReviewService.review([approved.id], TimeLog.Status.APPROVED, reviewer)
+        client = APIClient()
+        client.force_authenticate(reviewer)
+
+        response = client.patch(
+            f'/api/v1/volunteers/timelogs/{rejected.id}/approve/', {'rejection_reason': 'Logged twice'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rejection_reason'], 'Logged twice')
+        rejected.refresh_from_db()
+        self.assertEqual((rejected.status, rejected.rejection_reason), (TimeLog.Status.REJECTED, 'Logged twice'))
+
+        response = client.patch(
+            f'/api/v1/volunteers/timelogs/{approved.id}/approve/', {'rejection_reason': 'Too long'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        volunteer.refresh_from_db()
+        self.assertEqual(volunteer.total_hours, Decimal('2'))
+
+
+class GroupMessageFeedTests(TestCase):
+
+    def setUp(self):
+        volunteer = make_volunteer(1)
+        self.user = volunteer.user
+        self.group = VolunteerGroup.objects.create(name='Weekend team')
+        self.group.members.add(volunteer)
+        self.poll_url = f'/api/v1/volunteers/groups/{self.group.id}/messages/poll/'
+
+    def post(self, content):
+        return GroupMessage.objects.create(group=self.group, sender=self.user, content=content)
+
+    def test_messages_posted_elsewhere_are_never_hidden(self):
+        cursor = GroupMessageFeedService.encode_cursor(self.post('First'))
+        # bulk_create skips the post_save signal, like a post handled by another process
+        GroupMessage.objects.bulk_create([GroupMessage(group=self.group, sender=self.user, content='Second')])
+
+        messages, next_cursor, has_more = GroupMessageFeedService.messages_since(self.group.id, cursor)
+
+        self.assertEqual([message.content for message in messages], ['Second'])
+        self.assertEqual(GroupMessageFeedService.messages_since(self.group.id, next_cursor)[0], [])
+        self.assertFalse(has_more)
+
+    async def test_poll_returns_pending_messages_without_waiting(self):
+        await sync_to_async(self.post)('Hello')
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+
+        response = await asyncio.wait_for(self.async_client.get(self.poll_url, {'token': token, 'wait': 30}), timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([message['content'] for message in response.json()['results']], ['Hello'])
+
+    async def test_non_finite_wait_is_rejected(self):
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+
+        for wait in ('nan', 'inf', '-inf'):
+            response = await self.async_client.get(self.poll_url, {'token': token, 'wait': wait})
+            self.assertEqual(response.status_code, 400)
+
+
+class MigrateVolunteerDataTests(TestCase):
+
+    def setUp(self):
+        self.volunteers = sorted((make_volunteer(i) for i in range(3)), key=lambda volunteer: volunteer.id)
+        for volunteer, skills in zip(self.volunteers, ('First Aid, cooking', ' first   aid ,COOKING', 'Driving')):
+            volunteer.skills = skills
+            volunteer.availability = 'Monday and Friday'
+            volunteer.save()
+        self.first_aid = Skill.objects.create(name='First Aid')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Path(directory.name) / 'migrate.checkpoint'
+
+    def migrate(self, **options):
+        out = StringIO()
+        call_command(
+            'migrate_volunteer_data', batched=True, chunk_size=1, checkpoint_file=str(self.checkpoint),
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def skill_names(self, volunteer):
+        return sorted(volunteer.skills_list.values_list('name', flat=True))
+
+    def test_batched_migration_resumes_from_the_checkpoint(self):
+        self.checkpoint.write_text(str(self.volunteers[0].id))  # An interrupted run got this far
+
+        output = self.migrate()
+
+        self.assertIn(f'Resuming after volunteer {self.volunteers[0].id}', output)
+        self.assertFalse(self.checkpoint.exists())
+        self.assertEqual(self.skill_names(self.volunteers[0]), [])
+        # Spellings of one skill share the existing record
+        self.assertEqual(self.skill_names(self.volunteers[1]), ['COOKING', 'First Aid'])
+        self.assertEqual(self.skill_names(self.volunteers[2]), ['Driving'])
+        self.assertEqual(Skill.objects.filter(name__iexact='first aid').count(), 1)
+        self.assertEqual(self.volunteers[2].availability_slots.count(), 2)
+
+        self.migrate(restart=True)
+
+        self.assertEqual(self.skill_names(self.volunteers[0]), ['COOKING', 'First Aid'])
+        self.assertEqual(Skill.objects.count(), 3)
+
+    def test_skill_names_without_a_record_are_reported_not_fatal(self):
+        # A name added to a profile after the vocabulary pass has no Skill row
+        with mock.patch.object(MigrateVolunteerDataCommand, 'create_skill_vocabulary'):
+            output = self.migrate()
+
+        self.assertIn('Skipped 2 skill names with no Skill record', output)
+        self.assertEqual(self.skill_names(self.volunteers[1]), ['First Aid'])
+        self.assertEqual(self.skill_names(self.volunteers[2]), [])
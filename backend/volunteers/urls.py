@@ -5,14 +5,14 @@ Volunteer Management URL Configuration
 from django.urls import path
 from .views import (
     VolunteerListCreateView, VolunteerDetailView,
-    TaskListCreateView, TaskDetailView,
+    TaskListCreateView, TaskDetailView, TaskMatchesView,
     EventListCreateView, EventDetailView, EventRegisterView, EventParticipantsView,
-    TimeLogListCreateView, TimeLogDetailView, TimeLogApprovalView,
+    TimeLogListCreateView, TimeLogDetailView, TimeLogApprovalView, TimeLogBulkReviewView,
     TrainingListCreateView, TrainingDetailView,
     TrainingCompletionListCreateView, TrainingCompletionDetailView,
     TaskApplicationListCreateView, TaskApplicationDetailView,
     VolunteerGroupListCreateView, VolunteerGroupDetailView, GroupMessageListCreateView,
-    DownloadCertificateView
+    DownloadCertificateView, group_message_poll_view
 )
 
 app_name = 'volunteers'
@@ -25,6 +25,7 @@ urlpatterns = [
     # Tasks
     path('tasks/', TaskListCreateView.as_view(), name='task-list'),
     path('tasks/<uuid:pk>/', TaskDetailView.as_view(), name='task-detail'),
+    path('tasks/<uuid:pk>/matches/', TaskMatchesView.as_view(), name='task-matches'),
     path('tasks/applications/', TaskApplicationListCreateView.as_view(), name='task-application-list'),
     path('tasks/applications/<uuid:pk>/', TaskApplicationDetailView.as_view(), name='task-application-detail'),
     
@@ -36,6 +37,7 @@ urlpatterns = [
     
     # Time Logs
     path('timelogs/', TimeLogListCreateView.as_view(), name='timelog-list'),
+    path('timelogs/bulk-review/', TimeLogBulkReviewView.as_view(), name='timelog-bulk-review'),
     path('timelogs/<uuid:pk>/', TimeLogDetailView.as_view(), name='timelog-detail'),
     path('timelogs/<uuid:pk>/approve/', TimeLogApprovalView.as_view(), name='timelog-approve'),
     
@@ -50,4 +52,5 @@ urlpatterns = [
     path('groups/', VolunteerGroupListCreateView.as_view(), name='group-list'),
     path('groups/<uuid:pk>/', VolunteerGroupDetailView.as_view(), name='group-detail'),
     path('groups/<uuid:group_id>/messages/', GroupMessageListCreateView.as_view(), name='group-message-list'),
+    path('groups/<uuid:group_id>/messages/poll/', group_message_poll_view, name='group-message-poll'),
 ]
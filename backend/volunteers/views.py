@@ -2,21 +2,33 @@
 Volunteer Management Views
 """
 
+import math
+
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.utils import timezone
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef
+from django.http import JsonResponse
+from asgiref.sync import sync_to_async
 from .models import Volunteer, Task, Event, TimeLog, Training, TrainingCompletion, TaskApplication, VolunteerGroup, GroupMessage
 from accounts.models import Notification, User
 from accounts.permissions import IsAdminOrManagement
+from accounts.authentication import get_request_token, get_user_from_token
+from kindra_cbo.realtime import get_broker
 from .serializers import (
     VolunteerSerializer, TaskSerializer, EventSerializer,
-    TimeLogSerializer, TimeLogApprovalSerializer,
+    TimeLogSerializer, TimeLogApprovalSerializer, TimeLogBulkReviewSerializer,
     TrainingSerializer, TrainingCompletionSerializer, TaskApplicationSerializer,
-    VolunteerGroupSerializer, GroupMessageSerializer, EventRegistrationSerializer
+    VolunteerGroupSerializer, GroupMessageSerializer, EventRegistrationSerializer,
+    VolunteerMatchSerializer
+)
+from .services import (
+    CertificateService, EventRegistrationService, GroupMessageFeedService, TimeLogReviewService,
+    VolunteerMatchingService
 )
-from .services import CertificateService
 from django.http import HttpResponse
 
 
@@ -41,8 +53,22 @@ class VolunteerDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
+def annotate_task_applications(queryset, user):
+    """
+    Add application_count and has_applied (for `user`) to a Task queryset,
+    computed in the same SQL statement instead of per serialized task.
+    """
+    user_applications = TaskApplication.objects.filter(task=OuterRef('pk'), volunteer__user_id=user.id)
+    return queryset.annotate(
+        application_count=Count('applications', distinct=True),
+        has_applied=Exists(user_applications),
+    )
+
+
 class TaskListCreateView(generics.ListCreateAPIView):
-    queryset = Task.objects.all().select_related('assigned_by', 'created_by').prefetch_related('assignees')
+    queryset = Task.objects.all().select_related(
+        'assigned_by', 'created_by', 'requested_by', 'shelter'
+    ).prefetch_related('assignees', 'required_skills')
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -50,6 +76,9 @@ class TaskListCreateView(generics.ListCreateAPIView):
     search_fields = ['title', 'description', 'location', 'shelter__name']
     ordering_fields = ['created_at', 'due_date', 'priority', 'approval_status']
     ordering = ['-created_at']
+
+    def get_queryset(self):
+        return annotate_task_applications(super().get_queryset(), self.request.user)
     
     def perform_create(self, serializer):
         task = serializer.save(created_by=self.request.user)
@@ -86,10 +115,35 @@ class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return annotate_task_applications(super().get_queryset(), self.request.user)
+
     def perform_update(self, serializer):
         task = serializer.save()
 
 
+class TaskMatchesView(generics.GenericAPIView):
+    """
+    Volunteers best suited to a task, ranked by skills, availability,
+    county and experience (?limit=, default 10)
+    """
+    queryset = Task.objects.all().select_related('shelter')
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrManagement]
+
+    def get(self, request, *args, **kwargs):
+        task = self.get_object()
+        try:
+            limit = int(request.query_params.get('limit') or VolunteerMatchingService.DEFAULT_LIMIT)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+
+        volunteers = VolunteerMatchingService.rank(task, limit=limit)
+        return Response({
+            'task': task.id,
+            'results': VolunteerMatchSerializer(volunteers, many=True).data
+        })
+
+
 class TaskApplicationListCreateView(generics.ListCreateAPIView):
     queryset = TaskApplication.objects.all()
     serializer_class = TaskApplicationSerializer
@@ -163,6 +217,11 @@ class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def perform_update(self, serializer):
+        event = serializer.save()
+        # Raising capacity frees places for the waitlist
+        EventRegistrationService.promote_waitlist(event)
+
 
 class EventRegisterView(generics.GenericAPIView):
     """
@@ -172,6 +231,16 @@ class EventRegisterView(generics.GenericAPIView):
     serializer_class = EventRegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    RESPONSES = {
+        EventRegistrationService.REGISTERED: "Successfully registered for event.",
+        EventRegistrationService.ALREADY_REGISTERED: "You are already registered for this event.",
+        EventRegistrationService.WAITLISTED: "Event is full. You have been added to the waitlist.",
+        EventRegistrationService.ALREADY_WAITLISTED: "Event is full. You are already on the waitlist.",
+        EventRegistrationService.UNREGISTERED: "Successfully unregistered from event.",
+        EventRegistrationService.LEFT_WAITLIST: "You have been removed from the waitlist.",
+        EventRegistrationService.NOT_REGISTERED: "You are not registered for this event.",
+    }
+
     def post(self, request, *args, **kwargs):
         event = self.get_object()
         serializer = self.get_serializer(data=request.data)
@@ -181,13 +250,10 @@ class EventRegisterView(generics.GenericAPIView):
         action = serializer.validated_data['action']
         
         if action == 'register':
-            if event.is_full:
-                return Response({"detail": "Event is full."}, status=status.HTTP_400_BAD_REQUEST)
-            event.registered_volunteers.add(volunteer)
-            return Response({"detail": "Successfully registered for event."}, status=status.HTTP_200_OK)
+            result = EventRegistrationService.register(event, volunteer)
         else:
-            event.registered_volunteers.remove(volunteer)
-            return Response({"detail": "Successfully unregistered from event."}, status=status.HTTP_200_OK)
+            result = EventRegistrationService.unregister(event, volunteer)
+        return Response({"detail": self.RESPONSES[result], "status": result}, status=status.HTTP_200_OK)
 
 
 class EventParticipantsView(generics.ListAPIView):
@@ -231,33 +297,45 @@ class TimeLogApprovalView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManagement]
     
     def perform_update(self, serializer):
-        time_log = serializer.save(
-            approved_by=self.request.user,
-            approved_at=timezone.now()
-        )
-        
-        if time_log.status == "APPROVED":
-            volunteer = time_log.volunteer
-            volunteer.total_hours += time_log.hours
-            volunteer.save(update_fields=['total_hours'])
-
-        # Notify volunteer about approval/rejection
-        if time_log.volunteer.user:
-            notif_title = f"Time Log {time_log.status.capitalize()}d"
-            notif_type = Notification.Type.SUCCESS if time_log.status == 'APPROVED' else Notification.Type.WARNING
-            
-            message = f"Your time log for {time_log.hours} hours on {time_log.date} has been {time_log.status.lower()}."
-            if time_log.status == 'REJECTED':
-                message += " Please contact your coordinator for details."
-
-            Notification.objects.create(
-                recipient=time_log.volunteer.user,
-                title=notif_title,
-                message=message,
-                type=notif_type,
-                category=Notification.Category.VOLUNTEER,
-                link="/dashboard/volunteers/hours"
+        time_log = serializer.instance
+        data = serializer.validated_data
+        new_status = data.get('status', time_log.status)
+
+        if new_status != time_log.status:
+            TimeLogReviewService.review(
+                [time_log.id], new_status, self.request.user,
+                rejection_reason=data.get('rejection_reason', '')
             )
+        elif 'rejection_reason' in data:
+            # Rewording the reason on a rejected log; the review itself is unchanged
+            updated = TimeLog.objects.filter(pk=time_log.pk, status=TimeLog.Status.REJECTED).update(
+                rejection_reason=data['rejection_reason']
+            )
+            if not updated:
+                raise ValidationError({'rejection_reason': 'Only rejected time logs have a rejection reason.'})
+        time_log.refresh_from_db()
+
+
+class TimeLogBulkReviewView(generics.GenericAPIView):
+    """
+    Approve or reject many time logs in one request
+    """
+    serializer_class = TimeLogBulkReviewSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrManagement]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        updated = TimeLogReviewService.review(
+            data['ids'], data['status'], request.user,
+            rejection_reason=data['rejection_reason']
+        )
+        return Response({
+            "detail": f"{updated} time log(s) {data['status'].lower()}.",
+            "updated": updated
+        }, status=status.HTTP_200_OK)
 
 
 class TrainingListCreateView(generics.ListCreateAPIView):
@@ -340,9 +418,27 @@ class VolunteerGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
         return VolunteerGroup.objects.none()
 
 
+def can_access_group(user, group):
+    """Group chat is private to members, plus admins and management"""
+    is_member = hasattr(user, 'volunteer_profile') and group.members.filter(id=user.volunteer_profile.id).exists()
+    is_admin = user.role == User.Role.ADMIN or user.is_staff or user.role == User.Role.MANAGEMENT
+    return is_member or is_admin
+
+
+def group_feed_page(group_id, since):
+    """Serialized messages posted to a group after the `since` cursor"""
+    messages, cursor, has_more = GroupMessageFeedService.messages_since(group_id, since)
+    return {
+        'results': GroupMessageSerializer(messages, many=True).data,
+        'cursor': cursor,
+        'has_more': has_more,
+    }
+
+
 class GroupMessageListCreateView(generics.ListCreateAPIView):
     """
     Private group chat messages. No admin interference (Admins only see if they are members).
+    Pass ?since=<cursor> (empty for the start) to receive only newer messages.
     """
     serializer_class = GroupMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -354,15 +450,25 @@ class GroupMessageListCreateView(generics.ListCreateAPIView):
         try:
             group = VolunteerGroup.objects.get(id=group_id)
             # Private: Only members or Admins can see messages
-            is_member = hasattr(user, 'volunteer_profile') and group.members.filter(id=user.volunteer_profile.id).exists()
-            is_admin = user.role == User.Role.ADMIN or user.is_staff or user.role == User.Role.MANAGEMENT
-            
-            if is_member or is_admin:
+            if can_access_group(user, group):
                 return group.messages.all().order_by('created_at')
         except VolunteerGroup.DoesNotExist:
             pass
             
         return GroupMessage.objects.none()
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        if since is None:
+            return super().list(request, *args, **kwargs)
+
+        group = VolunteerGroup.objects.filter(id=self.kwargs.get('group_id')).first()
+        if group is None or not can_access_group(request.user, group):
+            raise NotFound("Volunteer group not found.")
+        try:
+            return Response(group_feed_page(group.id, since))
+        except ValueError:
+            raise ValidationError({'since': 'Invalid cursor.'})
         
     def perform_create(self, serializer):
         group_id = self.kwargs.get('group_id')
@@ -370,19 +476,54 @@ class GroupMessageListCreateView(generics.ListCreateAPIView):
         try:
             group = VolunteerGroup.objects.get(id=group_id)
             # Ensure sender is in the group OR is an admin
-            is_member = hasattr(user, 'volunteer_profile') and group.members.filter(id=user.volunteer_profile.id).exists()
-            is_admin = user.role == User.Role.ADMIN or user.is_staff or user.role == User.Role.MANAGEMENT
-            
-            if is_member or is_admin:
+            if can_access_group(user, group):
                 serializer.save(sender=user, group=group)
             else:
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("You must be a member of this group (or an admin) to send messages.")
         except VolunteerGroup.DoesNotExist:
-            from rest_framework.exceptions import NotFound
             raise NotFound("Volunteer group not found.")
 
 
+async def group_message_poll_view(request, group_id):
+    """
+    Long-poll for new group messages: ?since=<cursor>&wait=<seconds>.
+    Returns as soon as a message newer than the cursor is posted, or an empty
+    page once `wait` expires. Waiting uses the group's real-time channel, so
+    an idle group costs no database queries while clients are parked here.
+    """
+    user = await sync_to_async(get_user_from_token)(get_request_token(request))
+    if user is None:
+        return JsonResponse({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    group = await VolunteerGroup.objects.filter(id=group_id).afirst()
+    if group is None or not await sync_to_async(can_access_group)(user, group):
+        return JsonResponse({'detail': 'Volunteer group not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    since = request.GET.get('since', '')
+    try:
+        if since:
+            GroupMessageFeedService.decode_cursor(since)
+        wait = float(request.GET.get('wait', settings.LONG_POLL_MAX_WAIT_SECONDS))
+        if not math.isfinite(wait):
+            raise ValueError('wait must be a finite number')
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid since or wait parameter.'}, status=status.HTTP_400_BAD_REQUEST)
+    wait = min(max(wait, 0), settings.LONG_POLL_MAX_WAIT_SECONDS)
+
+    # Subscribe before reading so a message posted in between still wakes us
+    subscription = await get_broker().subscribe(GroupMessageFeedService.channel(group.id))
+    try:
+        page = await sync_to_async(group_feed_page)(group.id, since)
+        if not page['results'] and wait:
+            if await subscription.get(timeout=wait) is not None:
+                page = await sync_to_async(group_feed_page)(group.id, since)
+    finally:
+        await subscription.close()
+
+    return JsonResponse(page)
+
+
 class DownloadCertificateView(generics.GenericAPIView):
     """
     Download a PDF certificate for a training completion
@@ -0,0 +1,36 @@
+/**
+ * Real-time Connections
+ * URLs for the WebSocket and server-sent event endpoints served by the ASGI backend
+ */
+
+import { API_BASE_URL } from './client';
+
+// VITE_API_URL may be relative ('/api/v1') or point at another host
+const apiUrl = () => new URL(API_BASE_URL, window.location.origin);
+
+/**
+ * WebSocket URL for a path at the backend's root, e.g. '/ws/chat/'.
+ * Browsers cannot set headers on the handshake, so the JWT goes in the query.
+ */
+export const socketUrl = (path: string): string => {
+    const url = new URL(path, apiUrl().origin);
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+    const token = localStorage.getItem('accessToken');
+    if (token) {
+        url.searchParams.set('token', token);
+    }
+    return url.toString();
+};
+
+/**
+ * Server-sent event stream URL for a path under the API, e.g. 'accounts/notifications/stream/'.
+ * EventSource cannot set headers either, so the JWT goes in the query.
+ */
+export const streamUrl = (path: string): string => {
+    const url = new URL(path, apiUrl());
+    const token = localStorage.getItem('accessToken');
+    if (token) {
+        url.searchParams.set('token', token);
+    }
+    return url.toString();
+};
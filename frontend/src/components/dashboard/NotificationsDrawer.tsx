@@ -35,7 +35,15 @@ import {
 } from '@mui/icons-material';
 import { motion, AnimatePresence } from 'framer-motion';
 import { useNavigate } from 'react-router-dom';
+import { useDispatch } from 'react-redux';
 import apiClient from '../../api/client';
+import { streamUrl } from '../../api/realtime';
+import { AppDispatch } from '../../store';
+import {
+    fetchNotifications as fetchUnreadCount,
+    notificationReceived,
+    setUnreadNotificationsCount,
+} from '../../features/auth/authSlice';
 
 interface User {
     id: string;
@@ -75,6 +83,13 @@ interface NotificationsDrawerProps {
     user: any;
 }
 
+const STREAM_RETRY_DELAY = 5000;
+
+const formatNotification = (n: any): Notification => ({
+    ...n,
+    formattedTime: new Date(n.created_at || Date.now()).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
+});
+
 // Grouping helper
 const groupNotifications = (notifs: Notification[]) => {
     const groups: { [key: string]: Notification[] } = {
@@ -127,6 +142,7 @@ const getNotifColor = (type: string, theme: any) => {
 export const NotificationsDrawer = ({ open, onClose, user }: NotificationsDrawerProps) => {
     const theme = useTheme();
     const navigate = useNavigate();
+    const dispatch = useDispatch<AppDispatch>();
     const [activeSection, setActiveSection] = useState<'Activity' | 'Community'>('Activity');
 
     const [messages, setMessages] = useState<ChatMessage[]>([]);
@@ -161,12 +177,7 @@ export const NotificationsDrawer = ({ open, onClose, user }: NotificationsDrawer
         try {
             const response = await apiClient.get('/accounts/notifications/');
             const data = Array.isArray(response.data) ? response.data : (response.data?.results || []);
-
-            const formatted = data.map((n: any) => ({
-                ...n,
-                formattedTime: new Date(n.created_at || Date.now()).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
-            }));
-            setNotifications(formatted);
+            setNotifications(data.map(formatNotification));
         } catch (error) {
             console.error('Failed to fetch notifications:', error);
         }
@@ -175,13 +186,46 @@ export const NotificationsDrawer = ({ open, onClose, user }: NotificationsDrawer
     const fetchUsers = async () => {
         try {
             const response = await apiClient.get('/chat/messages/users/');
-            const validUsers = (response.data || []).filter((u: User) => u.id != null);
+            const validUsers = (response.data.results || response.data || []).filter((u: User) => u.id != null);
             setAvailableUsers(validUsers);
         } catch (error) {
             console.error('Error fetching users:', error);
         }
     };
 
+    // New notifications are pushed over the SSE stream instead of being polled for
+    useEffect(() => {
+        let source: EventSource | null = null;
+        let retryId: ReturnType<typeof setTimeout> | null = null;
+        let closed = false;
+
+        const connect = () => {
+            source = new EventSource(streamUrl('accounts/notifications/stream/'));
+            source.addEventListener('ready', (event) => {
+                dispatch(setUnreadNotificationsCount(JSON.parse((event as MessageEvent).data).unread_count));
+            });
+            source.addEventListener('notification', (event) => {
+                const notification = formatNotification(JSON.parse((event as MessageEvent).data));
+                setNotifications(prev => prev.some(n => String(n.id) === String(notification.id)) ? prev : [notification, ...prev]);
+                dispatch(notificationReceived());
+            });
+            source.onerror = () => {
+                // EventSource retries dropped connections itself; it gives up on a 401
+                if (closed || source?.readyState !== EventSource.CLOSED) return;
+                // Any API call refreshes an expired access token before the retry
+                dispatch(fetchUnreadCount());
+                retryId = setTimeout(connect, STREAM_RETRY_DELAY);
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            if (retryId) clearTimeout(retryId);
+            source?.close();
+        };
+    }, [dispatch]);
+
     useEffect(() => {
         if (open) {
             fetchNotifications();
@@ -222,6 +266,7 @@ export const NotificationsDrawer = ({ open, onClose, user }: NotificationsDrawer
     const handleMarkAllRead = async () => {
         try {
             await apiClient.post('/accounts/notifications/mark-all-read/');
+            dispatch(setUnreadNotificationsCount(0));
             fetchNotifications();
         } catch (error) {
             console.error('Failed to mark notifications as read:', error);
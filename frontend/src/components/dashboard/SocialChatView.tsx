@@ -46,12 +46,12 @@ import {
 import { motion } from 'framer-motion';
 import { RootState, AppDispatch } from '../../store';
 import {
-    fetchMessages,
     fetchAvailableUsers,
     sendMessage,
     deleteMessage,
     setSelectedConversation,
 } from '../../features/socialChat/socialChatSlice';
+import { connectChatSocket } from '../../features/socialChat/chatSocket';
 import { StatsCard } from './StatCards';
 
 export function SocialChatView() {
@@ -72,13 +72,9 @@ export function SocialChatView() {
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
     useEffect(() => {
-        dispatch(fetchMessages());
         dispatch(fetchAvailableUsers());
-        // Set up auto-refresh every 3 seconds
-        const interval = setInterval(() => {
-            dispatch(fetchMessages());
-        }, 3000);
-        return () => clearInterval(interval);
+        // New and deleted messages are pushed over the chat socket, which loads history on connect
+        return connectChatSocket(dispatch);
     }, [dispatch]);
 
     useEffect(() => {
@@ -298,6 +298,12 @@ const authSlice = createSlice({
         clearError: (state) => {
             state.error = null;
         },
+        setUnreadNotificationsCount: (state, action: PayloadAction<number>) => {
+            state.unreadNotificationsCount = action.payload;
+        },
+        notificationReceived: (state) => {
+            state.unreadNotificationsCount += 1;
+        },
         updateUserProfile: (state, action: PayloadAction<Partial<User>>) => {
             if (state.user) {
                 state.user = {
@@ -409,5 +415,7 @@ const normalizeUser = (user: any): User => {
     return normalized;
 };
 
-export const { clearError, updateUserProfile } = authSlice.actions;
+export const {
+    clearError, setUnreadNotificationsCount, notificationReceived, updateUserProfile,
+} = authSlice.actions;
 export default authSlice.reducer;
@@ -0,0 +1,68 @@
+/**
+ * Community Chat Socket
+ * Keeps one WebSocket to /ws/chat/ open and feeds its events into the socialChat slice
+ */
+
+import { socketUrl } from '../../api/realtime';
+import type { AppDispatch } from '../../store';
+import { fetchMessages, messageReceived, messageRemoved, setConnected } from './socialChatSlice';
+
+const PING_INTERVAL = 25 * 1000;
+const MAX_RETRY_DELAY = 30 * 1000;
+const CLOSE_UNAUTHORIZED = 4401;
+
+/**
+ * Connect the chat to the server and reconnect with backoff when the socket drops.
+ * History is re-read on every (re)connect to cover anything missed while offline.
+ * Returns a function that closes the connection for good.
+ */
+export const connectChatSocket = (dispatch: AppDispatch): (() => void) => {
+    let socket: WebSocket | null = null;
+    let pingId: ReturnType<typeof setInterval> | null = null;
+    let retryId: ReturnType<typeof setTimeout> | null = null;
+    let retries = 0;
+    let closed = false;
+
+    const connect = () => {
+        socket = new WebSocket(socketUrl('/ws/chat/'));
+
+        socket.onopen = () => {
+            retries = 0;
+            dispatch(setConnected(true));
+            dispatch(fetchMessages());
+            // Keeps presence fresh and the connection alive through proxies
+            pingId = setInterval(() => socket?.send(JSON.stringify({ type: 'ping' })), PING_INTERVAL);
+        };
+
+        socket.onmessage = (event) => {
+            const data = JSON.parse(event.data);
+            if (data.type === 'message') {
+                dispatch(messageReceived(data.message));
+            } else if (data.type === 'message_deleted') {
+                dispatch(messageRemoved(String(data.id)));
+            }
+        };
+
+        socket.onclose = (event) => {
+            if (pingId) clearInterval(pingId);
+            pingId = null;
+            dispatch(setConnected(false));
+            if (closed) return;
+            if (event.code === CLOSE_UNAUTHORIZED) {
+                // Any API call refreshes an expired access token before the retry
+                dispatch(fetchMessages());
+            }
+            const delay = Math.min(1000 * 2 ** retries, MAX_RETRY_DELAY);
+            retries += 1;
+            retryId = setTimeout(connect, delay);
+        };
+    };
+
+    connect();
+
+    return () => {
+        closed = true;
+        if (retryId) clearTimeout(retryId);
+        socket?.close();
+    };
+};
@@ -40,8 +40,28 @@ interface SocialChatState {
     isLoading: boolean;
     error: string | null;
     selectedConversation?: string;
+    isConnected: boolean;
 }
 
+// Sent messages come back over the chat socket too, so skip ones already listed
+const addMessage = (state: SocialChatState, message: ChatMessage) => {
+    if (state.messages.some(m => String(m.id) === String(message.id))) {
+        return;
+    }
+    state.messages.unshift(message);
+    if (!message.is_private) {
+        state.publicMessages.unshift(message);
+    } else {
+        state.privateMessages.unshift(message);
+    }
+};
+
+const removeMessage = (state: SocialChatState, messageId: string) => {
+    state.messages = state.messages.filter(m => String(m.id) !== messageId);
+    state.publicMessages = state.publicMessages.filter(m => String(m.id) !== messageId);
+    state.privateMessages = state.privateMessages.filter(m => String(m.id) !== messageId);
+};
+
 export const fetchMessages = createAsyncThunk(
     'socialChat/fetchMessages',
     async (_, { rejectWithValue }) => {
@@ -59,7 +79,7 @@ export const fetchAvailableUsers = createAsyncThunk(
     async (_, { rejectWithValue }) => {
         try {
             const response = await apiClient.get(endpoints.socialChat.users);
-            return response.data;
+            return response.data.results || response.data;
         } catch (error: any) {
             return rejectWithValue(error.response?.data?.message || 'Failed to fetch users');
         }
@@ -98,6 +118,7 @@ const initialState: SocialChatState = {
     isLoading: false,
     error: null,
     selectedConversation: undefined,
+    isConnected: false,
 };
 
 const socialChatSlice = createSlice({
@@ -107,6 +128,15 @@ const socialChatSlice = createSlice({
         setSelectedConversation(state, action: PayloadAction<string | undefined>) {
             state.selectedConversation = action.payload;
         },
+        messageReceived(state, action: PayloadAction<ChatMessage>) {
+            addMessage(state, action.payload);
+        },
+        messageRemoved(state, action: PayloadAction<string>) {
+            removeMessage(state, action.payload);
+        },
+        setConnected(state, action: PayloadAction<boolean>) {
+            state.isConnected = action.payload;
+        },
         addMessageOptimistic(state, action: PayloadAction<ChatMessage>) {
             state.messages.unshift(action.payload);
             if (!action.payload.is_private) {
@@ -146,12 +176,7 @@ const socialChatSlice = createSlice({
         });
         builder.addCase(sendMessage.fulfilled, (state, action) => {
             state.isLoading = false;
-            state.messages.unshift(action.payload);
-            if (!action.payload.is_private) {
-                state.publicMessages.unshift(action.payload);
-            } else {
-                state.privateMessages.unshift(action.payload);
-            }
+            addMessage(state, action.payload);
         });
         builder.addCase(sendMessage.rejected, (state, action) => {
             state.isLoading = false;
@@ -160,9 +185,7 @@ const socialChatSlice = createSlice({
 
         // Delete Message
         builder.addCase(deleteMessage.fulfilled, (state, action) => {
-            state.messages = state.messages.filter(m => m.id !== action.payload);
-            state.publicMessages = state.publicMessages.filter(m => m.id !== action.payload);
-            state.privateMessages = state.privateMessages.filter(m => m.id !== action.payload);
+            removeMessage(state, String(action.payload));
         });
         builder.addCase(deleteMessage.rejected, (state, action) => {
             state.error = action.payload as string;
@@ -170,5 +193,7 @@ const socialChatSlice = createSlice({
     },
 });
 
-export const { setSelectedConversation, addMessageOptimistic } = socialChatSlice.actions;
+export const {
+    setSelectedConversation, messageReceived, messageRemoved, setConnected, addMessageOptimistic,
+} = socialChatSlice.actions;
 export default socialChatSlice.reducer;